@@ -0,0 +1,22 @@
+import secrets
+
+from core.config import settings
+from fastapi import Depends, HTTPException, status
+from fastapi.security import APIKeyHeader
+
+admin_api_key_header = APIKeyHeader(name="X-Admin-API-Key", auto_error=False)
+
+
+async def verify_admin_api_key(
+    api_key: str | None = Depends(admin_api_key_header),
+) -> None:
+    if not settings.admin_api_key:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin API is disabled."
+        )
+
+    # Constant-time comparison, so that the key cannot be guessed from timings
+    if not api_key or not secrets.compare_digest(api_key, settings.admin_api_key):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin API key."
+        )
@@ -1,14 +1,17 @@
 from datetime import datetime, timedelta, timezone
 
 import jwt
-from auth.password import verify_password
+from auth.password import password_hasher
 from core.config import settings
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jwt.exceptions import InvalidTokenError
-from models.database import get_db
-from models.models import User
-from schemas.oauth2 import TokenData
+from models.database import get_read_db
+from models.models import Address, User
+from pydantic import ValidationError
+from schemas.oauth2 import Principal, TokenData
+from services.principal_cache import principal_cache
+from services.principal_versions import principal_versions
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -21,17 +24,29 @@
 
 
 def create_access_token(
-    data: dict, refresh: bool = False, expires_delta: timedelta | None = None
+    data: dict,
+    refresh: bool = False,
+    expires_delta: timedelta | None = None,
+    principal: Principal | None = None,
 ) -> str:
     to_encode = data.copy()
+    now = datetime.now(timezone.utc)
 
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
+        expire = now + timedelta(minutes=15)
 
     to_encode.update({"refresh": refresh})
     to_encode.update({"exp": expire})
+
+    # Claims-rich tokens embed a snapshot of the user, see `get_current_principal`
+    if principal is not None:
+        to_encode.update({"iat": now})
+        to_encode.update(
+            {"principal": principal.model_dump(mode="json", exclude={"id"})}
+        )
+
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
     return encoded_jwt
@@ -47,14 +62,57 @@ def verify_access_token(token: str, credentials_exception: Exception) -> TokenDa
 
         token_data = TokenData(id=id)
 
-    except InvalidTokenError:
+        principal = payload.get("principal")
+        if principal is not None and "iat" in payload:
+            token_data.issued_at = datetime.fromtimestamp(payload["iat"], timezone.utc)
+            token_data.principal = Principal(id=id, **principal)
+
+    except (InvalidTokenError, ValidationError):
         raise credentials_exception
 
     return token_data
 
 
+def principal_version(updated_at: datetime) -> int:
+    # Microseconds since the epoch of the (UTC) `updated_at` of a user
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return int(updated_at.timestamp() * 1_000_000)
+
+
+async def load_principal(db: AsyncSession, user_id: str) -> Principal | None:
+    stmt = (
+        select(
+            User.id,
+            User.date_of_birth,
+            User.gender,
+            User.updated_at,
+            Address.latitude,
+            Address.longitude,
+        )
+        .outerjoin(User.address)
+        .filter(User.id == user_id)
+    )
+
+    result = await db.execute(stmt)
+    row = result.first()
+
+    if row is None:
+        return None
+
+    return Principal(
+        id=row.id,
+        date_of_birth=row.date_of_birth,
+        gender=row.gender,
+        latitude=row.latitude,
+        longitude=row.longitude,
+        version=principal_version(row.updated_at),
+    )
+
+
 async def authenticate_user(
-    user_credentials: OAuth2PasswordRequestForm, db: AsyncSession = Depends(get_db)
+    user_credentials: OAuth2PasswordRequestForm,
+    db: AsyncSession = Depends(get_read_db),
 ) -> User | bool:
     stmt = select(User).filter_by(email=user_credentials.username)
 
@@ -63,13 +121,13 @@ async def authenticate_user(
 
     if not user:
         return False
-    if not verify_password(user_credentials.password, user.password):
+    if not await password_hasher.verify(user_credentials.password, user.password):
         return False
     return user
 
 
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -78,8 +136,17 @@ async def get_current_user(
     )
 
     token_data = verify_access_token(token, credentials_exception)
+    user_id = str(token_data.id)
+
+    # Step 1: Look the user up in the principal cache
+    if settings.principal_cache_enabled:
+        user = principal_cache.get(user_id)
+        if user is not None:
+            return user
 
-    stmt = select(User).filter_by(id=str(token_data.id))
+    # Step 2: Otherwise, load and cache it
+    generation = principal_cache.generation
+    stmt = select(User).filter_by(id=user_id)
 
     result = await db.execute(stmt)
     user = result.scalars().first()
@@ -87,7 +154,47 @@ async def get_current_user(
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"User with user id {str(token_data.id)} not found.",
+            detail=f"User with user id {user_id} not found.",
         )
 
+    if settings.principal_cache_enabled:
+        principal_cache.put(user, generation)
+
     return user
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)
+) -> Principal:
+    # For endpoints that only need the attributes of a `Principal`, which are served
+    # from the claims of the token while they are up to date
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    token_data = verify_access_token(token, credentials_exception)
+    user_id = str(token_data.id)
+
+    # Step 1: Use the claims of the token, unless they are older than
+    # `access_token_claims_max_age` or the user was updated since
+    principal = token_data.principal
+    if (
+        principal is not None
+        and datetime.now(timezone.utc) - token_data.issued_at
+        <= timedelta(seconds=settings.access_token_claims_max_age)
+        and principal_versions.is_current(user_id, principal.version)
+    ):
+        return principal
+
+    # Step 2: Otherwise, look the user up
+    principal = await load_principal(db, user_id)
+
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with user id {user_id} not found.",
+        )
+
+    return principal
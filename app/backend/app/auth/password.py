@@ -1,5 +1,8 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
+from core.config import settings
 from passlib.context import CryptContext
 
 # See: https://github.com/pyca/bcrypt/issues/684
@@ -14,3 +17,32 @@ def hash_password(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt off the event loop, in a pool of `concurrency` threads.
+
+    A bcrypt hash takes a few hundred milliseconds of CPU, during which every other
+    request would otherwise wait. bcrypt releases the GIL while hashing, so up to
+    `concurrency` hashes run in parallel, and further ones wait for a free thread.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="password"
+        )
+
+    async def hash(self, password: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, verify_password, plain_password, hashed_password
+        )
+
+
+password_hasher = PasswordHasher(settings.password_hash_concurrency)
@@ -0,0 +1,153 @@
+"""
+Load test of `/bookings/schedule` during a booking surge, with and without the
+admission queue in front of it.
+
+Bookings arrive at a fixed rate (open loop, i.e. whether or not earlier ones have
+finished), faster than the database can commit them. Without admission control every
+booking competes for the connection pool and the SQLite write lock at once, so
+latency keeps growing and bookings fail with pool or lock timeouts. With it, excess
+bookings are turned away immediately and the admitted ones keep a bounded latency.
+
+Usage (from `app/backend/app`):
+
+    python -m benchmarks.bench_admission --rate 1000 --duration 5 --max-waiting 100
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from benchmarks.bench_available_slots import seed
+from core.config import settings
+from models.database import create_db_engine
+from models.models import BookingSlot
+from routers.booking import schedule_vaccination_slot
+from schemas.booking import ScheduleSlotRequest
+from services.admission import AdmissionQueue, AdmissionQueueFull
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.future import select
+
+
+async def book(
+    session_factory: async_sessionmaker,
+    admission: AdmissionQueue | None,
+    user,
+    slot_id: str,
+    stats: dict,
+):
+    request = ScheduleSlotRequest(booking_slot_id=slot_id)
+    start = time.perf_counter()
+
+    async def _book():
+        async with session_factory() as db:
+            await schedule_vaccination_slot(request=request, current_user=user, db=db)
+
+    try:
+        if admission is None:
+            await _book()
+        else:
+            async with admission.admit(user.id):
+                await _book()
+    except AdmissionQueueFull:
+        stats["rejected"] += 1
+        return
+    except Exception:
+        # e.g., pool or `database is locked` timeouts
+        stats["failed"] += 1
+        return
+
+    stats["latencies"].append(time.perf_counter() - start)
+
+
+async def run(
+    session_factory: async_sessionmaker,
+    admission: AdmissionQueue | None,
+    user,
+    slot_ids: list[str],
+    args: argparse.Namespace,
+) -> dict:
+    stats = {"latencies": [], "rejected": 0, "failed": 0}
+    start = time.perf_counter()
+
+    # Step 1: Start a booking every 1 / rate seconds, without waiting for it
+    tasks = []
+    for i in range(int(args.rate * args.duration)):
+        delay = start + i / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(
+            asyncio.create_task(
+                book(session_factory, admission, user, slot_ids.pop(), stats)
+            )
+        )
+
+    # Step 2: Wait for the stragglers
+    await asyncio.gather(*tasks)
+
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+
+async def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        config = settings.model_copy(update={"sqlite_synchronous": args.synchronous})
+        engine = create_db_engine(
+            f"sqlite+aiosqlite:///{Path(tmp) / 'bookings.sqlite'}", config
+        )
+        user = await seed(engine, args.slots, args.clinics)
+
+        session_factory = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+        async with session_factory() as db:
+            result = await db.execute(select(BookingSlot.id))
+            slot_ids = list(result.scalars())
+
+        results = {
+            "off": await run(session_factory, None, user, slot_ids, args),
+            "on": await run(
+                session_factory,
+                AdmissionQueue(args.concurrency, args.max_waiting),
+                user,
+                slot_ids,
+                args,
+            ),
+        }
+
+        await engine.dispose()
+
+    print(
+        f"{'admission':<12}{'booked':>8}{'rejected':>10}{'failed':>8}"
+        f"{'p50 (ms)':>10}{'p99 (ms)':>10}{'elapsed (s)':>13}"
+    )
+    for name, stats in results.items():
+        latencies = np.array(stats["latencies"] or [np.nan]) * 1000
+        print(
+            f"{name:<12}{len(stats['latencies']):>8}{stats['rejected']:>10}"
+            f"{stats['failed']:>8}{np.percentile(latencies, 50):>10.1f}"
+            f"{np.percentile(latencies, 99):>10.1f}{stats['elapsed']:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slots", type=int, default=100000)
+    parser.add_argument("--clinics", type=int, default=30)
+    parser.add_argument("--rate", type=float, default=1000, help="bookings/s")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.booking_admission_concurrency
+    )
+    parser.add_argument(
+        "--max-waiting", type=int, default=settings.booking_admission_max_waiting
+    )
+    parser.add_argument(
+        "--synchronous",
+        choices=["OFF", "NORMAL", "FULL"],
+        default=settings.sqlite_synchronous,
+    )
+    asyncio.run(main(parser.parse_args()))
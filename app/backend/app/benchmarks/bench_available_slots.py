@@ -0,0 +1,248 @@
+"""
+Compare latency and peak memory of `/bookings/available` before and after the
+per-polyclinic slot limit was pushed into SQL with a `ROW_NUMBER()` window.
+
+The "legacy" implementation loads every open slot of the vaccine (with its polyclinic
+and address) and applies `polyclinic_limit`/`timeslot_limit` in Python, while the
+"window" implementation is the router function itself.
+
+Usage (from `app/backend/app`):
+
+    python -m benchmarks.bench_available_slots --slots 1000000 --clinics 30
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from auth.oauth2 import load_principal
+from fastapi import Response
+from geopy.distance import geodesic
+from models.database import Base, create_db_engine
+from models.models import (
+    Address,
+    BookingSlot,
+    Clinic,
+    User,
+    Vaccine,
+    VaccineRecord,
+)
+from routers.booking import get_available_booking_slots
+from sqlalchemy import func, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+
+VACCINE_NAME = "Influenza (INF)"
+
+
+async def seed(engine: AsyncEngine, slots: int, clinics: int) -> User:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+        vaccine_id = str(uuid.uuid4())
+        await conn.execute(
+            insert(Vaccine),
+            [{"id": vaccine_id, "name": VACCINE_NAME}],
+        )
+
+        addresses = [
+            {
+                "id": str(uuid.uuid4()),
+                "postal_code": f"{560000 + i}",
+                "address": f"Block {i}",
+                "latitude": 1.30 + i * 0.005,
+                "longitude": 103.80 + i * 0.005,
+            }
+            for i in range(clinics + 1)
+        ]
+        await conn.execute(insert(Address), addresses)
+
+        clinic_ids = [str(uuid.uuid4()) for _ in range(clinics)]
+        await conn.execute(
+            insert(Clinic),
+            [
+                {
+                    "id": clinic_id,
+                    "address_id": address["id"],
+                    "name": f"Polyclinic {i}",
+                    "type": "polyclinic",
+                }
+                for i, (clinic_id, address) in enumerate(zip(clinic_ids, addresses))
+            ],
+        )
+
+        user = {
+            "id": str(uuid.uuid4()),
+            "address_id": addresses[-1]["id"],
+            "nric": "S0000000A",
+            "first_name": "Bench",
+            "last_name": "User",
+            "email": "bench@example.com",
+            "date_of_birth": date(1990, 1, 1),
+            "gender": "M",
+            "password": "-",
+        }
+        await conn.execute(insert(User), [user])
+
+        # Spread slots over the clinics, every 5 minutes from 8am to 6pm
+        start = datetime(2025, 1, 1, 8)
+        batch = []
+        for i in range(slots):
+            day, minute = divmod(i // clinics, 120)
+            batch.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "polyclinic_id": clinic_ids[i % clinics],
+                    "vaccine_id": vaccine_id,
+                    "datetime": start + timedelta(days=day, minutes=5 * minute),
+                }
+            )
+            if len(batch) == 50000:
+                await conn.execute(insert(BookingSlot), batch)
+                batch = []
+        if batch:
+            await conn.execute(insert(BookingSlot), batch)
+
+    return User(id=user["id"])
+
+
+async def legacy_available_booking_slots(
+    vaccine_name: str,
+    polyclinic_limit: int,
+    timeslot_limit: int,
+    current_user: User,
+    db: AsyncSession,
+):
+    # Copy of the implementation that applied the limits in Python
+    booked_slots_subquery = select(VaccineRecord.booking_slot_id)
+    matching_vaccines_subquery = select(Vaccine.id).where(
+        func.lower(Vaccine.name).like(f"%{vaccine_name.lower()}%")
+    )
+
+    stmt = (
+        select(BookingSlot)
+        .join(BookingSlot.polyclinic)
+        .options(selectinload(BookingSlot.polyclinic).selectinload(Clinic.address))
+        .where(
+            BookingSlot.vaccine_id.in_(matching_vaccines_subquery),
+            BookingSlot.id.notin_(booked_slots_subquery),
+        )
+        .order_by(BookingSlot.datetime.asc())
+    )
+    result = await db.execute(stmt)
+    slots = result.scalars().all()
+
+    result = await db.execute(
+        select(Address.longitude, Address.latitude)
+        .join(User.address)
+        .where(User.id == current_user.id)
+    )
+    user_longitude, user_latitude = result.first()
+
+    unique_polyclinics = {slot.polyclinic_id: slot.polyclinic for slot in slots}
+    clinic_distances = {
+        polyclinic_id: geodesic(
+            (user_latitude, user_longitude),
+            (polyclinic.address.latitude, polyclinic.address.longitude),
+        ).km
+        for polyclinic_id, polyclinic in unique_polyclinics.items()
+    }
+
+    sorted_polyclinics = sorted(unique_polyclinics, key=clinic_distances.get)
+    polyclinic_slots = defaultdict(list)
+    for slot in slots:
+        polyclinic_slots[slot.polyclinic_id].append(slot)
+
+    final_slots = []
+    for polyclinic_id in sorted_polyclinics[:polyclinic_limit]:
+        final_slots.extend(polyclinic_slots[polyclinic_id][:timeslot_limit])
+
+    return final_slots
+
+
+async def window_available_booking_slots(
+    vaccine_name: str,
+    polyclinic_limit: int,
+    timeslot_limit: int,
+    current_user: User,
+    db: AsyncSession,
+):
+    return await get_available_booking_slots(
+        response=Response(),
+        vaccine_name=vaccine_name,
+        polyclinic_limit=polyclinic_limit,
+        timeslot_limit=timeslot_limit,
+        # As served by `get_current_principal` without claims
+        current_user=await load_principal(db, current_user.id),
+        db=db,
+    )
+
+
+async def measure(
+    implementation, session_factory: async_sessionmaker, user: User, args
+) -> dict:
+    latencies = []
+    peak_memory = 0
+
+    for _ in range(args.repeat):
+        async with session_factory() as db:
+            tracemalloc.start()
+            start = time.perf_counter()
+
+            slots = await implementation(
+                VACCINE_NAME, args.polyclinic_limit, args.timeslot_limit, user, db
+            )
+
+            latencies.append(time.perf_counter() - start)
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    return {
+        "implementation": implementation.__name__.split("_")[0],
+        "slots": len(slots),
+        "median_ms": statistics.median(latencies) * 1000,
+        "peak_mib": peak_memory / 2**20,
+    }
+
+
+async def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'slots.sqlite'}")
+        user = await seed(engine, args.slots, args.clinics)
+
+        session_factory = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        results = [
+            await measure(implementation, session_factory, user, args)
+            for implementation in (
+                legacy_available_booking_slots,
+                window_available_booking_slots,
+            )
+        ]
+        await engine.dispose()
+
+    print(f"{'implementation':<16}{'slots':>8}{'median ms':>12}{'peak MiB':>12}")
+    for result in results:
+        print(
+            f"{result['implementation']:<16}{result['slots']:>8}"
+            f"{result['median_ms']:>12.1f}{result['peak_mib']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slots", type=int, default=1_000_000)
+    parser.add_argument("--clinics", type=int, default=30)
+    parser.add_argument("--polyclinic-limit", type=int, default=3)
+    parser.add_argument("--timeslot-limit", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,299 @@
+"""
+Compare the time taken to find the users eligible for (or overdue on) each vaccine,
+evaluating the criteria one user at a time with the rules engine behind
+`/vaccines/recommendations`, or for every user at once with the NumPy arrays of
+`services.cohort` (as in `/admin/cohorts/eligibility`).
+
+Both evaluate the same cohort, loaded once, and must agree on every status. The
+time taken to load the cohort and to format the statuses as NDJSON and CSV is
+reported as well, with the longest the event loop was blocked while loading (i.e.,
+how long other requests of the worker would have waited).
+
+Usage (from `app/backend/app`):
+
+    python -m benchmarks.bench_cohort --users 1000000
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from models.database import Base, create_db_engine
+from models.models import (
+    Address,
+    BookingSlot,
+    Clinic,
+    User,
+    Vaccine,
+    VaccineCriteria,
+    VaccineRecord,
+)
+from services.cohort import (
+    ELIGIBLE,
+    OVERDUE,
+    Cohort,
+    csv_lines,
+    evaluate_cohort,
+    load_cohort,
+    ndjson_lines,
+)
+from services.eligibility import VaccineEligibility
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+TODAY = date(2026, 1, 1)
+BATCH_SIZE = 50000
+
+# As in data.sql: vaccine name -> (age criteria, gender criteria, frequency)
+VACCINES = {
+    "Influenza (INF)": [
+        ("18-64 years", "None", "Annually or per season"),
+        ("65+ years", "None", "Annually or per season"),
+    ],
+    "Human papillomavirus (HPV2 or HPV4)": [
+        ("12-13 years", "F", "Once"),
+        ("13-14 years", "F", "Once"),
+        ("18-26 years", "F", "Once"),
+    ],
+    "Pneumococcal Conjugate (PCV13)": [
+        ("4 months", "None", "Once"),
+        ("6 months", "None", "Once"),
+        ("12 months", "None", "Once"),
+    ],
+    "Tetanus, diphtheria (Td)": [
+        ("10-11 years", "None", "Once"),
+        ("18+ years", "None", "Every 10 years"),
+    ],
+}
+
+
+async def insert_batched(conn, table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        await conn.execute(insert(table), rows[start : start + BATCH_SIZE])
+
+
+async def seed(engine: AsyncEngine, users: int, completed: float, booked: float):
+    rng = random.Random(0)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+        vaccine_ids = {name: str(uuid.uuid4()) for name in VACCINES}
+        await conn.execute(
+            insert(Vaccine),
+            [{"id": id, "name": name} for name, id in vaccine_ids.items()],
+        )
+        await conn.execute(
+            insert(VaccineCriteria),
+            [
+                {
+                    "vaccine_id": vaccine_ids[name],
+                    "age_criteria": age_criteria,
+                    "gender_criteria": gender_criteria,
+                    "health_condition_criteria": "None",
+                    "doses_required": 1,
+                    "frequency": frequency,
+                }
+                for name, criterias in VACCINES.items()
+                for age_criteria, gender_criteria, frequency in criterias
+            ],
+        )
+
+        address_id = str(uuid.uuid4())
+        await conn.execute(
+            insert(Address),
+            [
+                {
+                    "id": address_id,
+                    "postal_code": "560000",
+                    "address": "Block 0",
+                    "latitude": 1.30,
+                    "longitude": 103.80,
+                }
+            ],
+        )
+        clinic_id = str(uuid.uuid4())
+        await conn.execute(
+            insert(Clinic),
+            [
+                {
+                    "id": clinic_id,
+                    "address_id": address_id,
+                    "name": "Polyclinic 0",
+                    "type": "polyclinic",
+                }
+            ],
+        )
+
+        # One slot per vaccine and day over the last 3 years, holding every dose of
+        # that day (the slots' capacity does not matter to the cohort)
+        slots = {
+            (vaccine_id, day): str(uuid.uuid4())
+            for vaccine_id in vaccine_ids.values()
+            for day in range(3 * 365)
+        }
+        await insert_batched(
+            conn,
+            BookingSlot,
+            [
+                {
+                    "id": slot_id,
+                    "polyclinic_id": clinic_id,
+                    "vaccine_id": vaccine_id,
+                    "datetime": datetime(TODAY.year, 1, 1, 9) - timedelta(days=day),
+                    "status": "booked",
+                    "remaining": 0,
+                }
+                for (vaccine_id, day), slot_id in slots.items()
+            ],
+        )
+
+        # Users aged 0 to 90 years, some with a completed or booked dose
+        user_rows, record_rows = [], []
+        for i in range(users):
+            user_id = str(uuid.uuid4())
+            user_rows.append(
+                {
+                    "id": user_id,
+                    "nric": f"S{i:07d}A",
+                    "first_name": "Bench",
+                    "last_name": f"User {i}",
+                    "email": f"user{i}@example.com",
+                    "date_of_birth": TODAY - timedelta(days=rng.randrange(90 * 365)),
+                    "gender": rng.choice("MF"),
+                    "password": "-",
+                }
+            )
+
+            draw = rng.random()
+            if draw < completed + booked:
+                vaccine_id = rng.choice(list(vaccine_ids.values()))
+                record_rows.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "user_id": user_id,
+                        "booking_slot_id": slots[vaccine_id, rng.randrange(3 * 365)],
+                        "status": "completed" if draw < completed else "booked",
+                    }
+                )
+
+            if len(user_rows) == BATCH_SIZE:
+                await conn.execute(insert(User), user_rows)
+                user_rows = []
+        if user_rows:
+            await conn.execute(insert(User), user_rows)
+
+        await insert_batched(conn, VaccineRecord, record_rows)
+
+
+def per_user_statuses(cohort: Cohort, eligibility: VaccineEligibility) -> np.ndarray:
+    # The rules engine's `match` for each user in turn, then the user's last dose
+    # and booking of each matching vaccine
+    statuses = np.zeros(cohort.days_since_dose.shape, dtype=np.int8)
+    vaccine_index = {id: index for index, id in enumerate(cohort.vaccine_ids)}
+    gender_names = {code: name for name, code in cohort.gender_codes.items()}
+
+    days_since_dose = cohort.days_since_dose.tolist()
+    booked = cohort.booked.tolist()
+    for row, (age_days, gender) in enumerate(
+        zip(cohort.age_days.tolist(), cohort.genders.tolist())
+    ):
+        for rule in eligibility.match(age_days, gender_names[gender]):
+            column = vaccine_index[rule.vaccine_id]
+            if booked[row][column]:
+                continue
+
+            days = days_since_dose[row][column]
+            if days == math.inf:
+                status = ELIGIBLE
+            elif rule.repeat_days is not None and days > rule.repeat_days:
+                status = OVERDUE
+            else:
+                continue
+            statuses[row, column] = max(statuses[row, column], status)
+
+    return statuses
+
+
+async def max_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    # The longest delay past `interval` of a sleeping task, until `stop` is set
+    lag = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(lag, time.perf_counter() - start - interval)
+    return lag
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+async def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'cohort.sqlite'}")
+        start = time.perf_counter()
+        await seed(engine, args.users, args.completed, args.booked)
+        print(f"seeded {args.users} users in {time.perf_counter() - start:.1f} s")
+
+        session_factory = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        eligibility = VaccineEligibility(refresh_interval=60)
+        async with session_factory() as db:
+            rules, names = await eligibility.rules(db)
+
+            stop = asyncio.Event()
+            probe = asyncio.create_task(max_loop_lag(stop))
+
+            start = time.perf_counter()
+            cohort = await load_cohort(db, list(names), TODAY)
+            load_seconds = time.perf_counter() - start
+
+            stop.set()
+            load_lag = await probe
+        await engine.dispose()
+
+    per_user, per_user_seconds = timed(per_user_statuses, cohort, eligibility)
+    vectorized, vectorized_seconds = timed(evaluate_cohort, cohort, rules)
+    assert np.array_equal(per_user, vectorized)
+
+    print(f"{'step':<24}{'seconds':>10}{'MiB':>10}")
+    print(f"{'load cohort':<24}{load_seconds:>10.2f}")
+    print(f"{'  longest loop block':<24}{load_lag:>10.2f}")
+    print(f"{'evaluate (per user)':<24}{per_user_seconds:>10.2f}")
+    print(f"{'evaluate (vectorized)':<24}{vectorized_seconds:>10.2f}")
+    for label, lines in (("ndjson", ndjson_lines), ("csv", csv_lines)):
+        start = time.perf_counter()
+        size = sum(len(chunk) for chunk in lines(cohort, vectorized, names))
+        print(
+            f"{'format (' + label + ')':<24}{time.perf_counter() - start:>10.2f}"
+            f"{size / 2**20:>10.1f}"
+        )
+
+    counts = {
+        "eligible": int((vectorized == ELIGIBLE).sum()),
+        "overdue": int((vectorized == OVERDUE).sum()),
+    }
+    print(
+        f"{len(cohort)} users, {counts['eligible']} eligible, "
+        f"{counts['overdue']} overdue"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    # Share of the users with a completed, or booked, dose of a vaccine
+    parser.add_argument("--completed", type=float, default=0.3)
+    parser.add_argument("--booked", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
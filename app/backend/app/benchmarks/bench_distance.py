@@ -0,0 +1,72 @@
+"""
+Compare ranking clinics by distance with one `geopy.distance.geodesic` call per
+clinic against the vectorized `services.distance.Locations`.
+
+Usage (from `app/backend/app`):
+
+    python -m benchmarks.bench_distance --clinics 1000 10000 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+from geopy.distance import geodesic
+from services.distance import Locations
+
+USER = (1.3394, 103.7185)
+
+
+def rank_with_geodesic(points: list[tuple[str, float, float]]) -> list[str]:
+    distances = {
+        id: geodesic(USER, (latitude, longitude)).km
+        for id, latitude, longitude in points
+    }
+    return sorted(distances, key=distances.get)
+
+
+def rank_with_locations(points: list[tuple[str, float, float]]) -> list[str]:
+    locations = Locations.from_points(points)
+    return [id for id, _ in locations.nearest(*USER)]
+
+
+def best_of(function, points, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(points)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(args: argparse.Namespace):
+    rng = np.random.default_rng(0)
+
+    print(f"{'clinics':>10}{'geodesic ms':>14}{'vectorized ms':>16}{'speedup':>10}")
+    for clinics in args.clinics:
+        # Random locations across Singapore
+        points = [
+            (str(i), latitude, longitude)
+            for i, (latitude, longitude) in enumerate(
+                zip(
+                    rng.uniform(1.2, 1.47, clinics).tolist(),
+                    rng.uniform(103.6, 104.05, clinics).tolist(),
+                )
+            )
+        ]
+
+        geodesic_time = best_of(rank_with_geodesic, points, args.repeat)
+        vectorized_time = best_of(rank_with_locations, points, args.repeat)
+
+        print(
+            f"{clinics:>10}{geodesic_time * 1000:>14.2f}"
+            f"{vectorized_time * 1000:>16.2f}"
+            f"{geodesic_time / vectorized_time:>9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clinics", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
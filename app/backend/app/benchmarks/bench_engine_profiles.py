@@ -0,0 +1,152 @@
+"""
+Compare read/write throughput of the "default" and "tuned" database engine profiles.
+
+Readers run the open-slot listing query used by `/bookings/available` while writers
+book slots in their own transactions, mimicking concurrent booking traffic.
+
+Usage (from `app/backend/app`):
+
+    python -m benchmarks.bench_engine_profiles --slots 20000 --readers 8 --writers 4
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from core.config import settings
+from models.database import Base, create_db_engine
+from models.models import BookingSlot, VaccineRecord
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+VACCINE_ID = str(uuid.uuid4())
+CLINIC_ID = str(uuid.uuid4())
+
+
+async def seed(engine: AsyncEngine, slots: int) -> list[str]:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+        start = datetime(2025, 1, 1, 8)
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "polyclinic_id": CLINIC_ID,
+                "vaccine_id": VACCINE_ID,
+                "datetime": start + timedelta(minutes=15 * i),
+            }
+            for i in range(slots)
+        ]
+        await conn.execute(insert(BookingSlot), rows)
+
+    return [row["id"] for row in rows]
+
+
+async def reader(session_factory: async_sessionmaker, deadline: float, stats: dict):
+    while time.perf_counter() < deadline:
+        try:
+            async with session_factory() as db:
+                stmt = (
+                    select(BookingSlot.id, BookingSlot.datetime)
+                    .where(
+                        BookingSlot.vaccine_id == VACCINE_ID, BookingSlot.is_available
+                    )
+                    .order_by(BookingSlot.datetime)
+                    .limit(50)
+                )
+                await db.execute(stmt)
+            stats["reads"] += 1
+        except OperationalError:
+            stats["errors"] += 1
+
+
+async def writer(
+    session_factory: async_sessionmaker,
+    deadline: float,
+    slot_ids: list[str],
+    stats: dict,
+):
+    while time.perf_counter() < deadline and slot_ids:
+        slot_id = slot_ids.pop()
+        try:
+            async with session_factory() as db:
+                async with db.begin():
+                    await db.execute(
+                        update(BookingSlot)
+                        .where(BookingSlot.id == slot_id)
+                        .values(status="booked", remaining=0)
+                    )
+                    db.add(
+                        VaccineRecord(
+                            user_id=str(uuid.uuid4()),
+                            booking_slot_id=slot_id,
+                            status="booked",
+                        )
+                    )
+            stats["writes"] += 1
+        except OperationalError:
+            stats["errors"] += 1
+
+
+async def run_profile(profile: str, args: argparse.Namespace, workdir: Path) -> dict:
+    config = settings.model_copy(
+        update={
+            "database_profile": profile,
+            "database_pool_size": args.readers + args.writers,
+        }
+    )
+    url = f"sqlite+aiosqlite:///{workdir / f'{profile}.sqlite'}"
+    engine = create_db_engine(url, config)
+
+    slot_ids = await seed(engine, args.slots)
+    session_factory = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    stats = {"reads": 0, "writes": 0, "errors": 0}
+    deadline = time.perf_counter() + args.duration
+
+    await asyncio.gather(
+        *(reader(session_factory, deadline, stats) for _ in range(args.readers)),
+        *(
+            writer(session_factory, deadline, slot_ids, stats)
+            for _ in range(args.writers)
+        ),
+    )
+    await engine.dispose()
+
+    return {
+        "profile": profile,
+        "reads/s": stats["reads"] / args.duration,
+        "writes/s": stats["writes"] / args.duration,
+        "errors": stats["errors"],
+    }
+
+
+async def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [
+            await run_profile(profile, args, Path(tmp))
+            for profile in ("default", "tuned")
+        ]
+
+    print(f"{'profile':<10}{'reads/s':>12}{'writes/s':>12}{'errors':>10}")
+    for result in results:
+        print(
+            f"{result['profile']:<10}{result['reads/s']:>12.1f}"
+            f"{result['writes/s']:>12.1f}{result['errors']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slots", type=int, default=20000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,143 @@
+"""
+Throughput of `/login` during a login storm, and the latency of an unrelated endpoint
+(`/`) meanwhile, with bcrypt run on the event loop ("inline") and in the password
+hashing thread pool ("pool").
+
+Inline, every login blocks the event loop for the whole bcrypt hash, so requests to
+any other endpoint wait behind the logins in flight. In the pool, the event loop only
+waits for I/O, and logins run up to `--concurrency` at a time.
+
+Usage (from `app/backend/app`):
+
+    python -m benchmarks.bench_password_hashing --clients 32 --duration 5
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import auth.oauth2
+import numpy as np
+from auth.password import PasswordHasher, hash_password, verify_password
+from benchmarks.bench_available_slots import seed
+from core.config import settings
+from httpx import ASGITransport, AsyncClient
+from main import app
+from models.database import create_db_engine, get_read_db
+from models.models import User
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+EMAIL = "bench@example.com"  # the user created by `seed`
+PASSWORD = "password123"
+
+
+class InlineHasher:
+    # bcrypt on the event loop, as before the thread pool
+    async def hash(self, password: str) -> str:
+        return hash_password(password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return verify_password(plain_password, hashed_password)
+
+
+async def log_in(client: AsyncClient, deadline: float, stats: dict):
+    while time.perf_counter() < deadline:
+        res = await client.post(
+            "/login", data={"username": EMAIL, "password": PASSWORD}
+        )
+        assert res.status_code == 200
+        stats["logins"] += 1
+
+
+async def probe(client: AsyncClient, scheduled: float, stats: dict):
+    # Latency from when the request is due, since a client does not wait for the
+    # event loop to be free before sending it
+    res = await client.get("/")
+    assert res.status_code == 200
+    stats["latencies"].append(time.perf_counter() - scheduled)
+
+
+async def probes(client: AsyncClient, deadline: float, stats: dict):
+    # A request to `/`, which does not touch bcrypt or the database, every 10 ms
+    start = time.perf_counter()
+    tasks = []
+    for i in range(int((deadline - start) / 0.01)):
+        scheduled = start + i * 0.01
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(probe(client, scheduled, stats)))
+
+    await asyncio.gather(*tasks)
+
+
+async def run(client: AsyncClient, args: argparse.Namespace) -> dict:
+    stats = {"logins": 0, "latencies": []}
+    deadline = time.perf_counter() + args.duration
+
+    await asyncio.gather(
+        probes(client, deadline, stats),
+        *(log_in(client, deadline, stats) for _ in range(args.clients)),
+    )
+
+    stats["rate"] = stats["logins"] / args.duration
+    return stats
+
+
+async def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'users.sqlite'}")
+        user = await seed(engine, 1, 1)
+
+        async with engine.begin() as conn:
+            await conn.execute(
+                update(User)
+                .filter_by(id=user.id)
+                .values(password=hash_password(PASSWORD))
+            )
+
+        session_factory = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+        async def _get_read_db():
+            async with session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_read_db] = _get_read_db
+
+        results = {}
+        hashers = {
+            "inline": InlineHasher(),
+            "pool": PasswordHasher(args.concurrency),
+        }
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            for name, hasher in hashers.items():
+                auth.oauth2.password_hasher = hasher
+                results[name] = await run(client, args)
+
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    print(f"{'bcrypt':<12}{'logins/s':>10}{'/ p50 (ms)':>12}{'/ p99 (ms)':>12}")
+    for name, stats in results.items():
+        latencies = np.array(stats["latencies"]) * 1000
+        print(
+            f"{name:<12}{stats['rate']:>10.1f}{np.percentile(latencies, 50):>12.1f}"
+            f"{np.percentile(latencies, 99):>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.password_hash_concurrency
+    )
+    asyncio.run(main(parser.parse_args()))
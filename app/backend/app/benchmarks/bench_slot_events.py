@@ -0,0 +1,133 @@
+"""
+Memory per idle subscriber of `/bookings/available/stream`, and the time to fan a
+slot change out to all of them.
+
+Each connection runs the endpoint's `StreamingResponse` as uvicorn does (i.e., with a
+task listening for the client's disconnect), minus the socket. Subscribers are spread
+over `--vaccines` vaccines, so a change only reaches the subscribers of its vaccine.
+
+Usage (from `app/backend/app`):
+
+    python -m benchmarks.bench_slot_events --subscribers 10000 --vaccines 10
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi.responses import StreamingResponse
+from services.slot_events import SLOT_TAKEN, SlotEventBroker
+
+SCOPE = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}}
+
+
+class Connection:
+    # The client side of a connection: counts the events received, until it
+    # disconnects
+    def __init__(self):
+        self.events = 0
+        self.received = asyncio.Event()
+        self._disconnected = asyncio.Event()
+
+    async def receive(self) -> dict:
+        await self._disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message: dict) -> None:
+        if message["type"] == "http.response.body" and message["body"].startswith(
+            b"event:"
+        ):
+            self.events += 1
+            self.received.set()
+
+    def disconnect(self) -> None:
+        self._disconnected.set()
+
+
+def make_slot(vaccine_id: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        id="slot",
+        polyclinic_id="polyclinic",
+        vaccine_id=vaccine_id,
+        datetime=datetime(2026, 1, 5, 9),
+        remaining=0,
+    )
+
+
+async def fan_out(
+    broker: SlotEventBroker, connections: list[Connection], vaccine_id: str
+) -> float:
+    # Seconds until every subscriber of the vaccine has been sent the change
+    for connection in connections:
+        connection.received.clear()
+
+    start = time.perf_counter()
+    broker.publish(SLOT_TAKEN, make_slot(vaccine_id))
+    await asyncio.gather(*(connection.received.wait() for connection in connections))
+    return time.perf_counter() - start
+
+
+async def main(args: argparse.Namespace):
+    broker = SlotEventBroker(max_queued=100, keepalive_interval=15)
+    vaccine_ids = [f"vaccine-{i}" for i in range(args.vaccines)]
+
+    # Step 1: Open the connections, and let every stream send its first comment. The
+    # clients are created beforehand, so that only the server side is measured
+    connections = [Connection() for _ in range(args.subscribers)]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    tasks = []
+    for i, connection in enumerate(connections):
+        subscription = broker.subscribe([vaccine_ids[i % args.vaccines]])
+        response = StreamingResponse(
+            broker.stream(subscription), media_type="text/event-stream"
+        )
+        tasks.append(
+            asyncio.create_task(response(SCOPE, connection.receive, connection.send))
+        )
+    await asyncio.sleep(0.5)
+
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    # Step 2: Fan a change out to the subscribers of one vaccine, and of none
+    subscribers = connections[:: args.vaccines]
+    one_vaccine = min(
+        [await fan_out(broker, subscribers, vaccine_ids[0]) for _ in range(5)]
+    )
+    start = time.perf_counter()
+    broker.publish(SLOT_TAKEN, make_slot("other"))
+    no_vaccine = time.perf_counter() - start
+
+    # Step 3: Disconnect every client, which unsubscribes its stream
+    for connection in connections:
+        connection.disconnect()
+    await asyncio.gather(*tasks)
+    assert broker.subscribers == 0
+
+    print(f"{'subscribers':<36}{args.subscribers:>12}")
+    print(f"{'memory (MiB)':<36}{allocated / 2**20:>12.1f}")
+    print(
+        f"{'memory per subscriber (KiB)':<36}{allocated / args.subscribers / 1024:>12.2f}"
+    )
+    print(
+        f"{f'fan-out to {len(subscribers)} subscribers (ms)':<36}{one_vaccine * 1000:>12.2f}"
+    )
+    print(f"{'publish with no subscribers (ms)':<36}{no_vaccine * 1000:>12.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--vaccines", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,112 @@
+"""
+Compare the throughput of `/bookings/available` when open slots are queried from the
+database and when they are looked up in the in-process slot inventory.
+
+Concurrent clients ask for the open slots of a random date range, as the router
+function would be called for each request.
+
+Usage (from `app/backend/app`):
+
+    python -m benchmarks.bench_slot_inventory --slots 200000 --clients 8
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from auth.oauth2 import load_principal
+from benchmarks.bench_available_slots import VACCINE_NAME, seed
+from core.config import settings
+from fastapi import Response
+from models.database import create_db_engine
+from routers.booking import get_available_booking_slots
+from services.inventory import slot_inventory
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+async def client(
+    session_factory: async_sessionmaker,
+    user,
+    deadline: float,
+    days: int,
+    rng: random.Random,
+    stats: dict,
+):
+    while time.perf_counter() < deadline:
+        start_datetime = datetime(2025, 1, 1) + timedelta(days=rng.randrange(days))
+        end_datetime = start_datetime + timedelta(days=rng.randint(1, 14))
+
+        async with session_factory() as db:
+            await get_available_booking_slots(
+                response=Response(),
+                vaccine_name=VACCINE_NAME,
+                start_datetime=start_datetime,
+                end_datetime=end_datetime,
+                polyclinic_limit=3,
+                timeslot_limit=5,
+                current_user=await load_principal(db, user.id),
+                db=db,
+            )
+        stats["requests"] += 1
+
+
+async def run(
+    session_factory: async_sessionmaker, user, args: argparse.Namespace
+) -> float:
+    # Slots are spread over the clinics, 120 per day (see `seed`)
+    days = max(1, args.slots // (args.clinics * 120))
+    rng = random.Random(0)
+    stats = {"requests": 0}
+    deadline = time.perf_counter() + args.duration
+
+    await asyncio.gather(
+        *(
+            client(session_factory, user, deadline, days, rng, stats)
+            for _ in range(args.clients)
+        )
+    )
+
+    return stats["requests"] / args.duration
+
+
+async def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        config = settings.model_copy(update={"database_pool_size": args.clients})
+        engine = create_db_engine(
+            f"sqlite+aiosqlite:///{Path(tmp) / 'slots.sqlite'}", config
+        )
+        user = await seed(engine, args.slots, args.clinics)
+
+        session_factory = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+        settings.slot_inventory_enabled = False
+        database = await run(session_factory, user, args)
+
+        settings.slot_inventory_enabled = True
+        start = time.perf_counter()
+        async with session_factory() as db:
+            await slot_inventory.load(db)
+        load_time = time.perf_counter() - start
+        inventory = await run(session_factory, user, args)
+
+        await engine.dispose()
+
+    print(f"{'source':<12}{'requests/s':>12}")
+    print(f"{'database':<12}{database:>12.1f}")
+    print(f"{'inventory':<12}{inventory:>12.1f}")
+    print(f"Inventory loaded {args.slots} slots in {load_time * 1000:.0f} ms.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slots", type=int, default=200000)
+    parser.add_argument("--clinics", type=int, default=30)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,113 @@
+"""
+Compare the throughput of `/bookings/schedule` when each booking commits its own
+transaction and when concurrent bookings are grouped into a single transaction by the
+write coalescer.
+
+Concurrent clients book distinct open slots, as the router function would be called
+for each request.
+
+Usage (from `app/backend/app`):
+
+    python -m benchmarks.bench_write_coalescing --clients 32 --synchronous FULL
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_available_slots import seed
+from core.config import settings
+from models.database import create_db_engine
+from models.models import BookingSlot
+from routers.booking import schedule_vaccination_slot
+from schemas.booking import ScheduleSlotRequest
+from services.write_coalescer import write_coalescer
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.future import select
+
+
+async def client(
+    session_factory: async_sessionmaker,
+    user,
+    slot_ids: list[str],
+    deadline: float,
+    stats: dict,
+):
+    while slot_ids and time.perf_counter() < deadline:
+        request = ScheduleSlotRequest(booking_slot_id=slot_ids.pop())
+
+        async with session_factory() as db:
+            await schedule_vaccination_slot(request=request, current_user=user, db=db)
+        stats["bookings"] += 1
+
+
+async def run(
+    session_factory: async_sessionmaker,
+    user,
+    slot_ids: list[str],
+    args: argparse.Namespace,
+) -> float:
+    stats = {"bookings": 0}
+    start = time.perf_counter()
+    deadline = start + args.duration
+
+    await asyncio.gather(
+        *(
+            client(session_factory, user, slot_ids, deadline, stats)
+            for _ in range(args.clients)
+        )
+    )
+
+    return stats["bookings"] / (time.perf_counter() - start)
+
+
+async def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        config = settings.model_copy(
+            update={
+                "database_pool_size": args.clients,
+                "sqlite_synchronous": args.synchronous,
+            }
+        )
+        engine = create_db_engine(
+            f"sqlite+aiosqlite:///{Path(tmp) / 'bookings.sqlite'}", config
+        )
+        user = await seed(engine, args.slots, args.clinics)
+
+        session_factory = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        write_coalescer.session_factory = session_factory
+        write_coalescer.window = args.window
+
+        async with session_factory() as db:
+            result = await db.execute(select(BookingSlot.id))
+            slot_ids = list(result.scalars())
+
+        results = {}
+        for coalescing in (False, True):
+            settings.booking_write_coalescing = coalescing
+            results[coalescing] = await run(session_factory, user, slot_ids, args)
+
+        await engine.dispose()
+
+    print(f"{'coalescing':<12}{'bookings/s':>12}")
+    print(f"{'off':<12}{results[False]:>12.1f}")
+    print(f"{'on':<12}{results[True]:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slots", type=int, default=100000)
+    parser.add_argument("--clinics", type=int, default=30)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--window", type=float, default=settings.booking_write_window)
+    parser.add_argument(
+        "--synchronous",
+        choices=["OFF", "NORMAL", "FULL"],
+        default=settings.sqlite_synchronous,
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -1,13 +1,106 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 # TODO: Store in Azure Key Vault
 
 
 class Settings(BaseSettings):
+    # The principal cache and versions, clinic locator, vaccine eligibility, slot
+    # inventory and availability updates below are kept in process: each worker only
+    # sees the changes made through itself, until its copy expires or is reloaded
+
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int = 60
     refresh_token_expire_days: int = 2
+    # Claims-rich access tokens (i.e., embedding the date of birth, gender and address
+    # coordinates of the user, so that read endpoints do not look them up). Claims
+    # older than `access_token_claims_max_age` seconds, or read before an update of
+    # the user, are looked up again
+    access_token_claims: bool = False
+    access_token_claims_max_age: float = 900  # seconds
+    # Number of bcrypt hashes (i.e., signups and logins) computed at once, off the
+    # event loop
+    password_hash_concurrency: int = 4
+
+    # Principal cache (i.e., the users authenticated by `get_current_user`, kept in
+    # process)
+    principal_cache_enabled: bool = True
+    principal_cache_ttl: float = 60  # seconds
+    principal_cache_max_size: int = 10000
+
+    # Database engine
+    database_url: str = "sqlite+aiosqlite:///../../../data/vaccination_db.sqlite"
+    # "tuned" applies the SQLite pragmas below on every new connection,
+    # "default" leaves SQLAlchemy/SQLite defaults untouched
+    database_profile: Literal["default", "tuned"] = "tuned"
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_recycle: int = 3600  # seconds, -1 to disable
+    database_pool_timeout: int = 30  # seconds
+    # Read-only engine used by `get_read_db`, defaults to a read-only (i.e.,
+    # `mode=ro`) connection to `database_url`
+    read_database_url: str | None = None
+    database_read_pool_size: int = 10
+    database_read_max_overflow: int = 20
+
+    # SQLite pragmas (only applied with the "tuned" profile)
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size: int = -65536  # negative values are in KiB (i.e., 64 MiB)
+    sqlite_mmap_size: int = 268435456  # bytes (i.e., 256 MiB)
+    sqlite_busy_timeout: int = 5000  # milliseconds
+    sqlite_temp_store: str = "MEMORY"
+
+    # Clinic locator (i.e., the in-process spatial index behind `/clinics/nearest`)
+    clinic_locator_refresh_interval: float = 300  # seconds
+
+    # Vaccine eligibility (i.e., the in-process rules engine behind
+    # `/vaccines/recommendations`), checked for changed criteria at this interval
+    vaccine_eligibility_refresh_interval: float = 60  # seconds
+
+    # Slot inventory (i.e., the in-process index of open slots behind
+    # `/bookings/available`). When disabled, open slots are queried from the database
+    slot_inventory_enabled: bool = True
+    slot_inventory_refresh_interval: float = 60  # seconds
+
+    # Availability updates (i.e., the server-sent events of
+    # `/bookings/available/stream`). A subscriber that falls more than
+    # `slot_events_max_queued` events behind is disconnected
+    slot_events_max_queued: int = 100
+    slot_events_keepalive_interval: float = 15  # seconds
+
+    # Booking slot source. "stored" lists the `BookingSlots` rows, "rules" computes
+    # open slots from the `ScheduleRules` of each clinic, up to
+    # `schedule_rules_horizon_days` ahead, and stores a slot only once it is booked
+    booking_slot_mode: Literal["stored", "rules"] = "stored"
+    schedule_rules_horizon_days: int = 90
+
+    # Booking write coalescing (i.e., group commit of concurrent schedule, cancel and
+    # reschedule operations). When disabled, each request commits on its own
+    booking_write_coalescing: bool = False
+    booking_write_window: float = 0.002  # seconds
+    booking_write_max_batch: int = 64
+
+    # Slot holds (i.e., temporary reservations placed with `/bookings/hold`), kept in
+    # process ("memory") or in the `SlotHolds` table to share them between workers
+    slot_hold_backend: Literal["memory", "database"] = "memory"
+    slot_hold_ttl: float = 120  # seconds
+
+    # Admission control (i.e., the waiting room in front of the booking write
+    # endpoints). At most `booking_admission_concurrency` writes run at once, in
+    # arrival order, and requests beyond `booking_admission_max_waiting` get a 503
+    booking_admission_enabled: bool = True
+    booking_admission_concurrency: int = 16
+    booking_admission_max_waiting: int = 500
+
+    # Admin API (e.g., publishing clinic calendars), only enabled when a key is set.
+    # Clients send it in the `X-Admin-API-Key` header
+    admin_api_key: str | None = None
+    # Most slots `/admin/slots/generate` writes in one request (i.e., one write
+    # transaction). Larger calendars are generated with the `slot_generator` command
+    slot_generation_max_rows: int = 200_000
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,110 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("app.db")
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0  # seconds
+
+    def server_timing(self, total: float | None = None) -> str:
+        unit = "query" if self.count == 1 else "queries"
+        metrics = [f'db;dur={self.duration * 1000:.3f};desc="{self.count} {unit}"']
+        if total is not None:
+            metrics.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(metrics)
+
+
+# Statistics of the request (or `track_queries` block) being served in this context
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # The start time is kept on the statement's execution context, which is dropped
+    # with it, so that statements that raise (and never reach `after_cursor_execute`)
+    # leave nothing behind on the pooled connection
+    if context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    start = getattr(context, "_query_start_time", None)
+
+    if stats is not None and start is not None:
+        stats.count += 1
+        stats.duration += time.perf_counter() - start
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        with track_queries() as stats:
+
+            async def send_with_server_timing(message: Message):
+                nonlocal status_code
+
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing",
+                        stats.server_timing(time.perf_counter() - start),
+                    )
+
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_server_timing)
+            finally:
+                logger.info(
+                    json.dumps(
+                        {
+                            "event": "request_db_stats",
+                            "method": scope["method"],
+                            "path": scope["path"],
+                            "status": status_code,
+                            "db_queries": stats.count,
+                            "db_time_ms": round(stats.duration * 1000, 3),
+                            "total_time_ms": round(
+                                (time.perf_counter() - start) * 1000, 3
+                            ),
+                        }
+                    )
+                )
@@ -0,0 +1,52 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from fastapi import HTTPException, status
+
+# Largest page size accepted by paginated endpoints
+MAX_PAGE_SIZE = 100
+
+# Response header carrying the cursor of the next page, if there is one
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """
+    Opaque keyset cursor, i.e. the (datetime, id) of the last item of a page. Any
+    state a listing needs to return consistent pages (e.g., the polyclinics chosen
+    for the first page) travels with it.
+    """
+
+    datetime: datetime
+    id: str
+    polyclinic_ids: tuple[str, ...] = field(default_factory=tuple)
+
+    def encode(self) -> str:
+        payload = {"datetime": self.datetime.isoformat(), "id": self.id}
+        if self.polyclinic_ids:
+            payload["polyclinic_ids"] = list(self.polyclinic_ids)
+
+        data = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, cursor: str) -> "Cursor":
+        try:
+            data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(data)
+
+            return cls(
+                datetime=datetime.fromisoformat(payload["datetime"]),
+                id=str(payload["id"]),
+                polyclinic_ids=tuple(
+                    str(id) for id in payload.get("polyclinic_ids", [])
+                ),
+            )
+        except (binascii.Error, ValueError, TypeError, KeyError, AttributeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
+            )
@@ -1,9 +1,12 @@
 import asyncio
 
 import uvicorn
+from core.instrumentation import QueryStatsMiddleware
+from core.pagination import NEXT_CURSOR_HEADER
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 from routers import (
+    admin,
     authentication,
     booking,
     chat,
@@ -32,8 +35,12 @@ def create_main_app():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Server-Timing", NEXT_CURSOR_HEADER],
     )
 
+    # Report the number of SQL statements and database time of each request
+    app.add_middleware(QueryStatsMiddleware)
+
     app.include_router(authentication.router)
     app.include_router(booking.router)
     app.include_router(clinic.router)
@@ -41,6 +48,7 @@ def create_main_app():
     app.include_router(user.router)
     app.include_router(vaccine.router)
     app.include_router(dummy_orchestrator.router)
+    app.include_router(admin.router)
 
     return app
 
@@ -1,10 +1,108 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from core.config import Settings, settings
+from core.instrumentation import instrument_engine
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import declarative_base
 
 # Database connection (existing SQLite file)
-DATABASE_URL = "sqlite+aiosqlite:///../../../data/vaccination_db.sqlite"
+DATABASE_URL = settings.database_url
+
+
+def get_read_only_url(url: str) -> str:
+    db_url = make_url(url)
+
+    # Open the same SQLite file through a `mode=ro` URI, so that connections from
+    # this engine can never take the write lock
+    if db_url.database and not db_url.database.startswith("file:"):
+        db_url = db_url.set(
+            database=f"file:{db_url.database}",
+            query={**db_url.query, "mode": "ro", "uri": "true"},
+        )
+
+    return db_url.render_as_string(hide_password=False)
+
+
+def get_sqlite_pragmas(
+    config: Settings = settings, read_only: bool = False
+) -> dict[str, str | int]:
+    if config.database_profile == "default":
+        return {}
+
+    pragmas = {
+        "journal_mode": config.sqlite_journal_mode,
+        "synchronous": config.sqlite_synchronous,
+        "cache_size": config.sqlite_cache_size,
+        "mmap_size": config.sqlite_mmap_size,
+        "busy_timeout": config.sqlite_busy_timeout,
+        "temp_store": config.sqlite_temp_store,
+    }
+
+    if read_only:
+        # The journal mode is persisted in the database file and can only be
+        # changed by a writer
+        pragmas.pop("journal_mode")
+        pragmas["query_only"] = "ON"
+
+    return pragmas
+
+
+def create_db_engine(
+    url: str = DATABASE_URL,
+    config: Settings = settings,
+    read_only: bool = False,
+    **kwargs,
+) -> AsyncEngine:
+    engine_kwargs = {"echo": False}
+
+    # In-memory SQLite databases use a single static connection, so pool sizing
+    # only applies to file-based databases
+    if make_url(url).database not in (None, "", ":memory:"):
+        engine_kwargs.update(
+            pool_size=(
+                config.database_read_pool_size
+                if read_only
+                else config.database_pool_size
+            ),
+            max_overflow=(
+                config.database_read_max_overflow
+                if read_only
+                else config.database_max_overflow
+            ),
+            pool_recycle=config.database_pool_recycle,
+            pool_timeout=config.database_pool_timeout,
+        )
+
+    engine_kwargs.update(kwargs)
+    engine = create_async_engine(url, **engine_kwargs)
+
+    pragmas = get_sqlite_pragmas(config, read_only=read_only)
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+    if pragmas:
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    # Count statements and database time per request (see `QueryStatsMiddleware`)
+    instrument_engine(engine)
+
+    return engine
+
+
+# Read-only database connection (same SQLite file unless configured otherwise)
+READ_DATABASE_URL = settings.read_database_url or get_read_only_url(DATABASE_URL)
+
+engine = create_db_engine()
+read_engine = create_db_engine(READ_DATABASE_URL, read_only=True)
 
 # Session creation
 AsyncSessionLocal = async_sessionmaker(
@@ -15,6 +113,14 @@
     expire_on_commit=False,
 )
 
+ReadAsyncSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Base class for ORM models
 Base = declarative_base()
 
@@ -23,3 +129,10 @@ async def get_db() -> AsyncSession:  # type: ignore
     async with AsyncSessionLocal() as db:
         async with db.begin():
             yield db
+
+
+async def get_read_db() -> AsyncSession:  # type: ignore
+    # No explicit transaction: reads run in SQLite's autocommit mode and never
+    # serialize against the writer
+    async with ReadAsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,79 @@
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Versioned migrations are plain SQL files named `<version>_<description>.sql`. The
+# schema version of a database is tracked with SQLite's `PRAGMA user_version`.
+VERSIONS_DIR = Path(__file__).parent / "versions"
+
+_FILENAME_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+    @property
+    def script(self) -> str:
+        # Each migration runs in its own transaction and bumps the schema version
+        # as its last statement, so a failed migration leaves no partial changes
+        return (
+            "BEGIN;\n"
+            f"{self.path.read_text()}\n"
+            f"PRAGMA user_version = {self.version};\n"
+            "COMMIT;"
+        )
+
+
+def get_migrations() -> list[Migration]:
+    migrations = []
+
+    for path in VERSIONS_DIR.iterdir():
+        match = _FILENAME_PATTERN.match(path.name)
+        if match:
+            migrations.append(Migration(int(match[1]), match[2], path))
+
+    return sorted(migrations, key=lambda migration: migration.version)
+
+
+def get_head_version() -> int:
+    migrations = get_migrations()
+    return migrations[-1].version if migrations else 0
+
+
+async def get_schema_version(conn: AsyncConnection) -> int:
+    result = await conn.execute(text("PRAGMA user_version"))
+    return result.scalar()
+
+
+async def set_schema_version(conn: AsyncConnection, version: int) -> None:
+    # PRAGMA statements cannot be parameterized
+    await conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+
+async def apply_migrations(
+    conn: AsyncConnection, target: int | None = None
+) -> list[Migration]:
+    current = await get_schema_version(conn)
+    target = get_head_version() if target is None else target
+
+    raw_connection = await conn.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+
+    applied = []
+
+    for migration in get_migrations():
+        if current < migration.version <= target:
+            try:
+                await driver_connection.executescript(migration.script)
+            except Exception:
+                await driver_connection.rollback()
+                raise
+            applied.append(migration)
+
+    return applied
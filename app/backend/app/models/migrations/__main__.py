@@ -0,0 +1,40 @@
+import argparse
+import asyncio
+
+from models.database import DATABASE_URL, create_db_engine
+from models.migrations import (
+    apply_migrations,
+    get_head_version,
+    get_schema_version,
+    set_schema_version,
+)
+
+
+async def main(args: argparse.Namespace):
+    engine = create_db_engine(args.database_url)
+
+    async with engine.connect() as conn:
+        current = await get_schema_version(conn)
+
+        if args.stamp:
+            # For databases created from `schema.sql` or the ORM models, which are
+            # already at the latest schema
+            await set_schema_version(conn, get_head_version())
+            await conn.commit()
+            print(f"Stamped schema version {get_head_version()}.")
+        else:
+            applied = await apply_migrations(conn, args.target)
+            for migration in applied:
+                print(f"Applied {migration.path.name}")
+            version = await get_schema_version(conn)
+            print(f"Schema version {current} -> {version}.")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply database migrations.")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--target", type=int, default=None)
+    parser.add_argument("--stamp", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,8 @@
+-- Indexes for the columns filtered on by the booking, record, clinic and user routers
+CREATE INDEX IF NOT EXISTS ix_BookingSlots_vaccine_id_datetime ON BookingSlots (vaccine_id, datetime);
+
+CREATE INDEX IF NOT EXISTS ix_VaccineRecords_user_id ON VaccineRecords (user_id);
+
+CREATE INDEX IF NOT EXISTS ix_Addresses_postal_code ON Addresses (postal_code);
+
+CREATE INDEX IF NOT EXISTS ix_Clinics_address_id ON Clinics (address_id);
@@ -0,0 +1,11 @@
+-- Persist the availability of booking slots instead of computing it from VaccineRecords
+ALTER TABLE BookingSlots ADD COLUMN status TEXT NOT NULL DEFAULT 'available';
+
+UPDATE BookingSlots
+SET status = 'booked'
+WHERE id IN (SELECT booking_slot_id FROM VaccineRecords);
+
+-- Open slots are listed with the partial index instead
+DROP INDEX IF EXISTS ix_BookingSlots_vaccine_id_datetime;
+
+CREATE INDEX IF NOT EXISTS ix_BookingSlots_available_vaccine_id_datetime ON BookingSlots (vaccine_id, datetime) WHERE status = 'available';
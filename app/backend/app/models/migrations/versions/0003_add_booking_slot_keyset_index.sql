@@ -0,0 +1,8 @@
+-- Slot times written by the ORM used to carry microseconds (e.g., "2025-04-01 09:00:00.000000"),
+-- which do not compare correctly with those seeded without them. Store all of them as "YYYY-MM-DD HH:MM:SS"
+UPDATE BookingSlots SET datetime = strftime('%Y-%m-%d %H:%M:%S', datetime) WHERE datetime LIKE '%.%';
+
+-- Open slots are paginated on (datetime, id), so the id is added to the partial index
+DROP INDEX IF EXISTS ix_BookingSlots_available_vaccine_id_datetime;
+
+CREATE INDEX IF NOT EXISTS ix_BookingSlots_available_vaccine_id_datetime_id ON BookingSlots (vaccine_id, datetime, id) WHERE status = 'available';
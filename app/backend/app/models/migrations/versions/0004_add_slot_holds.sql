@@ -0,0 +1,12 @@
+-- Temporary holds on booking slots, shared between workers (see `slot_hold_backend`)
+CREATE TABLE IF NOT EXISTS SlotHolds (
+    booking_slot_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    expires_at DATETIME NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (booking_slot_id) REFERENCES BookingSlots(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS ix_SlotHolds_expires_at ON SlotHolds (expires_at);
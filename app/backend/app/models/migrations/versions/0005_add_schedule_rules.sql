@@ -0,0 +1,19 @@
+-- Recurring calendars of vaccines at polyclinics, listed without storing their slots
+-- (see `booking_slot_mode`)
+CREATE TABLE IF NOT EXISTS ScheduleRules (
+    id TEXT PRIMARY KEY,
+    polyclinic_id TEXT NOT NULL,
+    vaccine_id TEXT NOT NULL,
+    weekdays VARCHAR NOT NULL,
+    start_time TIME NOT NULL,
+    end_time TIME NOT NULL,
+    interval_minutes INTEGER NOT NULL,
+    valid_from DATE NOT NULL,
+    valid_until DATE,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (polyclinic_id) REFERENCES Clinics(id) ON DELETE CASCADE,
+    FOREIGN KEY (vaccine_id) REFERENCES Vaccines(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS ix_ScheduleRules_vaccine_id ON ScheduleRules (vaccine_id);
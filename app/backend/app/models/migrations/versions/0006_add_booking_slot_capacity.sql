@@ -0,0 +1,35 @@
+-- A booking slot holds up to `capacity` appointments, `remaining` of which are still
+-- open. The status stays "available" until no place remains, so the partial index of
+-- open slots is unchanged
+ALTER TABLE BookingSlots ADD COLUMN capacity INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE BookingSlots ADD COLUMN remaining INTEGER NOT NULL DEFAULT 1 CHECK (remaining BETWEEN 0 AND capacity);
+
+UPDATE BookingSlots
+SET remaining = 0
+WHERE status = 'booked';
+
+ALTER TABLE ScheduleRules ADD COLUMN capacity INTEGER NOT NULL DEFAULT 1;
+
+-- Several vaccine records may now reference a slot, but only one per user. SQLite
+-- cannot drop the UNIQUE(booking_slot_id) constraint, so the table is rebuilt
+CREATE TABLE VaccineRecords_new (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    booking_slot_id TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE,
+    FOREIGN KEY (booking_slot_id) REFERENCES BookingSlots(id) ON DELETE CASCADE,
+    UNIQUE (booking_slot_id, user_id)
+);
+
+INSERT INTO VaccineRecords_new (id, user_id, booking_slot_id, status, created_at, updated_at)
+SELECT id, user_id, booking_slot_id, status, created_at, updated_at
+FROM VaccineRecords;
+
+DROP TABLE VaccineRecords;
+
+ALTER TABLE VaccineRecords_new RENAME TO VaccineRecords;
+
+CREATE INDEX IF NOT EXISTS ix_VaccineRecords_user_id ON VaccineRecords (user_id);
@@ -0,0 +1,23 @@
+-- A hold now reserves one place of a booking slot, so several users may hold places
+-- of the same slot, but only one each. SQLite cannot change a primary key, so the
+-- table is rebuilt
+CREATE TABLE SlotHolds_new (
+    booking_slot_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    expires_at DATETIME NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (booking_slot_id, user_id),
+    FOREIGN KEY (booking_slot_id) REFERENCES BookingSlots(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE
+);
+
+INSERT INTO SlotHolds_new (booking_slot_id, user_id, expires_at, created_at, updated_at)
+SELECT booking_slot_id, user_id, expires_at, created_at, updated_at
+FROM SlotHolds;
+
+DROP TABLE SlotHolds;
+
+ALTER TABLE SlotHolds_new RENAME TO SlotHolds;
+
+CREATE INDEX IF NOT EXISTS ix_SlotHolds_expires_at ON SlotHolds (expires_at);
@@ -2,16 +2,24 @@
 
 from models.database import Base
 from sqlalchemy import (
+    CheckConstraint,
     Column,
     Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
+    Time,
+    UniqueConstraint,
     func,
+    literal,
+    text,
 )
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.ext.asyncio import AsyncAttrs
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 
 
@@ -64,7 +72,7 @@ class Clinic(AsyncAttrs, Base):
         default=lambda: str(uuid.uuid4()),
     )
     address_id = Column(
-        "address_id", String, ForeignKey("Addresses.id"), nullable=False
+        "address_id", String, ForeignKey("Addresses.id"), nullable=False, index=True
     )
     name = Column("name", String, nullable=False)
     type = Column("type", String, nullable=False)
@@ -94,7 +102,7 @@ class Address(AsyncAttrs, Base):
         nullable=False,
         default=lambda: str(uuid.uuid4()),
     )
-    postal_code = Column("postal_code", String, nullable=False)
+    postal_code = Column("postal_code", String, nullable=False, index=True)
     address = Column("address", String, nullable=False)
     latitude = Column("latitude", Numeric(9, 6), nullable=False)
     longitude = Column("longitude", Numeric(9, 6), nullable=False)
@@ -141,6 +149,7 @@ class Vaccine(AsyncAttrs, Base):
 
 class VaccineCriteria(AsyncAttrs, Base):
     __tablename__ = "VaccineCriteria"
+    __table_args__ = (UniqueConstraint("vaccine_id", "age_criteria"),)
 
     id = Column(
         "id",
@@ -169,8 +178,33 @@ class VaccineCriteria(AsyncAttrs, Base):
     vaccine = relationship("Vaccine", back_populates="vaccine_criterias")
 
 
+# Slot times are stored on SQLite as "YYYY-MM-DD HH:MM:SS" text, like in data.sql, so
+# that every stored time compares correctly with the times bound in keyset queries
+SLOT_DATETIME = DateTime().with_variant(
+    sqlite.DATETIME(
+        storage_format=(
+            "%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+        )
+    ),
+    "sqlite",
+)
+
+
 class BookingSlot(AsyncAttrs, Base):
     __tablename__ = "BookingSlots"
+    __table_args__ = (
+        UniqueConstraint("polyclinic_id", "vaccine_id", "datetime"),
+        # Only open slots are indexed, so listing them is a range scan over the open
+        # slots of a vaccine, however many slots have been booked. The id makes the
+        # (datetime, id) keyset of paginated listings part of the index
+        Index(
+            "ix_BookingSlots_available_vaccine_id_datetime_id",
+            "vaccine_id",
+            "datetime",
+            "id",
+            sqlite_where=text("status = 'available'"),
+        ),
+    )
 
     id = Column(
         "id",
@@ -183,7 +217,29 @@ class BookingSlot(AsyncAttrs, Base):
         "polyclinic_id", String, ForeignKey("Clinics.id"), nullable=False
     )
     vaccine_id = Column("vaccine_id", String, ForeignKey("Vaccines.id"), nullable=False)
-    datetime = Column("datetime", DateTime, nullable=False)
+    datetime = Column("datetime", SLOT_DATETIME, nullable=False)
+    # Either "available" or "booked" (i.e., no place remains), kept in sync with
+    # `remaining` by the booking router
+    status = Column(
+        "status",
+        String,
+        nullable=False,
+        default="available",
+        server_default="available",
+    )
+    # A slot holds up to `capacity` appointments (i.e., vaccine records), `remaining`
+    # of which are still open
+    capacity = Column(
+        "capacity", Integer, nullable=False, default=1, server_default="1"
+    )
+    remaining = Column(
+        "remaining",
+        Integer,
+        CheckConstraint("remaining BETWEEN 0 AND capacity"),
+        nullable=False,
+        default=1,
+        server_default="1",
+    )
     created_at = Column(
         "created_at", DateTime, server_default=func.now(), nullable=False
     )
@@ -197,11 +253,95 @@ class BookingSlot(AsyncAttrs, Base):
 
     polyclinic = relationship("Clinic", back_populates="booking_slots")
     vaccine = relationship("Vaccine", back_populates="booking_slots")
-    vaccine_record = relationship("VaccineRecord", back_populates="booking_slot")
+    vaccine_records = relationship("VaccineRecord", back_populates="booking_slot")
+
+    @hybrid_property
+    def is_available(self) -> bool:
+        return self.status == "available"
+
+    @is_available.expression
+    def is_available(cls):
+        # SQLite only uses a partial index when the query repeats its condition
+        # literally, so the status is rendered inline instead of as a parameter
+        return cls.status == literal("available", literal_execute=True)
+
+
+class ScheduleRule(AsyncAttrs, Base):
+    __tablename__ = "ScheduleRules"
+
+    # A recurring calendar of a vaccine at a polyclinic. With
+    # `booking_slot_mode="rules"`, its slots are listed without being stored, and a
+    # `BookingSlot` is only created when one is booked (see `services/schedule_rules.py`)
+    id = Column(
+        "id",
+        String,
+        primary_key=True,
+        nullable=False,
+        default=lambda: str(uuid.uuid4()),
+    )
+    polyclinic_id = Column(
+        "polyclinic_id", String, ForeignKey("Clinics.id"), nullable=False
+    )
+    vaccine_id = Column(
+        "vaccine_id", String, ForeignKey("Vaccines.id"), nullable=False, index=True
+    )
+    # Comma-separated weekdays, from 0 (Monday) to 6 (Sunday)
+    weekdays = Column("weekdays", String, nullable=False)
+    start_time = Column("start_time", Time, nullable=False)
+    end_time = Column("end_time", Time, nullable=False)
+    interval_minutes = Column("interval_minutes", Integer, nullable=False)
+    valid_from = Column("valid_from", Date, nullable=False)
+    valid_until = Column("valid_until", Date)  # open-ended if NULL
+    # Appointments per slot, see `BookingSlot.capacity`
+    capacity = Column(
+        "capacity", Integer, nullable=False, default=1, server_default="1"
+    )
+    created_at = Column(
+        "created_at", DateTime, server_default=func.now(), nullable=False
+    )
+    updated_at = Column(
+        "updated_at",
+        DateTime,
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+    polyclinic = relationship("Clinic")
+
+
+class SlotHold(AsyncAttrs, Base):
+    __tablename__ = "SlotHolds"
+
+    # One hold (i.e., place) per slot and user, see `services/holds.py`
+    booking_slot_id = Column(
+        "booking_slot_id",
+        String,
+        ForeignKey("BookingSlots.id"),
+        primary_key=True,
+        nullable=False,
+    )
+    user_id = Column(
+        "user_id", String, ForeignKey("Users.id"), primary_key=True, nullable=False
+    )
+    expires_at = Column("expires_at", DateTime, nullable=False, index=True)
+    created_at = Column(
+        "created_at", DateTime, server_default=func.now(), nullable=False
+    )
+    updated_at = Column(
+        "updated_at",
+        DateTime,
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
 
 
 class VaccineRecord(AsyncAttrs, Base):
     __tablename__ = "VaccineRecords"
+    # A slot may have several records (see `BookingSlot.capacity`), but only one per
+    # user. The constraint's index also serves lookups by slot
+    __table_args__ = (UniqueConstraint("booking_slot_id", "user_id"),)
 
     id = Column(
         "id",
@@ -210,7 +350,9 @@ class VaccineRecord(AsyncAttrs, Base):
         nullable=False,
         default=lambda: str(uuid.uuid4()),
     )
-    user_id = Column("user_id", String, ForeignKey("Users.id"), nullable=False)
+    user_id = Column(
+        "user_id", String, ForeignKey("Users.id"), nullable=False, index=True
+    )
     booking_slot_id = Column(
         "booking_slot_id", String, ForeignKey("BookingSlots.id"), nullable=False
     )
@@ -227,4 +369,4 @@ class VaccineRecord(AsyncAttrs, Base):
     )
 
     user = relationship("User", back_populates="vaccine_records")
-    booking_slot = relationship("BookingSlot", back_populates="vaccine_record")
+    booking_slot = relationship("BookingSlot", back_populates="vaccine_records")
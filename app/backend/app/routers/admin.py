@@ -0,0 +1,140 @@
+from datetime import date
+from typing import Literal
+
+from auth.api_key import verify_admin_api_key
+from core.config import settings
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from models.database import get_db, get_read_db
+from models.models import ScheduleRule
+from schemas.booking import (
+    GenerateSlotsRequest,
+    GenerateSlotsResponse,
+    ScheduleRuleRequest,
+    ScheduleRuleResponse,
+)
+from services.cohort import csv_lines, evaluate_cohort, load_cohort, ndjson_lines
+from services.eligibility import vaccine_eligibility
+from services.inventory import slot_inventory
+from services.schedule_rules import create_schedule_rule
+from services.slot_generator import count_slots, generate_slots
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(verify_admin_api_key)],
+)
+
+
+@router.post(
+    "/slots/generate",
+    status_code=status.HTTP_201_CREATED,
+    response_model=GenerateSlotsResponse,
+)
+async def generate_booking_slots(
+    request: GenerateSlotsRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    # Step 1: Bound the write transaction (and the time SQLite's writer lock is held)
+    rows = count_slots(request.templates, request.start_date, request.end_date)
+    if rows > settings.slot_generation_max_rows:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"Too many slots ({rows}, at most "
+                f"{settings.slot_generation_max_rows} per request). Use a shorter "
+                "date range or the slot_generator command."
+            ),
+        )
+
+    # Step 2: Write the slots
+    try:
+        generation = await generate_slots(
+            db, request.templates, request.start_date, request.end_date
+        )
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+
+    await db.commit()
+
+    # The new open slots are picked up on the next availability lookup
+    if generation.created:
+        slot_inventory.invalidate()
+
+    return GenerateSlotsResponse(
+        created=generation.created,
+        skipped=generation.skipped,
+        seconds=generation.seconds,
+        rows_per_second=generation.rows_per_second,
+    )
+
+
+@router.post(
+    "/schedule-rules",
+    status_code=status.HTTP_201_CREATED,
+    response_model=ScheduleRuleResponse,
+)
+async def create_booking_schedule_rule(
+    request: ScheduleRuleRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        rule = await create_schedule_rule(db, request)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+
+    await db.commit()
+
+    return ScheduleRuleResponse(**request.model_dump(), id=rule.id)
+
+
+@router.delete(
+    "/schedule-rules/{rule_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def delete_booking_schedule_rule(
+    rule_id: str,
+    db: AsyncSession = Depends(get_db),
+):
+    # Slots already booked from the rule are kept
+    result = await db.execute(delete(ScheduleRule).where(ScheduleRule.id == rule_id))
+
+    if not result.rowcount:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Schedule rule with id {rule_id} not found.",
+        )
+
+    await db.commit()
+
+
+@router.get("/cohorts/eligibility")
+async def get_cohort_eligibility(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    as_of: date | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    # Step 1: Load every user and their doses as columns, and evaluate the criteria of
+    # every vaccine over all of them at once, off the event loop
+    today = as_of or date.today()
+    rules, vaccine_names = await vaccine_eligibility.rules(db)
+    cohort = await load_cohort(db, list(vaccine_names), today)
+    statuses = await run_in_threadpool(evaluate_cohort, cohort, rules)
+
+    # Step 2: Stream a row per user and vaccine they are eligible for or overdue on
+    if format == "csv":
+        return StreamingResponse(
+            csv_lines(cohort, statuses, vaccine_names),
+            media_type="text/csv",
+            headers={
+                "Content-Disposition": 'attachment; filename="cohort_eligibility.csv"'
+            },
+        )
+
+    return StreamingResponse(
+        ndjson_lines(cohort, statuses, vaccine_names),
+        media_type="application/x-ndjson",
+    )
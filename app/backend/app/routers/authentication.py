@@ -4,16 +4,19 @@
     ACCESS_TOKEN_EXPIRE_MINUTES,
     authenticate_user,
     create_access_token,
+    load_principal,
 )
-from auth.password import hash_password, verify_password
+from auth.password import password_hasher
+from core.config import settings
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from models.database import get_db
+from models.database import get_db, get_read_db
 from models.models import Address, User
 from schemas.oauth2 import Token
 from schemas.user import UserCreate, UserCreateResponse
-from sqlalchemy import or_
+from sqlalchemy import exists, insert, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -25,10 +28,17 @@
 )
 async def signup(user: UserCreate, db: AsyncSession = Depends(get_db)):
 
-    stmt = select(User).filter(or_(User.email == user.email, User.nric == user.nric))
+    # Step 1: Check for an existing user and look up the address in a single query
+    stmt = select(
+        exists().where(or_(User.email == user.email, User.nric == user.nric)),
+        select(Address.id)
+        .filter_by(postal_code=user.postal_code)
+        .limit(1)
+        .scalar_subquery(),
+    )
 
     result = await db.execute(stmt)
-    existing_user = result.scalars().first()
+    existing_user, address_id = result.one()
 
     if existing_user:
         raise HTTPException(
@@ -42,31 +52,25 @@ async def signup(user: UserCreate, db: AsyncSession = Depends(get_db)):
             detail="Password and password confirmation do not match.",
         )
 
-    stmt = select(Address).filter_by(postal_code=user.postal_code)
+    # Step 2: Hash the password, off the event loop
+    data = user.model_dump(exclude={"postal_code", "password_confirm"})
+    data["password"] = await password_hasher.hash(user.password)
 
-    result = await db.execute(stmt)
-    address = result.scalars().first()
-
-    # Hash the password
-    hashed_password = hash_password(user.password)
-    # Set password to hashed password
-    user.password = hashed_password
-
-    data = user.model_dump()
-    if address:
-        data["address"] = address
-    data.pop("postal_code", None)
-    data.pop("password_confirm", None)  # Don't raise error if it's not there
-
-    new_user = User(**data)
-
-    # Create the user in the database
-    db.add(new_user)
-    # Flush inserts the object so it gets an ID, etc.
-    await db.flush()
-    # Refresh loads up-to-date data (like auto-generated IDs)
-    await db.refresh(new_user)
-    # Finally commit the transaction
+    # Step 3: Create the user, reading back its id and timestamps in the same
+    # statement. A concurrent signup with the same email or NRIC is rejected by their
+    # UNIQUE constraints
+    stmt = insert(User).values(address_id=address_id, **data).returning(User)
+
+    try:
+        result = await db.execute(stmt)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="User with email or NRIC already exists.",
+        )
+
+    new_user = result.scalar_one()
     await db.commit()
 
     return new_user
@@ -75,7 +79,7 @@ async def signup(user: UserCreate, db: AsyncSession = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(
     user_credentials: OAuth2PasswordRequestForm = Depends(),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     user = await authenticate_user(user_credentials, db)
 
@@ -86,14 +90,11 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if not verify_password(user_credentials.password, user.password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password.",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # Embed the attributes needed by the read endpoints in the token, if enabled
+    principal = (
+        await load_principal(db, user.id) if settings.access_token_claims else None
+    )
     # refresh_token_expires = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     # Create access token
     access_token = create_access_token(
@@ -101,6 +102,7 @@ async def login(
             "user_id": user.id
         },  # TODO: Add a specific set of permissions to a JWT token
         expires_delta=access_token_expires,
+        principal=principal,
     )
     # # Create refresh token
     # refresh_token = create_access_token(
@@ -1,64 +1,252 @@
+import math
+import uuid
 from collections import defaultdict
-from datetime import date, datetime, time
-
-from auth.oauth2 import get_current_user
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
-from geopy.distance import geodesic
-from models.database import get_db
-from models.models import Address, BookingSlot, Clinic, User, Vaccine, VaccineRecord
+from datetime import date, datetime, time, timedelta
+from functools import partial
+from typing import (
+    Annotated,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    NoReturn,
+    Sequence,
+    TypeVar,
+)
+
+from auth.oauth2 import get_current_principal, get_current_user
+from core.config import settings
+from core.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, Cursor
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from models.database import get_db, get_read_db
+from models.models import BookingSlot, Clinic, User, Vaccine, VaccineRecord
 from schemas.booking import (
+    AdmissionQueueResponse,
     AvailableSlotResponse,
     BookingSlotResponse,
+    HoldSlotRequest,
     RescheduleSlotRequest,
     ScheduleSlotRequest,
+    ScheduleSlotsRequest,
+    SlotHoldResponse,
 )
+from schemas.oauth2 import Principal
 from schemas.record import VaccineRecordResponse
-from sqlalchemy import func
+from services.admission import AdmissionQueueFull, booking_admission
+from services.distance import Locations
+from services.holds import slot_holds
+from services.inventory import slot_inventory
+from services.schedule_rules import find_rule_slots, materialize_slot
+from services.slot_events import SLOT_FREED, SLOT_TAKEN, slot_events
+from services.write_coalescer import write_coalescer
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    case,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    tuple_,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased, joinedload, selectinload
 
 router = APIRouter(prefix="/bookings", tags=["Booking"])
 
+T = TypeVar("T")
 
-@router.get(
-    "/available",
-    status_code=status.HTTP_200_OK,
-    response_model=list[AvailableSlotResponse],
+# Columns returned when booking or releasing a slot, to keep the slot inventory in sync
+SLOT_COLUMNS = (
+    BookingSlot.id,
+    BookingSlot.polyclinic_id,
+    BookingSlot.vaccine_id,
+    BookingSlot.datetime,
+    BookingSlot.remaining,
 )
-async def get_available_booking_slots(
-    vaccine_name: str,
-    polyclinic_name: str | None = None,
-    start_datetime: date | datetime | None = None,
-    end_datetime: date | datetime | None = None,
-    polyclinic_limit: int = 3,
-    timeslot_limit: int = 1,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
-):
 
-    # Convert date objects to datetime if needed
-    if isinstance(start_datetime, date) and not isinstance(start_datetime, datetime):
-        start_datetime = datetime.combine(start_datetime, time.min)
-    if isinstance(end_datetime, date) and not isinstance(end_datetime, datetime):
-        end_datetime = datetime.combine(end_datetime, time.max)
+# Booking a place of a slot, which is only "booked" once no place remains. Both
+# expressions read the values from before the update
+BOOK_PLACE = {
+    BookingSlot.remaining: BookingSlot.remaining - 1,
+    BookingSlot.status: case((BookingSlot.remaining > 1, "available"), else_="booked"),
+}
+RELEASE_PLACE = {
+    BookingSlot.remaining: BookingSlot.remaining + 1,
+    BookingSlot.status: "available",
+}
+
+
+async def book_slot(db: AsyncSession, slot_id: str) -> Row | None:
+    # Check-and-decrement in a single statement, so that concurrent requests can never
+    # book more places than the slot has. Returns the booked slot, or None if it is
+    # missing or fully booked
+    stmt = (
+        update(BookingSlot)
+        .where(BookingSlot.id == slot_id, BookingSlot.is_available)
+        .values(BOOK_PLACE)
+        .returning(*SLOT_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+
+    result = await db.execute(stmt)
+    return result.first()
 
-    # Step 1: Create a query to exclude already-booked slots
-    booked_slots_subquery = select(VaccineRecord.booking_slot_id)
 
-    # Step 2: Select booking slots NOT in VaccineRecord table
+async def release_slot(
+    db: AsyncSession, slot_id: str | ColumnElement[str]
+) -> Row | None:
+    # The slot may also be given as a scalar subquery, e.g. the slot of a record
+    stmt = (
+        update(BookingSlot)
+        .where(BookingSlot.id == slot_id)
+        .values(RELEASE_PLACE)
+        .returning(*SLOT_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+
+    result = await db.execute(stmt)
+    return result.first()
+
+
+async def create_record(
+    db: AsyncSession, user_id: str, slot_id: str
+) -> VaccineRecord | None:
+    # Insert the record only if the user has none for the slot yet. Should two
+    # requests still get there, UNIQUE(booking_slot_id, user_id) rejects the second
+    # one. Returns the new record, or None if the user already has one
+    stmt = (
+        insert(VaccineRecord)
+        .from_select(
+            ["id", "user_id", "booking_slot_id", "status"],
+            select(
+                literal(str(uuid.uuid4())),
+                literal(user_id),
+                literal(slot_id),
+                literal("booked"),
+            ).where(
+                ~exists().where(
+                    VaccineRecord.booking_slot_id == slot_id,
+                    VaccineRecord.user_id == user_id,
+                )
+            ),
+        )
+        .returning(VaccineRecord)
+    )
+
+    try:
+        result = await db.execute(stmt)
+    except IntegrityError:
+        return None
+
+    return result.scalar_one_or_none()
+
+
+async def move_record(
+    db: AsyncSession, record_id: str, old_slot_id: str, new_slot_id: str
+) -> VaccineRecord | None:
+    # Compare-and-set on the record's current slot and status, with the same
+    # guarantees as `create_record` for the new slot. Returns the updated record, or
+    # None if it changed in the meantime or the user already has a record for the new
+    # slot
+    other_record = aliased(VaccineRecord)
+    stmt = (
+        update(VaccineRecord)
+        .where(
+            VaccineRecord.id == record_id,
+            VaccineRecord.booking_slot_id == old_slot_id,
+            VaccineRecord.status == "booked",
+            ~exists().where(
+                other_record.booking_slot_id == new_slot_id,
+                other_record.user_id == VaccineRecord.user_id,
+            ),
+        )
+        .values(booking_slot_id=new_slot_id)
+        .returning(VaccineRecord)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+
+    try:
+        result = await db.execute(stmt)
+    except IntegrityError:
+        return None
+
+    return result.scalar_one_or_none()
+
+
+def record_slot(record_id: str, user_id: str) -> ColumnElement[str]:
+    # The slot of a VaccineRecord, only if it belongs to the user and is still booked
+    return (
+        select(VaccineRecord.booking_slot_id)
+        .where(
+            VaccineRecord.id == record_id,
+            VaccineRecord.user_id == user_id,
+            VaccineRecord.status == "booked",
+        )
+        .scalar_subquery()
+    )
+
+
+async def raise_for_record(
+    db: AsyncSession, record_id: str, user_id: str, action: str
+) -> NoReturn:
+    # Tell apart why a write on a VaccineRecord of the user that is still booked
+    # matched nothing: a missing record, a record of another user, or a record that
+    # is no longer booked
+    vaccine_record = await db.get(VaccineRecord, record_id)
+
+    if not vaccine_record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Vaccine record with id {record_id} not found.",
+        )
+
+    if vaccine_record.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="You are not authorized to cancel this vaccination slot.",
+        )
+
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Cannot {action} slot with status '{vaccine_record.status}'.",
+    )
+
+
+async def find_available_slots(
+    db: AsyncSession,
+    vaccine_name: str,
+    polyclinic_name: str | None,
+    start_datetime: datetime | None,
+    end_datetime: datetime | None,
+    timeslot_limit: int,
+    user_id: str | None = None,
+) -> Sequence[BookingSlot]:
+    # Step 1: Resolve matching vaccines in a subquery, so that open slots are searched
+    # by (vaccine_id, datetime)
+    matching_vaccines_subquery = select(Vaccine.id).where(
+        func.lower(Vaccine.name).like(f"%{vaccine_name.lower()}%")
+    )
+
+    # Step 2: Select booking slots that are still available
     stmt = (
         select(BookingSlot)
-        .join(BookingSlot.vaccine)
         .join(BookingSlot.polyclinic)
-        .options(selectinload(BookingSlot.polyclinic).selectinload(Clinic.address))
         .where(
-            func.lower(Vaccine.name).like(f"%{vaccine_name.lower()}%"),
-            BookingSlot.id.notin_(booked_slots_subquery),
+            BookingSlot.vaccine_id.in_(matching_vaccines_subquery),
+            BookingSlot.is_available,
         )
     )
 
+    # Slots held by other users (if any) are left out
+    not_held, extra = await hold_filter(db, user_id)
+    if not_held is not None:
+        stmt = stmt.where(not_held)
+
     # Step 3: Optional filtering by datetime range if provided
     if start_datetime and end_datetime:
         stmt = stmt.where(BookingSlot.datetime.between(start_datetime, end_datetime))
@@ -71,43 +259,371 @@ async def get_available_booking_slots(
     if polyclinic_name:
         stmt = stmt.where(func.lower(Clinic.name).like(f"%{polyclinic_name.lower()}%"))
 
-    # Step 5: Order and return results
-    stmt = stmt.order_by(BookingSlot.datetime.asc())
+    # Step 5: Rank the slots of each polyclinic by date and time, and only fetch the
+    # first `timeslot_limit` slots of each polyclinic, since no other slot can make it
+    # into the response
+    slot_rank = (
+        func.row_number()
+        .over(
+            partition_by=BookingSlot.polyclinic_id,
+            order_by=(BookingSlot.datetime.asc(), BookingSlot.id.asc()),
+        )
+        .label("slot_rank")
+    )
+    ranked_slots_subquery = stmt.add_columns(slot_rank).subquery()
+    ranked_slot = aliased(BookingSlot, ranked_slots_subquery)
+
+    stmt = (
+        select(ranked_slot)
+        .options(selectinload(ranked_slot.polyclinic).selectinload(Clinic.address))
+        .where(ranked_slots_subquery.c.slot_rank <= timeslot_limit + extra)
+        .order_by(ranked_slot.datetime.asc(), ranked_slot.id.asc())
+    )
 
     result = await db.execute(stmt)
     slots = result.scalars().all()
 
+    if extra:
+        slots = await drop_held_slots(db, slots, user_id, timeslot_limit)
+    return slots
+
+
+async def hold_filter(
+    db: AsyncSession, user_id: str | None
+) -> tuple[ColumnElement[bool] | None, int]:
+    # How to leave out the slots of which other users hold every remaining place from
+    # a query of open slots: with a SQL condition if holds are stored in the database,
+    # or else by fetching up to as many more slots as there are held slots, and
+    # dropping the held ones afterwards
+    if user_id is None:
+        return None, 0
+
+    not_held = slot_holds.not_held_by_others(user_id)
+    if not_held is not None:
+        return not_held, 0
+
+    return None, await slot_holds.count_held_by_others(db, user_id)
+
+
+async def drop_held_slots(
+    db: AsyncSession,
+    slots: Sequence[BookingSlot],
+    user_id: str,
+    timeslot_limit: int | None = None,
+) -> list[BookingSlot]:
+    # Leaves out the slots of which other users hold every remaining place, then any
+    # slot beyond the first `timeslot_limit` of each polyclinic
+    held_slot_ids = await slot_holds.held_by_others(
+        db, [slot.id for slot in slots], user_id
+    )
+
+    polyclinic_slot_count = defaultdict(int)
+    kept_slots = []
+    for slot in slots:
+        if slot.id in held_slot_ids:
+            continue
+        if (
+            timeslot_limit
+            and polyclinic_slot_count[slot.polyclinic_id] >= timeslot_limit
+        ):
+            continue
+
+        kept_slots.append(slot)
+        polyclinic_slot_count[slot.polyclinic_id] += 1
+
+    return kept_slots
+
+
+async def find_matching_ids(
+    db: AsyncSession, vaccine_name: str, polyclinic_name: str | None
+) -> tuple[list[str], set[str] | None]:
+    # The ids of the vaccines matching the name, and of the clinics matching the
+    # polyclinic name if given
+    result = await db.execute(
+        select(Vaccine.id).where(
+            func.lower(Vaccine.name).like(f"%{vaccine_name.lower()}%")
+        )
+    )
+    vaccine_ids = result.scalars().all()
+
+    polyclinic_ids = None
+    if polyclinic_name:
+        result = await db.execute(
+            select(Clinic.id).where(
+                func.lower(Clinic.name).like(f"%{polyclinic_name.lower()}%")
+            )
+        )
+        polyclinic_ids = set(result.scalars())
+
+    return vaccine_ids, polyclinic_ids
+
+
+async def find_available_slots_in_inventory(
+    db: AsyncSession,
+    vaccine_name: str,
+    polyclinic_name: str | None,
+    start_datetime: datetime | None,
+    end_datetime: datetime | None,
+    timeslot_limit: int,
+    user_id: str | None = None,
+) -> Sequence[BookingSlot]:
+    # Step 1: Resolve matching vaccines, and polyclinics if filtered by name
+    vaccine_ids, polyclinic_ids = await find_matching_ids(
+        db, vaccine_name, polyclinic_name
+    )
+
+    # Step 2: Find the first `timeslot_limit` open slots of each polyclinic, and as
+    # many more as there are slots held by other users, which are dropped below
+    extra = 0
+    if user_id is not None:
+        extra = await slot_holds.count_held_by_others(db, user_id)
+
+    slot_ids = await slot_inventory.find(
+        db,
+        vaccine_ids,
+        start_datetime,
+        end_datetime,
+        timeslot_limit + extra,
+        polyclinic_ids,
+    )
+
+    if not slot_ids:
+        return []
+
+    # Step 3: Load the slots, skipping any booked by another worker since the
+    # inventory was last loaded
+    stmt = (
+        select(BookingSlot)
+        .options(joinedload(BookingSlot.polyclinic).joinedload(Clinic.address))
+        .where(BookingSlot.id.in_(slot_ids), BookingSlot.is_available)
+        .order_by(BookingSlot.datetime.asc(), BookingSlot.id.asc())
+    )
+
+    result = await db.execute(stmt)
+    slots = result.scalars().all()
+
+    if extra:
+        slots = await drop_held_slots(db, slots, user_id, timeslot_limit)
+    return slots
+
+
+async def find_available_slots_page(
+    db: AsyncSession,
+    vaccine_name: str,
+    polyclinic_ids: Sequence[str],
+    start_datetime: datetime | None,
+    end_datetime: datetime | None,
+    limit: int | None,
+    after: tuple[datetime, str] | None = None,
+    user_id: str | None = None,
+) -> Sequence[BookingSlot]:
+    # Returns the open slots of the given polyclinics that come after the `after`
+    # (datetime, id) key, ordered by date and time. The seek is served by the
+    # (vaccine_id, datetime, id) index of open slots, so a page costs the same however
+    # deep it is
+    matching_vaccines_subquery = select(Vaccine.id).where(
+        func.lower(Vaccine.name).like(f"%{vaccine_name.lower()}%")
+    )
+    not_held, extra = await hold_filter(db, user_id)
+
+    stmt = (
+        select(BookingSlot)
+        .options(joinedload(BookingSlot.polyclinic).joinedload(Clinic.address))
+        .where(
+            BookingSlot.vaccine_id.in_(matching_vaccines_subquery),
+            BookingSlot.polyclinic_id.in_(polyclinic_ids),
+            BookingSlot.is_available,
+        )
+        .order_by(BookingSlot.datetime.asc(), BookingSlot.id.asc())
+        .limit(limit + extra if limit else None)
+    )
+
+    if start_datetime:
+        stmt = stmt.where(BookingSlot.datetime >= start_datetime)
+    if end_datetime:
+        stmt = stmt.where(BookingSlot.datetime <= end_datetime)
+    if after:
+        stmt = stmt.where(tuple_(BookingSlot.datetime, BookingSlot.id) > after)
+    if not_held is not None:
+        stmt = stmt.where(not_held)
+
+    result = await db.execute(stmt)
+    slots = result.scalars().all()
+
+    if extra:
+        slots = (await drop_held_slots(db, slots, user_id))[:limit]
+    return slots
+
+
+def rules_window(
+    start_datetime: datetime | None, end_datetime: datetime | None
+) -> tuple[datetime, datetime]:
+    # Slots computed from schedule rules are listed from now on, and never beyond the
+    # horizon, even if a later end is given
+    start_datetime = start_datetime or datetime.now()
+    horizon = start_datetime + timedelta(days=settings.schedule_rules_horizon_days)
+    end_datetime = min(end_datetime, horizon) if end_datetime else horizon
+    return start_datetime, end_datetime
+
+
+async def find_available_slots_from_rules(
+    db: AsyncSession,
+    vaccine_name: str,
+    polyclinic_name: str | None,
+    start_datetime: datetime | None,
+    end_datetime: datetime | None,
+    timeslot_limit: int,
+    user_id: str | None = None,
+) -> Sequence[BookingSlot]:
+    # Held slots are stored, and are dropped from as many more slots as there are
+    # slots held by other users
+    extra = 0
+    if user_id is not None:
+        extra = await slot_holds.count_held_by_others(db, user_id)
+
+    slots = await find_rule_slots(
+        db,
+        vaccine_name,
+        *rules_window(start_datetime, end_datetime),
+        polyclinic_name=polyclinic_name,
+        timeslot_limit=timeslot_limit + extra,
+    )
+
+    if extra:
+        slots = await drop_held_slots(db, slots, user_id, timeslot_limit)
+    return slots
+
+
+async def find_available_slots_page_from_rules(
+    db: AsyncSession,
+    vaccine_name: str,
+    polyclinic_ids: Sequence[str],
+    start_datetime: datetime | None,
+    end_datetime: datetime | None,
+    limit: int | None,
+    after: tuple[datetime, str] | None = None,
+    user_id: str | None = None,
+) -> Sequence[BookingSlot]:
+    extra = 0
+    if user_id is not None:
+        extra = await slot_holds.count_held_by_others(db, user_id)
+
+    slots = await find_rule_slots(
+        db,
+        vaccine_name,
+        *rules_window(start_datetime, end_datetime),
+        polyclinic_ids=polyclinic_ids,
+        limit=limit + extra if limit else None,
+        after=after,
+    )
+
+    if extra:
+        slots = (await drop_held_slots(db, slots, user_id))[:limit]
+    return slots
+
+
+async def resolve_slot_id(db: AsyncSession, slot_id: str) -> str:
+    # In "rules" mode, a listed slot may not be stored yet, so it is stored right
+    # before it is booked or held
+    if settings.booking_slot_mode == "rules":
+        return await materialize_slot(db, slot_id)
+
+    return slot_id
+
+
+def to_datetime_range(
+    start: date | datetime | None, end: date | datetime | None
+) -> tuple[datetime | None, datetime | None]:
+    # A date starts at midnight, and ends just before the next one
+    if isinstance(start, date) and not isinstance(start, datetime):
+        start = datetime.combine(start, time.min)
+    if isinstance(end, date) and not isinstance(end, datetime):
+        end = datetime.combine(end, time.max)
+    return start, end
+
+
+@router.get(
+    "/available",
+    status_code=status.HTTP_200_OK,
+    response_model=list[AvailableSlotResponse],
+)
+async def get_available_booking_slots(
+    response: Response,
+    vaccine_name: str,
+    polyclinic_name: str | None = None,
+    start_datetime: date | datetime | None = None,
+    end_datetime: date | datetime | None = None,
+    polyclinic_limit: int = 3,
+    timeslot_limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = 1,
+    limit: Annotated[int | None, Query(ge=1, le=MAX_PAGE_SIZE)] = None,
+    cursor: str | None = None,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
+):
+
+    # Convert date objects to datetime if needed
+    start_datetime, end_datetime = to_datetime_range(start_datetime, end_datetime)
+
+    # Later pages carry on from the cursor, through the polyclinics of the first page
+    if cursor:
+        after = Cursor.decode(cursor)
+        return await paginate_available_slots(
+            db,
+            response,
+            vaccine_name,
+            after.polyclinic_ids,
+            start_datetime,
+            end_datetime,
+            limit,
+            after,
+            current_user.id,
+        )
+
+    # Step 1: Find the open slots that may appear in the response, from the schedule
+    # rules in "rules" mode, or else from the in-process slot inventory when enabled
+    if settings.booking_slot_mode == "rules":
+        find_slots = find_available_slots_from_rules
+    elif settings.slot_inventory_enabled:
+        find_slots = find_available_slots_in_inventory
+    else:
+        find_slots = find_available_slots
+
+    slots = await find_slots(
+        db,
+        vaccine_name,
+        polyclinic_name,
+        start_datetime,
+        end_datetime,
+        timeslot_limit,
+        # Slots of which other users hold every remaining place are not available to
+        # the current user
+        current_user.id,
+    )
+
     if not slots:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No available slots for {vaccine_name}.",
         )
 
-    # Step 6: Retrieve user address
-    user_address_stmt = (
-        select(Address.longitude, Address.latitude)
-        .join(User.address)
-        .where(User.id == current_user.id)
-    )
-
-    result = await db.execute(user_address_stmt)
-    user_address = result.first()
-
-    if user_address:
-        user_longitude, user_latitude = user_address
+    # Step 2: Take the coordinates of the user's address from the principal
+    user_latitude, user_longitude = current_user.latitude, current_user.longitude
 
-        # Step 7: Compute distance once per unique polyclinic
+    if user_latitude is not None and user_longitude is not None:
+        # Step 3: Rank the unique polyclinics by distance in a single vectorized call
         unique_polyclinics = {slot.polyclinic_id: slot.polyclinic for slot in slots}
-        clinic_distances = {
-            polyclinic_id: geodesic(
-                (user_latitude, user_longitude),
-                (polyclinic.address.latitude, polyclinic.address.longitude),
-            ).km
+        polyclinic_locations = Locations.from_points(
+            (polyclinic_id, polyclinic.address.latitude, polyclinic.address.longitude)
             for polyclinic_id, polyclinic in unique_polyclinics.items()
-        }
+        )
 
-        # Step 8: Sort polyclinics by distance
-        sorted_polyclinics = sorted(unique_polyclinics, key=clinic_distances.get)
+        # Step 4: Sort polyclinics by distance
+        sorted_polyclinics = [
+            polyclinic_id
+            for polyclinic_id, _ in polyclinic_locations.nearest(
+                user_latitude, user_longitude
+            )
+        ]
         polyclinic_slots = defaultdict(list)
         for slot in slots:
             polyclinic_slots[slot.polyclinic_id].append(slot)
@@ -116,8 +632,6 @@ async def get_available_booking_slots(
         for polyclinic_id in sorted_polyclinics[:polyclinic_limit]:
             final_slots.extend(polyclinic_slots[polyclinic_id][:timeslot_limit])
 
-        return final_slots
-
     else:
         polyclinic_slot_count = defaultdict(int)
         final_slots = []
@@ -137,7 +651,137 @@ async def get_available_booking_slots(
                 final_slots.append(slot)
                 polyclinic_slot_count[slot.polyclinic_id] += 1
 
-        return final_slots
+    # Step 5: When paginating, page through all open slots of the recommended
+    # polyclinics instead
+    if limit:
+        polyclinic_ids = tuple(
+            dict.fromkeys(slot.polyclinic_id for slot in final_slots)
+        )
+        return await paginate_available_slots(
+            db,
+            response,
+            vaccine_name,
+            polyclinic_ids,
+            start_datetime,
+            end_datetime,
+            limit,
+            user_id=current_user.id,
+        )
+
+    return final_slots
+
+
+async def paginate_available_slots(
+    db: AsyncSession,
+    response: Response,
+    vaccine_name: str,
+    polyclinic_ids: tuple[str, ...],
+    start_datetime: datetime | None,
+    end_datetime: datetime | None,
+    limit: int | None,
+    after: Cursor | None = None,
+    user_id: str | None = None,
+) -> Sequence[BookingSlot]:
+    if settings.booking_slot_mode == "rules":
+        find_slots_page = find_available_slots_page_from_rules
+    else:
+        find_slots_page = find_available_slots_page
+
+    # Fetch one more slot than requested, to know if there is a next page
+    slots = await find_slots_page(
+        db,
+        vaccine_name,
+        polyclinic_ids,
+        start_datetime,
+        end_datetime,
+        limit + 1 if limit else None,
+        (after.datetime, after.id) if after else None,
+        user_id,
+    )
+
+    if limit and len(slots) > limit:
+        slots = slots[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = Cursor(
+            slots[-1].datetime, slots[-1].id, polyclinic_ids
+        ).encode()
+
+    return slots
+
+
+@router.get("/available/stream", response_class=StreamingResponse)
+async def stream_available_booking_slots(
+    vaccine_name: str,
+    polyclinic_name: str | None = None,
+    start_datetime: date | datetime | None = None,
+    end_datetime: date | datetime | None = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    # Step 1: Resolve the filters once, and release the session, so that the stream
+    # holds no database connection however long it stays open
+    start_datetime, end_datetime = to_datetime_range(start_datetime, end_datetime)
+    vaccine_ids, polyclinic_ids = await find_matching_ids(
+        db, vaccine_name, polyclinic_name
+    )
+
+    if not vaccine_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No vaccines matching {vaccine_name}.",
+        )
+
+    await db.close()
+
+    # Step 2: Stream the slots taken and freed from now on. Clients load the current
+    # slots with `/bookings/available`, and apply these changes to them
+    subscription = slot_events.subscribe(
+        vaccine_ids, polyclinic_ids, start_datetime, end_datetime
+    )
+
+    return StreamingResponse(
+        slot_events.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def admit_booking_write(
+    current_user: User = Depends(get_current_user),
+) -> AsyncIterator[None]:
+    # Booking writes wait for their turn in the admission queue, or are turned away
+    # (with an estimate of when to retry) if the queue is full
+    if not settings.booking_admission_enabled:
+        yield
+        return
+
+    try:
+        async with booking_admission.admit(current_user.id):
+            yield
+    except AdmissionQueueFull:
+        retry_after = booking_admission.eta(booking_admission.waiting)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many booking requests, please try again later.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+@router.get(
+    "/queue",
+    status_code=status.HTTP_200_OK,
+    response_model=AdmissionQueueResponse,
+)
+async def get_admission_queue(
+    current_user: User = Depends(get_current_user),
+):
+    position = booking_admission.position(current_user.id)
+
+    return AdmissionQueueResponse(
+        position=position,
+        waiting=booking_admission.waiting,
+        active=booking_admission.active,
+        eta_seconds=booking_admission.eta(position or 0),
+    )
 
 
 @router.get(
@@ -147,7 +791,7 @@ async def get_available_booking_slots(
 )
 async def get_booking_slot(
     id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     stmt = (
         select(BookingSlot)
@@ -170,74 +814,166 @@ async def get_booking_slot(
     return slot
 
 
-@router.post(
-    "/schedule",
-    status_code=status.HTTP_201_CREATED,
-    response_model=VaccineRecordResponse,
-)
-async def schedule_vaccination_slot(
-    request: ScheduleSlotRequest,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
-):
-    # Step 1: Check if the booking slot already exists and isn't booked
-    booking_slot_query = await db.execute(
-        select(BookingSlot).where(BookingSlot.id == str(request.booking_slot_id))
-    )
-    booking_slot = booking_slot_query.scalar_one_or_none()
+async def schedule_slot(
+    db: AsyncSession, user_id: str, slot_id: str
+) -> tuple[VaccineRecord, Row]:
+    # Step 1: Book the slot, only if it is still available
+    slot_id = await resolve_slot_id(db, slot_id)
+    booked_slot = await book_slot(db, slot_id)
+
+    # Step 2: Otherwise, tell apart a missing slot from an already booked one
+    if not booked_slot:
+        booking_slot = await db.get(BookingSlot, slot_id)
+
+        if not booking_slot:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Booking slot with slot id {slot_id} not found.",
+            )
 
-    if not booking_slot:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Booking slot with slot id {str(request.booking_slot_id)} not found.",
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Slot already booked."
         )
 
-    # Step 2: Ensure this slot hasn't already been booked
-    booked_result = await db.execute(
-        select(VaccineRecord).where(
-            VaccineRecord.booking_slot_id == str(request.booking_slot_id)
+    # Step 3: Create the VaccineRecord and read it back in a single statement
+    new_vaccine_record = await create_record(db, user_id, slot_id)
+
+    if not new_vaccine_record:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Slot already booked."
         )
+
+    # Step 4: The user's hold on the slot, if any, is no longer needed
+    await slot_holds.release_in_transaction(db, slot_id, user_id)
+
+    return new_vaccine_record, booked_slot
+
+
+async def schedule_slots(
+    db: AsyncSession, user_id: str, slot_ids: list[str]
+) -> tuple[list[VaccineRecord], list[Row]]:
+    # Step 1: Book a place of every slot in a single statement, only if they all have
+    # one left
+    slot_ids = [await resolve_slot_id(db, slot_id) for slot_id in slot_ids]
+    stmt = (
+        update(BookingSlot)
+        .where(BookingSlot.id.in_(slot_ids), BookingSlot.is_available)
+        .values(BOOK_PLACE)
+        .returning(*SLOT_COLUMNS)
+        .execution_options(synchronize_session=False)
     )
-    existing_record = booked_result.scalar_one_or_none()
 
-    if existing_record:
+    result = await db.execute(stmt)
+    booked_slots = result.all()
+
+    # Step 2: Otherwise, tell apart a missing slot from an already booked one. The
+    # caller rolls back the slots that were booked
+    if len(booked_slots) < len(slot_ids):
+        result = await db.execute(
+            select(BookingSlot.id).where(BookingSlot.id.in_(slot_ids))
+        )
+        missing_slot_ids = set(slot_ids) - set(result.scalars())
+
+        if missing_slot_ids:
+            slot_id = next(id for id in slot_ids if id in missing_slot_ids)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Booking slot with slot id {slot_id} not found.",
+            )
+
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Slot already booked."
         )
 
-    # Step 3: Create new VaccineRecord
-    new_vaccine_record = VaccineRecord(
-        user_id=current_user.id,
-        booking_slot_id=str(request.booking_slot_id),
-        status="booked",
-    )
+    # Step 3: Create the VaccineRecords and read them back in a single statement.
+    # UNIQUE(booking_slot_id, user_id) rejects slots the user already has a record for
+    stmt = insert(VaccineRecord).returning(VaccineRecord, sort_by_parameter_order=True)
+    records = [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "booking_slot_id": slot_id,
+            "status": "booked",
+        }
+        for slot_id in slot_ids
+    ]
 
-    # Step 4: Create the record in the database
-    db.add(new_vaccine_record)
-    # Flush inserts the object so it gets an ID, etc.
-    await db.flush()
-    # Refresh loads up-to-date data (like auto-generated IDs)
-    await db.refresh(new_vaccine_record)
-    # Finally commit the transaction
-    await db.commit()
+    try:
+        result = await db.scalars(stmt, records)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Slot already booked."
+        )
 
-    return new_vaccine_record
+    new_vaccine_records = list(result)
 
+    # Step 4: The user's holds on the slots, if any, are no longer needed
+    for slot_id in slot_ids:
+        await slot_holds.release_in_transaction(db, slot_id, user_id)
 
-@router.delete(
-    "/cancel/{record_id}",
-    status_code=status.HTTP_204_NO_CONTENT,
-)
-async def cancel_vaccination_slot(
-    record_id: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
-):
-    # Step 1: Check if the VaccineRecord exists
-    vaccine_record_query = await db.execute(
-        select(VaccineRecord).where(VaccineRecord.id == record_id)
+    return new_vaccine_records, booked_slots
+
+
+async def cancel_record(db: AsyncSession, user_id: str, record_id: str) -> Row | None:
+    # Step 1: Delete the VaccineRecord, only if it belongs to the user and is still
+    # booked
+    stmt = (
+        delete(VaccineRecord)
+        .where(
+            VaccineRecord.id == record_id,
+            VaccineRecord.user_id == user_id,
+            VaccineRecord.status == "booked",
+        )
+        .returning(VaccineRecord.booking_slot_id)
+        .execution_options(synchronize_session=False)
     )
-    vaccine_record = vaccine_record_query.scalar_one_or_none()
+
+    result = await db.execute(stmt)
+    slot_id = result.scalar_one_or_none()
+
+    # Step 2: Otherwise, tell apart why it could not be cancelled
+    if not slot_id:
+        await raise_for_record(db, record_id, user_id, "cancel")
+
+    # Step 3: Make the slot available again
+    return await release_slot(db, slot_id)
+
+
+async def reschedule_record(
+    db: AsyncSession, user_id: str, record_id: str, new_slot_id: str
+) -> tuple[VaccineRecord, Row, Row]:
+    # Step 1: Release the slot of the VaccineRecord, only if it belongs to the user
+    # and is still booked
+    released_slot = await release_slot(db, record_slot(record_id, user_id))
+
+    # Step 2: Otherwise, tell apart why it could not be rescheduled
+    if not released_slot:
+        await raise_for_record(db, record_id, user_id, "reschedule")
+
+    # Step 3: Book the desired booking slot, only if it is still available (and is
+    # not the slot that was just released)
+    new_slot_id = await resolve_slot_id(db, new_slot_id)
+    booked_slot = None
+    if new_slot_id != released_slot.id:
+        booked_slot = await book_slot(db, new_slot_id)
+
+    # Step 4: Otherwise, tell apart a missing slot from an already booked one
+    if not booked_slot:
+        new_slot = await db.get(BookingSlot, new_slot_id)
+
+        if not new_slot:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Booking slot with ID {new_slot_id} not found.",
+            )
+
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Slot already booked."
+        )
+
+    # Step 5: Move the VaccineRecord to the new slot, unless it was cancelled or
+    # rescheduled by a concurrent request in the meantime
+    vaccine_record = await move_record(db, record_id, released_slot.id, new_slot_id)
 
     if not vaccine_record:
         raise HTTPException(
@@ -245,96 +981,224 @@ async def cancel_vaccination_slot(
             detail=f"Vaccine record with id {record_id} not found.",
         )
 
-    # Step 2: Validate that the current user owns this VaccineRecord
-    if vaccine_record.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="You are not authorized to cancel this vaccination slot.",
-        )
+    # Step 6: The user's hold on the new slot, if any, is no longer needed
+    await slot_holds.release_in_transaction(db, new_slot_id, user_id)
+
+    return vaccine_record, booked_slot, released_slot
+
+
+def slot_booked(slot: Row, user_id: str) -> None:
+    # Once a booking is committed, the user's hold on the slot (if any) is released,
+    # the slot leaves the inventory if no place remains, and availability subscribers
+    # are told
+    slot_holds.release_committed(slot.id, user_id)
+    slot_inventory.update(slot)
+    slot_events.publish(SLOT_TAKEN, slot)
 
-    # Step 3: Only allow deletion if status is 'booked'
-    if vaccine_record.status != "booked":
+
+def slot_released(slot: Row) -> None:
+    slot_inventory.update(slot)
+    slot_events.publish(SLOT_FREED, slot)
+
+
+async def ensure_not_held(db: AsyncSession, slot_id: str, user_id: str) -> None:
+    # Fail fast, without a write attempt, if other users hold every remaining place
+    # of the slot
+    if await slot_holds.held_by_others(db, [slot_id], user_id):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot cancel slot with status '{vaccine_record.status}'.",
+            status_code=status.HTTP_409_CONFLICT, detail="Slot is on hold."
         )
 
-    # Step 3: Delete the record from the database
-    await db.delete(vaccine_record)
-    # Finally commit the transaction
+
+async def apply_write(
+    db: AsyncSession, operation: Callable[[AsyncSession], Awaitable[T]]
+) -> T:
+    # Booking writes either commit on their own, with the request's session, or are
+    # grouped with concurrent ones into a single transaction by the write coalescer.
+    # Either way, changes are rolled back if the operation raises
+    if settings.booking_write_coalescing:
+        return await write_coalescer.submit(operation)
+
+    try:
+        result = await operation(db)
+    except Exception:
+        await db.rollback()
+        raise
+
     await db.commit()
 
-    return JSONResponse(content={"detail": "Vaccination slot successfully cancelled."})
+    return result
 
 
 @router.post(
-    "/reschedule",
-    status_code=status.HTTP_200_OK,
-    response_model=VaccineRecordResponse,
+    "/hold",
+    dependencies=[Depends(admit_booking_write)],
+    status_code=status.HTTP_201_CREATED,
+    response_model=SlotHoldResponse,
 )
-async def reschedule_vaccination_slot(
-    request: RescheduleSlotRequest,
+async def hold_booking_slot(
+    request: HoldSlotRequest,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    slot_id = str(request.booking_slot_id)
 
-    # Step 1: Check if the VaccineRecord exists
-    vaccine_record_query = await db.execute(
-        select(VaccineRecord).where(VaccineRecord.id == str(request.vaccine_record_id))
-    )
-    vaccine_record = vaccine_record_query.scalar_one_or_none()
+    # Step 1: Fail fast if other users hold every remaining place of the slot
+    await ensure_not_held(db, slot_id, current_user.id)
 
-    if not vaccine_record:
+    # Step 2: Only open slots can be held
+    slot_id = await resolve_slot_id(db, slot_id)
+    booking_slot = await db.get(BookingSlot, slot_id)
+
+    if not booking_slot:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Vaccine record with id {str(request.vaccine_record_id)} not found.",
+            detail=f"Booking slot with slot id {slot_id} not found.",
         )
 
-    # Step 2: Validate that the current user owns this VaccineRecord
-    if vaccine_record.user_id != current_user.id:
+    if not booking_slot.is_available:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="You are not authorized to cancel this vaccination slot.",
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Slot already booked."
         )
 
-    # Step 3: Only allow rescheduling if status is 'booked'
-    if vaccine_record.status != "booked":
+    # Step 3: Hold (or keep holding) a place, unless other users got there first
+    expires_at = await slot_holds.hold(db, slot_id, current_user.id)
+
+    if not expires_at:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot reschedule slot with status '{vaccine_record.status}'.",
+            status_code=status.HTTP_409_CONFLICT, detail="Slot is on hold."
         )
 
-    # Step 4: Check if the desired booking slot is available
-    new_slot_query = await db.execute(
-        select(BookingSlot).where(BookingSlot.id == str(request.new_slot_id))
-    )
-    new_slot = new_slot_query.scalar_one_or_none()
+    await db.commit()
+
+    return SlotHoldResponse(booking_slot_id=slot_id, expires_at=expires_at)
+
 
-    if not new_slot:
+@router.delete(
+    "/hold/{slot_id}",
+    dependencies=[Depends(admit_booking_write)],
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def release_booking_slot_hold(
+    slot_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if not await slot_holds.release(db, slot_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Booking slot with ID {str(request.new_slot_id)} not found.",
+            detail=f"Hold on booking slot with slot id {slot_id} not found.",
         )
 
-    # Step 5: Ensure this slot hasn't already been booked
-    booked_result = await db.execute(
-        select(VaccineRecord).where(
-            VaccineRecord.booking_slot_id == str(request.new_slot_id)
-        )
+    await db.commit()
+
+    return JSONResponse(content={"detail": "Booking slot hold successfully released."})
+
+
+@router.post(
+    "/schedule",
+    dependencies=[Depends(admit_booking_write)],
+    status_code=status.HTTP_201_CREATED,
+    response_model=VaccineRecordResponse,
+)
+async def schedule_vaccination_slot(
+    request: ScheduleSlotRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    await ensure_not_held(db, str(request.booking_slot_id), current_user.id)
+
+    new_vaccine_record, booked_slot = await apply_write(
+        db,
+        partial(
+            schedule_slot, user_id=current_user.id, slot_id=str(request.booking_slot_id)
+        ),
     )
 
-    existing_record = booked_result.scalar_one_or_none()
+    # Holds, the slot inventory and subscribers are only updated once the booking is
+    # committed
+    slot_booked(booked_slot, current_user.id)
+
+    return new_vaccine_record
+
+
+@router.post(
+    "/schedule/batch",
+    status_code=status.HTTP_201_CREATED,
+    response_model=list[VaccineRecordResponse],
+    dependencies=[Depends(admit_booking_write)],
+)
+async def schedule_vaccination_slots(
+    request: ScheduleSlotsRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    slot_ids = [str(slot_id) for slot_id in request.booking_slot_ids]
 
-    if existing_record:
+    if len(set(slot_ids)) < len(slot_ids):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Slot already booked."
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Booking slots must be distinct.",
         )
 
-    # Step 6: Update the VaccineRecord with the new booking slot
-    vaccine_record.booking_slot_id = str(request.new_slot_id)
-    await db.flush()
-    await db.refresh(vaccine_record)
-    await db.commit()
+    for slot_id in slot_ids:
+        await ensure_not_held(db, slot_id, current_user.id)
+
+    # All slots are booked in one transaction, or none of them are
+    new_vaccine_records, booked_slots = await apply_write(
+        db, partial(schedule_slots, user_id=current_user.id, slot_ids=slot_ids)
+    )
+
+    for booked_slot in booked_slots:
+        slot_booked(booked_slot, current_user.id)
+
+    return new_vaccine_records
+
+
+@router.delete(
+    "/cancel/{record_id}",
+    dependencies=[Depends(admit_booking_write)],
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def cancel_vaccination_slot(
+    record_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    released_slot = await apply_write(
+        db, partial(cancel_record, user_id=current_user.id, record_id=record_id)
+    )
+
+    if released_slot:
+        slot_released(released_slot)
+
+    return JSONResponse(content={"detail": "Vaccination slot successfully cancelled."})
+
+
+@router.post(
+    "/reschedule",
+    dependencies=[Depends(admit_booking_write)],
+    status_code=status.HTTP_200_OK,
+    response_model=VaccineRecordResponse,
+)
+async def reschedule_vaccination_slot(
+    request: RescheduleSlotRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    await ensure_not_held(db, str(request.new_slot_id), current_user.id)
+
+    vaccine_record, booked_slot, released_slot = await apply_write(
+        db,
+        partial(
+            reschedule_record,
+            user_id=current_user.id,
+            record_id=str(request.vaccine_record_id),
+            new_slot_id=str(request.new_slot_id),
+        ),
+    )
+
+    slot_booked(booked_slot, current_user.id)
+    slot_released(released_slot)
 
-    # Step 7: Commit the changes
     return vaccine_record
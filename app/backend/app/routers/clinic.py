@@ -1,12 +1,12 @@
 from auth.oauth2 import get_current_user
 from fastapi import APIRouter, Depends, HTTPException, status
-from models.database import get_db
+from models.database import get_read_db
 from models.models import Address, Clinic, User
 from schemas.clinic import ClinicResponse, ClinicType
-from sqlalchemy import func
+from services.clinic_locator import clinic_locator
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload
 
 router = APIRouter(prefix="/clinics", tags=["Clinic"])
 
@@ -20,7 +20,7 @@ async def get_nearest_clinic(
     clinic_limit: int = 3,
     current_user: User = Depends(get_current_user),
     clinic_type: ClinicType | None = None,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
 
     user_address_stmt = (
@@ -32,26 +32,30 @@ async def get_nearest_clinic(
     result = await db.execute(user_address_stmt)
     user_longitude, user_latitude = result.first()
 
-    # Calculate the distance using the Haversine formula
-    haversine_distance = func.pow(
-        func.radians(Address.latitude - user_latitude), 2
-    ) + func.pow(func.radians(Address.longitude - user_longitude), 2)
+    # Find the nearest clinics with the spatial index over clinic locations
+    nearest_clinics = await clinic_locator.nearest(
+        db,
+        user_latitude,
+        user_longitude,
+        clinic_limit,
+        clinic_type.value if clinic_type else None,
+    )
+    clinic_ids = [clinic_id for clinic_id, _ in nearest_clinics]
 
-    # Query to fetch clinics ordered by distance
+    # Query to fetch the clinics, which are then put back in order of distance
     stmt = (
         select(Clinic)
-        .join(Clinic.address)
-        .options(selectinload(Clinic.address))
-        .add_columns(haversine_distance.label("distance"))
-        .order_by("distance")
-        .limit(clinic_limit)
+        .options(joinedload(Clinic.address))
+        .where(Clinic.id.in_(clinic_ids))
     )
 
-    if clinic_type:
-        stmt = stmt.where(Clinic.type == clinic_type.value)
-
     result = await db.execute(stmt)
-    polyclinics = result.scalars().all()
+    clinics_by_id = {clinic.id: clinic for clinic in result.scalars()}
+    polyclinics = [
+        clinics_by_id[clinic_id]
+        for clinic_id in clinic_ids
+        if clinic_id in clinics_by_id
+    ]
 
     if not polyclinics:
         raise HTTPException(
@@ -1,8 +1,12 @@
+from typing import Annotated
+
 from auth.oauth2 import get_current_user
-from fastapi import APIRouter, Depends, HTTPException, status
-from models.database import get_db
+from core.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, Cursor
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from models.database import get_read_db
 from models.models import BookingSlot, User, VaccineRecord
 from schemas.record import VaccineRecordResponse
+from sqlalchemy import tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
@@ -16,7 +20,11 @@
     response_model=list[VaccineRecordResponse],
 )
 async def get_user_vaccination_records(
-    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    response: Response,
+    limit: Annotated[int | None, Query(ge=1, le=MAX_PAGE_SIZE)] = None,
+    cursor: str | None = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
     stmt = (
         select(VaccineRecord)
@@ -29,17 +37,37 @@ async def get_user_vaccination_records(
             ),
         )
         .filter(User.id == current_user.id)
-        .order_by(BookingSlot.datetime.desc())
+        .order_by(BookingSlot.datetime.desc(), VaccineRecord.id.desc())
     )
 
+    # Pages are keyed on (datetime, id), so that a page never depends on how many
+    # records came before it. The user's records are found by `user_id` and sorted
+    # for each page: the order is not indexed, since a user only has a handful of
+    # records (unlike the open slots of `/bookings/available`)
+    if cursor:
+        after = Cursor.decode(cursor)
+        stmt = stmt.where(
+            tuple_(BookingSlot.datetime, VaccineRecord.id) < (after.datetime, after.id)
+        )
+
+    # Fetch one more record than requested, to know if there is a next page
+    if limit:
+        stmt = stmt.limit(limit + 1)
+
     result = await db.execute(stmt)
     records = result.scalars().all()
 
-    if not records:
+    if not records and not cursor:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No records found."
         )
 
+    if limit and len(records) > limit:
+        records = records[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = Cursor(
+            records[-1].booking_slot.datetime, records[-1].id
+        ).encode()
+
     return records
 
 
@@ -51,7 +79,7 @@ async def get_user_vaccination_records(
 async def get_user_vaccination_record(
     id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     stmt = (
         select(VaccineRecord)
@@ -1,11 +1,15 @@
 from datetime import datetime, timezone
 
-from auth.oauth2 import get_current_user
+from auth.oauth2 import get_current_user, principal_version
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
-from models.database import get_db
+from models.database import get_db, get_read_db
 from models.models import Address, Clinic, User
 from schemas.user import UserResponse, UserUpdate, UserUpdateResponse
+from services.principal_cache import principal_cache
+from services.principal_versions import principal_versions
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
@@ -19,7 +23,8 @@
     response_model=UserResponse,
 )
 async def get_user(
-    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
     stmt = (
         select(User)
@@ -50,10 +55,49 @@ async def update_user(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    stmt = select(User).filter_by(id=current_user.id)
+    # Step 1: Look up the address and the enrolled clinic (by the postal code of its
+    # address) in subqueries of the update itself
+    address_id = (
+        select(Address.id)
+        .filter_by(postal_code=user_update.postal_code)
+        .limit(1)
+        .scalar_subquery()
+    )
+    clinic_id = (
+        select(Clinic.id)
+        .join(Clinic.address)
+        .filter(Address.postal_code == user_update.enrolled_clinic_postal_code)
+        .limit(1)
+        .scalar_subquery()
+    )
 
-    result = await db.execute(stmt)
-    user = result.scalars().first()
+    # Step 2: Update the user and read it back in a single statement
+    data = user_update.model_dump(
+        exclude={"postal_code", "enrolled_clinic_postal_code"}
+    )
+    stmt = (
+        update(User)
+        .where(User.id == current_user.id)
+        .values(
+            **data,
+            address_id=address_id,
+            enrolled_clinic_id=clinic_id,
+            updated_at=datetime.now(timezone.utc),
+        )
+        .returning(User)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+
+    try:
+        result = await db.execute(stmt)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="User with email or NRIC already exists.",
+        )
+
+    user = result.scalar_one_or_none()
 
     if not user:
         raise HTTPException(
@@ -61,43 +105,9 @@ async def update_user(
             detail=f"User with id {current_user.id} not found.",
         )
 
-    # Step 1: Get the address, if available
-    stmt = select(Address).filter_by(postal_code=user_update.postal_code)
-
-    result = await db.execute(stmt)
-    address = result.scalars().first()
-
-    # Step 2: Get the address of the enrolled clinic, if available
-    stmt = (
-        select(Clinic)
-        .join(Address)
-        .filter(Address.postal_code == user_update.enrolled_clinic_postal_code)
-    )
-
-    result = await db.execute(stmt)
-    clinic = result.scalars().first()
-
-    address_id = address.id if address else None
-    clinic_id = clinic.id if clinic else None
-
-    data = user_update.model_dump()
-    for key, value in data.items():
-        if key == "postal_code":
-            setattr(user, "address_id", address_id)
-        elif key == "enrolled_clinic_postal_code":
-            setattr(user, "enrolled_clinic_id", clinic_id)
-        elif hasattr(user, key):
-            setattr(user, key, value)
-
-    user.updated_at = datetime.now(timezone.utc)
-
-    db.add(user)
-    # Flush inserts the object so it gets an ID, etc.
-    await db.flush()
-    # Refresh loads up-to-date data (like auto-generated IDs)
-    await db.refresh(user)
-    # Finally commit the transaction
     await db.commit()
+    principal_cache.invalidate(current_user.id)
+    principal_versions.update(current_user.id, principal_version(user.updated_at))
 
     return user
 
@@ -117,7 +127,9 @@ async def delete_user(id: str, db: AsyncSession = Depends(get_db)):
 
     # Delete the user in the database
     await db.delete(user)
-    # Finally commit the transaction
+    # Finally commit the transaction, and forget the cached user
     await db.commit()
+    principal_cache.invalidate(id)
+    principal_versions.delete(id)
 
     return JSONResponse(content={"detail": "User successfully deleted."})
@@ -1,6 +1,7 @@
+from datetime import date, datetime, time
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from schemas.base import BookingSlotBase
 from schemas.vaccine import VaccineResponse
 
@@ -9,6 +10,27 @@ class ScheduleSlotRequest(BaseModel):
     booking_slot_id: UUID
 
 
+class ScheduleSlotsRequest(BaseModel):
+    # e.g., every dose of a vaccine, or several vaccines at once
+    booking_slot_ids: list[UUID] = Field(min_length=1, max_length=10)
+
+
+class HoldSlotRequest(BaseModel):
+    booking_slot_id: UUID
+
+
+class SlotHoldResponse(BaseModel):
+    booking_slot_id: UUID
+    expires_at: datetime
+
+
+class AdmissionQueueResponse(BaseModel):
+    position: int | None
+    waiting: int
+    active: int
+    eta_seconds: float
+
+
 class CancelSlotRequest(BaseModel):
     vaccine_record_id: UUID
 
@@ -30,3 +52,62 @@ class AvailableSlotResponse(BookingSlotBase):
 
     class Config:
         from_attributes = True
+
+
+class SlotTemplate(BaseModel):
+    # A recurring calendar: slots every `interval_minutes` from `start_time`, on the
+    # given weekdays (0 is Monday), with the last one ending by `end_time`. Each slot
+    # takes up to `capacity` appointments
+    polyclinic_id: UUID
+    vaccine_id: UUID
+    weekdays: list[int] = Field(min_length=1)
+    start_time: time
+    end_time: time
+    interval_minutes: int = Field(gt=0)
+    capacity: int = Field(default=1, gt=0)
+
+    @model_validator(mode="after")
+    def check_template(self) -> "SlotTemplate":
+        if any(not 0 <= weekday <= 6 for weekday in self.weekdays):
+            raise ValueError("Weekdays must be between 0 (Monday) and 6 (Sunday).")
+        if self.end_time <= self.start_time:
+            raise ValueError("End time must be after start time.")
+        return self
+
+
+class GenerateSlotsRequest(BaseModel):
+    templates: list[SlotTemplate] = Field(min_length=1)
+    start_date: date
+    end_date: date  # inclusive
+
+    @model_validator(mode="after")
+    def check_dates(self) -> "GenerateSlotsRequest":
+        if self.end_date < self.start_date:
+            raise ValueError("End date must not be before start date.")
+        return self
+
+
+class GenerateSlotsResponse(BaseModel):
+    created: int
+    skipped: int  # slots that already existed
+    seconds: float
+    rows_per_second: float
+
+
+class ScheduleRuleRequest(SlotTemplate):
+    # Slots are computed from the rule from `valid_from` on, and until `valid_until`
+    # (inclusive) if set
+    valid_from: date
+    valid_until: date | None = None
+
+    @model_validator(mode="after")
+    def check_rule(self) -> "ScheduleRuleRequest":
+        if self.start_time.second or self.start_time.microsecond:
+            raise ValueError("Start time must be a whole minute.")
+        if self.valid_until and self.valid_until < self.valid_from:
+            raise ValueError("Valid until must not be before valid from.")
+        return self
+
+
+class ScheduleRuleResponse(ScheduleRuleRequest):
+    id: UUID
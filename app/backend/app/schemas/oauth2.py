@@ -1,3 +1,4 @@
+from datetime import date, datetime
 from uuid import UUID
 
 from pydantic import BaseModel
@@ -8,6 +9,20 @@ class Token(BaseModel):
     token_type: str
 
 
+class Principal(BaseModel):
+    # The attributes of the current user needed by the read endpoints, as embedded in
+    # claims-rich access tokens. `version` is the `updated_at` of the user (in
+    # microseconds since the epoch) when they were read
+    id: str
+    date_of_birth: date
+    gender: str
+    latitude: float | None = None
+    longitude: float | None = None
+    version: int
+
+
 class TokenData(BaseModel):
     id: UUID | None = None
     scopes: list[str] = []
+    issued_at: datetime | None = None
+    principal: Principal | None = None
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from core.config import settings
+
+
+class AdmissionQueueFull(Exception):
+    pass
+
+
+class AdmissionQueue:
+    """
+    Waiting room in front of the booking write endpoints: at most `concurrency`
+    requests are admitted at once, and the others wait in arrival order (up to
+    `max_waiting` of them, after which requests are turned away).
+
+    A finished request hands its place over to the first waiting one, so that late
+    arrivals cannot overtake requests that are already queued. The average service
+    time is tracked to estimate how long a queued request has to wait.
+    """
+
+    def __init__(self, concurrency: int, max_waiting: int):
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.active = 0
+        self._waiting: deque[tuple[str, asyncio.Future]] = deque()
+        # Exponentially weighted moving average of the time spent admitted, in seconds
+        self._service_time = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    def clear(self) -> None:
+        self.active = 0
+        self._waiting.clear()
+        self._service_time = 0.0
+
+    def position(self, user_id: str) -> int | None:
+        # 1-based position of the user's earliest queued request, if any
+        for position, (waiting_user_id, _) in enumerate(self._waiting, start=1):
+            if waiting_user_id == user_id:
+                return position
+        return None
+
+    def eta(self, position: int) -> float:
+        # Seconds until a request queued at `position` is admitted
+        return position * self._service_time / max(self.concurrency, 1)
+
+    @asynccontextmanager
+    async def admit(self, user_id: str) -> AsyncIterator[None]:
+        # Step 1: Take a free place, if nobody is queued for it, or queue for one
+        if self.active < self.concurrency and not self._waiting:
+            self.active += 1
+        elif len(self._waiting) >= self.max_waiting:
+            raise AdmissionQueueFull()
+        else:
+            future = asyncio.get_running_loop().create_future()
+            entry = (user_id, future)
+            self._waiting.append(entry)
+
+            try:
+                await future
+            except asyncio.CancelledError:
+                # The place may have been handed over just before the cancellation
+                if future.done() and not future.cancelled():
+                    self._release()
+                else:
+                    self._waiting.remove(entry)
+                raise
+
+        # Step 2: Run the request, then hand the place over to the next one
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._service_time += 0.1 * (elapsed - self._service_time)
+            self._release()
+
+    def _release(self) -> None:
+        while self._waiting:
+            _, future = self._waiting.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+
+        self.active -= 1
+
+
+booking_admission = AdmissionQueue(
+    settings.booking_admission_concurrency, settings.booking_admission_max_waiting
+)
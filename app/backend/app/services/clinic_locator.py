@@ -0,0 +1,196 @@
+import math
+import time
+from collections import defaultdict
+from typing import Iterable
+
+import numpy as np
+from core.config import settings
+from models.models import Address, Clinic
+from services.distance import distance_km
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+# Grid cells are CELL_SIZE degrees wide and high (i.e., ~1.1 km around the equator)
+CELL_SIZE = 0.01
+
+# Shortest length of one degree of latitude (at the equator) and of one degree of
+# longitude at the equator, on the WGS-84 ellipsoid. Slightly rounded down, so that
+# they can be used as lower bounds
+KM_PER_DEGREE_LATITUDE = 110.5
+KM_PER_DEGREE_LONGITUDE = 111.3
+
+
+class GridIndex:
+    """
+    Uniform latitude/longitude grid over a set of locations, answering k-nearest
+    queries with exact (ellipsoidal) distances by only visiting the cells around the
+    query point.
+    """
+
+    def __init__(
+        self,
+        points: Iterable[tuple[str, float, float]],
+        cell_size: float = CELL_SIZE,
+    ):
+        points = list(points)
+        coordinates = np.array(
+            [(latitude, longitude) for _, latitude, longitude in points],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+
+        self.ids = [id for id, _, _ in points]
+        self.latitudes = coordinates[:, 0]
+        self.longitudes = coordinates[:, 1]
+        self.cell_size = cell_size
+
+        rows = np.floor(self.latitudes / cell_size).astype(np.int64)
+        columns = np.floor(self.longitudes / cell_size).astype(np.int64)
+
+        cells = defaultdict(list)
+        for index, cell in enumerate(zip(rows.tolist(), columns.tolist())):
+            cells[cell].append(index)
+        self.cells = {cell: np.array(indices) for cell, indices in cells.items()}
+
+        if points:
+            self.bounds = tuple(
+                int(bound)
+                for bound in (rows.min(), rows.max(), columns.min(), columns.max())
+            )
+            self.max_abs_latitude = float(np.abs(self.latitudes).max())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def nearest(
+        self, latitude: float, longitude: float, k: int
+    ) -> list[tuple[str, float]]:
+        # Returns up to `k` (id, distance in km) pairs, nearest first
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+
+        latitude, longitude = float(latitude), float(longitude)
+        row = math.floor(latitude / self.cell_size)
+        column = math.floor(longitude / self.cell_size)
+
+        # Any location outside of the first `ring` rings of cells around the query
+        # point is at least `ring * cell_km` away
+        cell_km = self.cell_size * min(
+            KM_PER_DEGREE_LATITUDE,
+            KM_PER_DEGREE_LONGITUDE
+            * math.cos(math.radians(max(self.max_abs_latitude, abs(latitude)))),
+        )
+
+        row_min, row_max, column_min, column_max = self.bounds
+        first_ring = max(
+            0, row_min - row, row - row_max, column_min - column, column - column_max
+        )
+        last_ring = max(
+            abs(row - row_min),
+            abs(row - row_max),
+            abs(column - column_min),
+            abs(column - column_max),
+        )
+
+        candidates = []
+        candidate_count = 0
+
+        for ring in range(first_ring, last_ring + 1):
+            # Once a ring has more cells than there are occupied cells, it's cheaper to
+            # look at every location
+            if 8 * ring > len(self.cells):
+                return self._rank(latitude, longitude, np.arange(len(self)), k)
+
+            for cell in self._ring_cells(row, column, ring):
+                indices = self.cells.get(cell)
+                if indices is not None:
+                    candidates.append(indices)
+                    candidate_count += len(indices)
+
+            if candidate_count >= k:
+                indices = np.concatenate(candidates)
+                distances = self._distances(latitude, longitude, indices)
+                if np.partition(distances, k - 1)[k - 1] <= ring * cell_km:
+                    break
+
+        return self._rank(latitude, longitude, np.concatenate(candidates), k)
+
+    def _distances(
+        self, latitude: float, longitude: float, indices: np.ndarray
+    ) -> np.ndarray:
+        return distance_km(
+            latitude, longitude, self.latitudes[indices], self.longitudes[indices]
+        )
+
+    def _rank(
+        self, latitude: float, longitude: float, indices: np.ndarray, k: int
+    ) -> list[tuple[str, float]]:
+        distances = self._distances(latitude, longitude, indices)
+        order = np.argsort(distances, kind="stable")[:k]
+        return [(self.ids[indices[i]], float(distances[i])) for i in order]
+
+    @staticmethod
+    def _ring_cells(row: int, column: int, ring: int) -> Iterable[tuple[int, int]]:
+        if ring == 0:
+            yield row, column
+            return
+
+        for offset in range(-ring, ring + 1):
+            yield row - ring, column + offset
+            yield row + ring, column + offset
+        for offset in range(-ring + 1, ring):
+            yield row + offset, column - ring
+            yield row + offset, column + ring
+
+
+class ClinicLocator:
+    """
+    In-process spatial index over clinic locations, for all clinics and per clinic
+    type. It is loaded on first use and reloaded every `refresh_interval` seconds, or
+    on the next use after `invalidate()` is called.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._indexes: dict[str | None, GridIndex] | None = None
+        self._loaded_at = 0.0
+
+    def invalidate(self) -> None:
+        self._indexes = None
+
+    async def load(self, db: AsyncSession) -> None:
+        stmt = select(Clinic.id, Clinic.type, Address.latitude, Address.longitude).join(
+            Clinic.address
+        )
+        result = await db.execute(stmt)
+
+        points_by_type = defaultdict(list)
+        for id, clinic_type, latitude, longitude in result:
+            points_by_type[None].append((id, latitude, longitude))
+            points_by_type[clinic_type].append((id, latitude, longitude))
+
+        self._indexes = {
+            clinic_type: GridIndex(points)
+            for clinic_type, points in points_by_type.items()
+        }
+        self._loaded_at = time.monotonic()
+
+    async def nearest(
+        self,
+        db: AsyncSession,
+        latitude: float,
+        longitude: float,
+        k: int,
+        clinic_type: str | None = None,
+    ) -> list[tuple[str, float]]:
+        if (
+            self._indexes is None
+            or time.monotonic() - self._loaded_at > self.refresh_interval
+        ):
+            await self.load(db)
+
+        index = self._indexes.get(clinic_type)
+        return index.nearest(latitude, longitude, k) if index else []
+
+
+clinic_locator = ClinicLocator(settings.clinic_locator_refresh_interval)
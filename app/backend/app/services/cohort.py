@@ -0,0 +1,219 @@
+import csv
+import io
+import json
+import math
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterator
+
+import numpy as np
+from models.models import BookingSlot, User, VaccineRecord
+from schemas.record import Status
+from services.eligibility import EligibilityRule
+from sqlalchemy import Row, Select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from starlette.concurrency import run_in_threadpool
+
+# Statuses of a user and vaccine in the cohort: never vaccinated (nor booked), or
+# due for another dose, i.e. the last one is older than the criteria's frequency
+ELIGIBLE = 1
+OVERDUE = 2
+STATUS_NAMES = {ELIGIBLE: "eligible", OVERDUE: "overdue"}
+
+# Rows fetched, or formatted, at once (i.e., per chunk of the streamed response)
+CHUNK_ROWS = 10000
+
+
+@dataclass
+class Cohort:
+    """
+    Users as columns, for the vaccines of a set of eligibility rules: one entry per
+    user in `user_ids`, `age_days` and `genders`, and one row per user (and column
+    per vaccine in `vaccine_ids`) in `days_since_dose` and `booked`.
+    """
+
+    user_ids: np.ndarray  # str objects
+    age_days: np.ndarray  # int32
+    genders: np.ndarray  # int16 codes, see `gender_codes`
+    gender_codes: dict[str, int]
+    vaccine_ids: list[str]
+    # Days since the last completed dose (inf if none), and whether one is booked
+    days_since_dose: np.ndarray  # float32, users x vaccines
+    booked: np.ndarray  # bool, users x vaccines
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+
+async def fetch_rows(db: AsyncSession, stmt: Select) -> list[Row]:
+    # Fetches the rows in chunks, so that other requests are served in between
+    result = await db.stream(stmt.execution_options(yield_per=CHUNK_ROWS))
+
+    rows = []
+    async for partition in result.partitions():
+        rows.extend(partition)
+    return rows
+
+
+async def load_cohort(db: AsyncSession, vaccine_ids: list[str], today: date) -> Cohort:
+    # Step 1: Fetch the users, and the last completed dose and any booking of each
+    # user and vaccine
+    users = await fetch_rows(db, select(User.id, User.date_of_birth, User.gender))
+
+    stmt = (
+        select(
+            VaccineRecord.user_id,
+            BookingSlot.vaccine_id,
+            VaccineRecord.status,
+            func.max(BookingSlot.datetime),
+        )
+        .join(BookingSlot, BookingSlot.id == VaccineRecord.booking_slot_id)
+        .where(BookingSlot.vaccine_id.in_(vaccine_ids))
+        .group_by(VaccineRecord.user_id, BookingSlot.vaccine_id, VaccineRecord.status)
+    )
+    doses = await fetch_rows(db, stmt)
+
+    # Step 2: Turn them into columns off the event loop
+    return await run_in_threadpool(build_cohort, users, doses, vaccine_ids, today)
+
+
+def build_cohort(
+    users: list[Row], doses: list[Row], vaccine_ids: list[str], today: date
+) -> Cohort:
+    # Step 1: The users as columns. They are filled from generators rather than
+    # converted from lists, which would hold the GIL (and so block the event loop)
+    # for the whole conversion
+    ids = [id for id, _, _ in users]
+    user_ids = np.array(ids, dtype=object)
+    age_days = today.toordinal() - np.fromiter(
+        (date_of_birth.toordinal() for _, date_of_birth, _ in users),
+        dtype=np.int32,
+        count=len(users),
+    )
+    gender_codes = {}
+    genders = np.fromiter(
+        (gender_codes.setdefault(gender, len(gender_codes)) for _, _, gender in users),
+        dtype=np.int16,
+        count=len(users),
+    )
+
+    # Step 2: The days since the last completed dose, and any booking, of each user
+    # (rows) and vaccine (columns)
+    user_index = {id: index for index, id in enumerate(ids)}
+    vaccine_index = {id: index for index, id in enumerate(vaccine_ids)}
+    days_since_dose = np.full((len(ids), len(vaccine_ids)), np.inf, dtype=np.float32)
+    booked = np.zeros((len(ids), len(vaccine_ids)), dtype=bool)
+
+    for user_id, vaccine_id, status, last_datetime in doses:
+        row, column = user_index[user_id], vaccine_index[vaccine_id]
+        if status == Status.COMPLETED.value:
+            days_since_dose[row, column] = (today - last_datetime.date()).days
+        else:
+            booked[row, column] = True
+
+    return Cohort(
+        user_ids=user_ids,
+        age_days=age_days,
+        genders=genders,
+        gender_codes=gender_codes,
+        vaccine_ids=list(vaccine_ids),
+        days_since_dose=days_since_dose,
+        booked=booked,
+    )
+
+
+def evaluate_cohort(cohort: Cohort, rules: list[EligibilityRule]) -> np.ndarray:
+    # Returns the status (0, ELIGIBLE or OVERDUE) of every user (rows) and vaccine
+    # (columns), with one vectorized pass over the users per rule. A user matching
+    # several criteria of a vaccine gets the most urgent status
+    statuses = np.zeros(cohort.days_since_dose.shape, dtype=np.int8)
+    vaccine_index = {id: index for index, id in enumerate(cohort.vaccine_ids)}
+
+    for rule in rules:
+        matches = cohort.age_days >= rule.start
+        if rule.end != math.inf:
+            matches &= cohort.age_days < rule.end
+        if rule.gender is not None:
+            code = cohort.gender_codes.get(rule.gender)
+            if code is None:
+                continue
+            matches &= cohort.genders == code
+
+        column = vaccine_index[rule.vaccine_id]
+        days_since_dose = cohort.days_since_dose[:, column]
+        never = np.isinf(days_since_dose)
+
+        status = np.where(matches & never, ELIGIBLE, 0).astype(np.int8)
+        if rule.repeat_days is not None:
+            status[matches & ~never & (days_since_dose > rule.repeat_days)] = OVERDUE
+
+        np.maximum(statuses[:, column], status, out=statuses[:, column])
+
+    # Users with a booked dose are already taken care of
+    statuses[cohort.booked] = 0
+    return statuses
+
+
+def _rows(
+    cohort: Cohort, statuses: np.ndarray
+) -> Iterator[tuple[int, np.ndarray, np.ndarray, np.ndarray]]:
+    # Chunks of (vaccine column, user ids, statuses, days since the last dose)
+    for column in range(len(cohort.vaccine_ids)):
+        (indices,) = np.nonzero(statuses[:, column])
+        for start in range(0, len(indices), CHUNK_ROWS):
+            chunk = indices[start : start + CHUNK_ROWS]
+            yield (
+                column,
+                cohort.user_ids[chunk],
+                statuses[chunk, column],
+                cohort.days_since_dose[chunk, column],
+            )
+
+
+def ndjson_lines(
+    cohort: Cohort, statuses: np.ndarray, vaccine_names: dict[str, str]
+) -> Iterator[str]:
+    # One JSON object per user and vaccine, in chunks of lines. Only the vaccine
+    # names need escaping, so they are encoded once
+    vaccines = [
+        f'"vaccine_id": {json.dumps(id)}, "vaccine": {json.dumps(vaccine_names[id])}'
+        for id in cohort.vaccine_ids
+    ]
+    statuses_json = {code: json.dumps(name) for code, name in STATUS_NAMES.items()}
+
+    for column, user_ids, chunk_statuses, days in _rows(cohort, statuses):
+        vaccine = vaccines[column]
+        yield "".join(
+            f'{{"user_id": "{user_id}", {vaccine}, "status": {statuses_json[status]}, '
+            f'"days_since_last_dose": {"null" if day == math.inf else int(day)}}}\n'
+            for user_id, status, day in zip(
+                user_ids, chunk_statuses.tolist(), days.tolist()
+            )
+        )
+
+
+def csv_lines(
+    cohort: Cohort, statuses: np.ndarray, vaccine_names: dict[str, str]
+) -> Iterator[str]:
+    def encode(*fields) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="").writerow(fields)
+        return buffer.getvalue()
+
+    vaccines = [encode(id, vaccine_names[id]) for id in cohort.vaccine_ids]
+
+    yield (
+        encode("user_id", "vaccine_id", "vaccine", "status", "days_since_last_dose")
+        + "\n"
+    )
+
+    for column, user_ids, chunk_statuses, days in _rows(cohort, statuses):
+        vaccine = vaccines[column]
+        yield "".join(
+            f"{user_id},{vaccine},{STATUS_NAMES[status]},"
+            f"{'' if day == math.inf else int(day)}\n"
+            for user_id, status, day in zip(
+                user_ids, chunk_statuses.tolist(), days.tolist()
+            )
+        )
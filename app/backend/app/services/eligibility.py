@@ -0,0 +1,244 @@
+import logging
+import math
+import re
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+
+from core.config import settings
+from models.models import Vaccine, VaccineCriteria
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+logger = logging.getLogger("app.eligibility")
+
+# Ages are compared in days, with months of 30 days and years of 365 days (i.e., a
+# user is `days // 30` months and `days // 365` years old)
+DAYS_PER_UNIT = {"month": 30, "months": 30, "year": 365, "years": 365}
+
+# e.g., "4 months", "6-59 months", "18+ years"
+AGE_CRITERIA = re.compile(r"(\d+)(?:-(\d+)|(\+))? (months?|years?)")
+
+# e.g., "Once", "Annually or per season", "Every 5 years"
+FREQUENCY = re.compile(r"every (\d+) (months?|years?)")
+
+
+def parse_age_criteria(age_criteria: str | None) -> tuple[int, float]:
+    # Returns the [start, end) interval of ages (in days) matching the criteria. A
+    # single age matches the whole month or year, e.g. "4 months" matches the users
+    # who are 4 months old, but not yet 5
+    if age_criteria is None:
+        return 0, math.inf
+
+    match = AGE_CRITERIA.fullmatch(age_criteria.strip())
+    if not match:
+        raise ValueError(f"Unknown age criteria {age_criteria!r}.")
+
+    start, end, open_ended, unit = match.groups()
+    days = DAYS_PER_UNIT[unit]
+
+    if open_ended:
+        return int(start) * days, math.inf
+    return int(start) * days, (int(end or start) + 1) * days
+
+
+def parse_frequency(frequency: str | None) -> int | None:
+    # Returns the number of days between doses, or None if they are not repeated
+    if frequency is None:
+        return None
+
+    frequency = frequency.strip().lower()
+    if frequency.startswith("annually"):
+        return DAYS_PER_UNIT["year"]
+
+    match = FREQUENCY.match(frequency)
+    if match:
+        return int(match[1]) * DAYS_PER_UNIT[match[2]]
+    return None
+
+
+@dataclass(frozen=True)
+class EligibilityRule:
+    vaccine_id: str
+    start: int  # days
+    end: float  # days, exclusive
+    gender: str | None  # None for any gender
+    repeat_days: int | None
+    criteria: dict  # as in `VaccineCriteriaResponse`
+
+
+class IntervalIndex:
+    """
+    Ages (in days) split at every start and end of the intervals of a set of rules,
+    with the rules matching each piece, so that the rules matching an age are found
+    with a single binary search.
+    """
+
+    def __init__(self, rules: list[EligibilityRule]):
+        self.boundaries = sorted(
+            {rule.start for rule in rules}
+            | {rule.end for rule in rules if rule.end != math.inf}
+        )
+        self.rules = [
+            tuple(rule for rule in rules if rule.start <= boundary < rule.end)
+            for boundary in self.boundaries
+        ]
+
+    def find(self, age_days: int) -> tuple[EligibilityRule, ...]:
+        index = bisect_right(self.boundaries, age_days) - 1
+        return self.rules[index] if index >= 0 else ()
+
+
+class VaccineEligibility:
+    """
+    In-process rules engine behind `/vaccines/recommendations`. The criteria of every
+    vaccine are parsed once into age intervals, indexed per gender, so that the
+    vaccines a user is eligible for are found without querying the database.
+
+    Every `refresh_interval` seconds, the criteria are reloaded on the next use if
+    any `VaccineCriteria` or `Vaccines` row changed since they were loaded, or right
+    away after `invalidate()` is called.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        # Gender (None for any) -> index of the rules of that gender
+        self._indexes: dict[str | None, IntervalIndex] | None = None
+        self._rules: list[EligibilityRule] = []
+        self._vaccines: dict[str, dict] = {}
+        self._version: tuple | None = None
+        self._checked_at = 0.0
+
+    def invalidate(self) -> None:
+        self._indexes = None
+
+    @staticmethod
+    async def _current_version(db: AsyncSession) -> tuple:
+        # Changes with any added, updated or deleted criteria, and renamed vaccine
+        stmt = (
+            select(
+                func.count(VaccineCriteria.id),
+                func.max(VaccineCriteria.updated_at),
+                func.max(Vaccine.updated_at),
+            )
+            .select_from(Vaccine)
+            .join(Vaccine.vaccine_criterias)
+        )
+
+        result = await db.execute(stmt)
+        return tuple(result.one())
+
+    async def load(self, db: AsyncSession) -> None:
+        stmt = (
+            select(Vaccine.id, Vaccine.name, Vaccine.updated_at, VaccineCriteria)
+            .join(Vaccine.vaccine_criterias)
+            .order_by(Vaccine.name, VaccineCriteria.id)
+        )
+        result = await db.execute(stmt)
+        rows = result.all()
+
+        # The version of the loaded rows, as computed by `_current_version`
+        version = (
+            len(rows),
+            max((criteria.updated_at for *_, criteria in rows), default=None),
+            max((updated_at for _, _, updated_at, _ in rows), default=None),
+        )
+
+        vaccines = {}
+        rules_by_gender = defaultdict(list)
+        for vaccine_id, name, _, criteria in rows:
+            try:
+                start, end = parse_age_criteria(criteria.age_criteria)
+            except ValueError as e:
+                # Criteria that cannot be parsed never match
+                logger.warning(f"Skipping vaccine criteria {criteria.id}: {e}")
+                continue
+
+            gender = criteria.gender_criteria
+            if gender == "None":
+                gender = None
+
+            vaccines[vaccine_id] = {"id": vaccine_id, "name": name}
+            rules_by_gender[gender].append(
+                EligibilityRule(
+                    vaccine_id=vaccine_id,
+                    start=start,
+                    end=end,
+                    gender=gender,
+                    repeat_days=parse_frequency(criteria.frequency),
+                    criteria={
+                        "age_criteria": criteria.age_criteria,
+                        "gender_criteria": criteria.gender_criteria,
+                        "health_condition_criteria": criteria.health_condition_criteria,
+                        "doses_required": criteria.doses_required,
+                        "frequency": criteria.frequency,
+                    },
+                )
+            )
+
+        self._indexes = {
+            gender: IntervalIndex(rules) for gender, rules in rules_by_gender.items()
+        }
+        self._rules = [rule for rules in rules_by_gender.values() for rule in rules]
+        self._vaccines = vaccines
+        self._version = version
+        self._checked_at = time.monotonic()
+
+    async def _refresh(self, db: AsyncSession) -> None:
+        if self._indexes is None:
+            await self.load(db)
+        elif time.monotonic() - self._checked_at > self.refresh_interval:
+            if await self._current_version(db) != self._version:
+                await self.load(db)
+            else:
+                self._checked_at = time.monotonic()
+
+    async def rules(
+        self, db: AsyncSession
+    ) -> tuple[list[EligibilityRule], dict[str, str]]:
+        # Every rule, and the name of every vaccine by id, to evaluate users in bulk
+        await self._refresh(db)
+        names = {
+            vaccine_id: vaccine["name"]
+            for vaccine_id, vaccine in self._vaccines.items()
+        }
+        return self._rules, names
+
+    def match(self, age_days: int, gender: str) -> list[EligibilityRule]:
+        # The rules for any gender, then those for the user's gender
+        rules = []
+        for key in (None, gender):
+            index = self._indexes.get(key)
+            if index is not None:
+                rules.extend(index.find(age_days))
+        return rules
+
+    async def recommend(
+        self,
+        db: AsyncSession,
+        date_of_birth: date,
+        gender: str,
+        today: date | None = None,
+    ) -> list[dict]:
+        # Returns the vaccines the user is eligible for, each with its matching
+        # criteria, as in `VaccineResponse`
+        await self._refresh(db)
+
+        today = today or date.today()
+        age_days = (today - date_of_birth).days
+
+        criterias_by_vaccine = defaultdict(list)
+        for rule in self.match(age_days, gender):
+            criterias_by_vaccine[rule.vaccine_id].append(rule.criteria)
+
+        return [
+            {**vaccine, "vaccine_criterias": criterias_by_vaccine[vaccine_id]}
+            for vaccine_id, vaccine in self._vaccines.items()
+            if vaccine_id in criterias_by_vaccine
+        ]
+
+
+vaccine_eligibility = VaccineEligibility(settings.vaccine_eligibility_refresh_interval)
@@ -0,0 +1,271 @@
+import heapq
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from core.config import settings
+from models.models import BookingSlot, SlotHold
+from sqlalchemy import ColumnElement, delete, distinct, func, literal
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+
+def _utcnow() -> datetime:
+    # Holds are stored as naive UTC datetimes, like the other timestamps
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class MemorySlotHolds:
+    """
+    In-process holds on booking slots: a user holding a slot has one of its places
+    reserved for them for `ttl` seconds, and a slot counts as held for a user once
+    other users hold as many places as remain. Expired holds are dropped in bulk,
+    from a heap ordered by expiry, whenever holds are read or written.
+
+    Holds are only visible to the worker that placed them, see `DatabaseSlotHolds`
+    to share them between workers.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # slot id -> user id -> expiry
+        self._holds: dict[str, dict[str, float]] = {}
+        self._expiry: list[tuple[float, str, str]] = []
+
+    def clear(self) -> None:
+        self._holds.clear()
+        self._expiry.clear()
+
+    def _expire(self, now: float) -> None:
+        while self._expiry and self._expiry[0][0] <= now:
+            _, slot_id, user_id = heapq.heappop(self._expiry)
+            self._drop(slot_id, user_id, now)
+
+    def _drop(self, slot_id: str, user_id: str, now: float | None = None) -> bool:
+        # Drops the user's hold on the slot (only if expired by `now`, if given)
+        holders = self._holds.get(slot_id)
+        if not holders or user_id not in holders:
+            return False
+        # A refreshed hold has a later entry in the heap
+        if now is not None and holders[user_id] > now:
+            return False
+
+        del holders[user_id]
+        if not holders:
+            del self._holds[slot_id]
+        return True
+
+    def _places_held_by_others(self, slot_id: str, user_id: str) -> int:
+        holders = self._holds.get(slot_id, {})
+        return len(holders) - (user_id in holders)
+
+    async def hold(
+        self, db: AsyncSession, slot_id: str, user_id: str
+    ) -> datetime | None:
+        # Returns when the hold expires, or None if other users hold every remaining
+        # place. The slot is usually already loaded by the caller
+        booking_slot = await db.get(BookingSlot, slot_id)
+
+        now = time.time()
+        self._expire(now)
+
+        if (
+            not booking_slot
+            or self._places_held_by_others(slot_id, user_id) >= booking_slot.remaining
+        ):
+            return None
+
+        expires_at = now + self.ttl
+        self._holds.setdefault(slot_id, {})[user_id] = expires_at
+        heapq.heappush(self._expiry, (expires_at, slot_id, user_id))
+
+        return datetime.fromtimestamp(expires_at, timezone.utc).replace(tzinfo=None)
+
+    async def release(self, db: AsyncSession, slot_id: str, user_id: str) -> bool:
+        self._expire(time.time())
+
+        return self._drop(slot_id, user_id)
+
+    async def release_in_transaction(
+        self, db: AsyncSession, slot_id: str, user_id: str
+    ) -> None:
+        # In-process holds cannot be rolled back, so the hold on a booked slot is only
+        # released once the booking is committed, see `release_committed`
+        pass
+
+    def release_committed(self, slot_id: str, user_id: str) -> None:
+        self._drop(slot_id, user_id)
+
+    async def holders(self, db: AsyncSession, slot_id: str) -> set[str]:
+        self._expire(time.time())
+
+        return set(self._holds.get(slot_id, ()))
+
+    def not_held_by_others(self, user_id: str) -> ColumnElement[bool] | None:
+        # In-process holds cannot be left out in SQL, see `held_by_others`
+        return None
+
+    async def count_held_by_others(self, db: AsyncSession, user_id: str) -> int:
+        # At most this many slots are held by other users (i.e., how many more slots
+        # to fetch, so that enough are left once the held ones are dropped)
+        self._expire(time.time())
+
+        return sum(
+            1
+            for slot_id in self._holds
+            if self._places_held_by_others(slot_id, user_id)
+        )
+
+    async def held_by_others(
+        self, db: AsyncSession, slot_ids: Iterable[str], user_id: str
+    ) -> set[str]:
+        # The slots among `slot_ids` of which other users hold every remaining place.
+        # Their remaining places are only looked up if other users hold any
+        self._expire(time.time())
+
+        places = {
+            slot_id: self._places_held_by_others(slot_id, user_id)
+            for slot_id in slot_ids
+        }
+        places = {slot_id: held for slot_id, held in places.items() if held}
+        if not places:
+            return set()
+
+        result = await db.execute(
+            select(BookingSlot.id, BookingSlot.remaining).where(
+                BookingSlot.id.in_(places)
+            )
+        )
+        return {
+            slot_id for slot_id, remaining in result if places[slot_id] >= remaining
+        }
+
+
+class DatabaseSlotHolds:
+    """
+    Holds on booking slots kept in the `SlotHolds` table (one row per slot and user
+    holding one of its places), so that every worker sees them. Expired holds are
+    deleted in bulk whenever a hold is placed, and are ignored until then. Changes
+    are committed by the caller.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    def clear(self) -> None:
+        pass
+
+    def _places_held_by_others(
+        self, slot_id: ColumnElement[str] | str, user_id: str, now: datetime
+    ) -> ColumnElement[int]:
+        return (
+            select(func.count())
+            .where(
+                SlotHold.booking_slot_id == slot_id,
+                SlotHold.user_id != user_id,
+                SlotHold.expires_at > now,
+            )
+            .scalar_subquery()
+        )
+
+    async def hold(
+        self, db: AsyncSession, slot_id: str, user_id: str
+    ) -> datetime | None:
+        now = _utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+
+        await db.execute(delete(SlotHold).where(SlotHold.expires_at <= now))
+
+        # Hold a place, or refresh our hold, only if other users hold fewer places
+        # than remain, in one statement
+        remaining = (
+            select(BookingSlot.remaining)
+            .where(BookingSlot.id == slot_id)
+            .scalar_subquery()
+        )
+        stmt = insert(SlotHold).from_select(
+            ["booking_slot_id", "user_id", "expires_at"],
+            select(
+                literal(slot_id),
+                literal(user_id),
+                literal(expires_at, SlotHold.expires_at.type),
+            ).where(self._places_held_by_others(slot_id, user_id, now) < remaining),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SlotHold.booking_slot_id, SlotHold.user_id],
+            set_={"expires_at": expires_at},
+        ).returning(SlotHold.expires_at)
+
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def release(self, db: AsyncSession, slot_id: str, user_id: str) -> bool:
+        stmt = (
+            delete(SlotHold)
+            .where(
+                SlotHold.booking_slot_id == slot_id,
+                SlotHold.user_id == user_id,
+                SlotHold.expires_at > _utcnow(),
+            )
+            .returning(SlotHold.booking_slot_id)
+        )
+
+        result = await db.execute(stmt)
+        return result.first() is not None
+
+    async def release_in_transaction(
+        self, db: AsyncSession, slot_id: str, user_id: str
+    ) -> None:
+        # The hold on a booked slot is released with the booking, and restored if it
+        # is rolled back
+        await self.release(db, slot_id, user_id)
+
+    def release_committed(self, slot_id: str, user_id: str) -> None:
+        pass
+
+    async def holders(self, db: AsyncSession, slot_id: str) -> set[str]:
+        stmt = select(SlotHold.user_id).where(
+            SlotHold.booking_slot_id == slot_id, SlotHold.expires_at > _utcnow()
+        )
+
+        result = await db.execute(stmt)
+        return set(result.scalars())
+
+    def not_held_by_others(self, user_id: str) -> ColumnElement[bool] | None:
+        # Leaves out the `BookingSlots` rows of the enclosing query of which other
+        # users hold every remaining place, counted on the `SlotHolds` primary key
+        held = self._places_held_by_others(BookingSlot.id, user_id, _utcnow())
+        return held < BookingSlot.remaining
+
+    async def count_held_by_others(self, db: AsyncSession, user_id: str) -> int:
+        stmt = select(func.count(distinct(SlotHold.booking_slot_id))).where(
+            SlotHold.user_id != user_id, SlotHold.expires_at > _utcnow()
+        )
+
+        result = await db.execute(stmt)
+        return result.scalar_one()
+
+    async def held_by_others(
+        self, db: AsyncSession, slot_ids: Iterable[str], user_id: str
+    ) -> set[str]:
+        stmt = (
+            select(SlotHold.booking_slot_id)
+            .join(BookingSlot, BookingSlot.id == SlotHold.booking_slot_id)
+            .where(
+                SlotHold.booking_slot_id.in_(slot_ids),
+                SlotHold.user_id != user_id,
+                SlotHold.expires_at > _utcnow(),
+            )
+            .group_by(SlotHold.booking_slot_id, BookingSlot.remaining)
+            .having(func.count() >= BookingSlot.remaining)
+        )
+
+        result = await db.execute(stmt)
+        return set(result.scalars())
+
+
+if settings.slot_hold_backend == "database":
+    slot_holds = DatabaseSlotHolds(settings.slot_hold_ttl)
+else:
+    slot_holds = MemorySlotHolds(settings.slot_hold_ttl)
@@ -0,0 +1,160 @@
+import heapq
+import itertools
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime
+from operator import itemgetter
+from typing import Collection, Iterable, Protocol
+
+from core.config import settings
+from models.models import BookingSlot
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+_slot_datetime = itemgetter(0)
+
+
+class Slot(Protocol):
+    # A `BookingSlot`, or a row with the same columns
+    id: str
+    polyclinic_id: str
+    vaccine_id: str
+    datetime: datetime
+    remaining: int
+
+
+class SlotInventory:
+    """
+    In-process inventory of open booking slots, kept as (datetime, id) lists sorted
+    per vaccine and polyclinic, so that availability is answered with range lookups.
+
+    It is loaded on first use and reloaded every `refresh_interval` seconds, or on
+    the next use after `invalidate()` is called. In between, the booking router
+    updates it whenever a slot is booked or released.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._slots: dict[str, dict[str, list[tuple[datetime, str]]]] | None = None
+        self._loaded_at = 0.0
+
+    def invalidate(self) -> None:
+        self._slots = None
+
+    async def load(self, db: AsyncSession) -> None:
+        stmt = select(
+            BookingSlot.datetime,
+            BookingSlot.id,
+            BookingSlot.vaccine_id,
+            BookingSlot.polyclinic_id,
+        ).where(BookingSlot.is_available)
+        result = await db.execute(stmt)
+
+        slots = defaultdict(lambda: defaultdict(list))
+        for slot_datetime, id, vaccine_id, polyclinic_id in result:
+            slots[vaccine_id][polyclinic_id].append((slot_datetime, id))
+
+        for polyclinic_slots in slots.values():
+            for open_slots in polyclinic_slots.values():
+                open_slots.sort()
+
+        self._slots = slots
+        self._loaded_at = time.monotonic()
+
+    async def find(
+        self,
+        db: AsyncSession,
+        vaccine_ids: Iterable[str],
+        start_datetime: datetime | None = None,
+        end_datetime: datetime | None = None,
+        limit: int = 1,
+        polyclinic_ids: set[str] | None = None,
+        exclude: Collection[str] = frozenset(),
+    ) -> list[str]:
+        # Returns the ids of the first `limit` open slots (between both datetimes,
+        # inclusive) of each polyclinic, ordered by date and time, leaving out the
+        # slots in `exclude` (e.g., held slots)
+        if (
+            self._slots is None
+            or time.monotonic() - self._loaded_at > self.refresh_interval
+        ):
+            await self.load(db)
+
+        ranges_by_polyclinic = defaultdict(list)
+
+        for vaccine_id in vaccine_ids:
+            for polyclinic_id, open_slots in self._slots.get(vaccine_id, {}).items():
+                if polyclinic_ids is not None and polyclinic_id not in polyclinic_ids:
+                    continue
+
+                lo = 0
+                hi = len(open_slots)
+                if start_datetime is not None:
+                    lo = bisect_left(open_slots, start_datetime, key=_slot_datetime)
+                if end_datetime is not None:
+                    hi = bisect_right(open_slots, end_datetime, key=_slot_datetime)
+
+                if lo < hi:
+                    ranges_by_polyclinic[polyclinic_id].append(
+                        self._first(open_slots, lo, hi, limit, exclude)
+                    )
+
+        found = []
+        for ranges in ranges_by_polyclinic.values():
+            # A polyclinic may have slots for more than one matching vaccine
+            found.extend(itertools.islice(heapq.merge(*ranges), limit))
+
+        return [id for _, id in sorted(found)]
+
+    @staticmethod
+    def _first(
+        open_slots: list[tuple[datetime, str]],
+        lo: int,
+        hi: int,
+        limit: int,
+        exclude: Collection[str],
+    ) -> list[tuple[datetime, str]]:
+        if not exclude:
+            return open_slots[lo : min(hi, lo + limit)]
+
+        found = []
+        for index in range(lo, hi):
+            if open_slots[index][1] not in exclude:
+                found.append(open_slots[index])
+                if len(found) == limit:
+                    break
+        return found
+
+    def add(self, slot: Slot) -> None:
+        if self._slots is None:
+            return
+
+        open_slots = self._slots[slot.vaccine_id][slot.polyclinic_id]
+        key = (slot.datetime, slot.id)
+
+        index = bisect_left(open_slots, key)
+        if index == len(open_slots) or open_slots[index] != key:
+            open_slots.insert(index, key)
+
+    def remove(self, slot: Slot) -> None:
+        if self._slots is None:
+            return
+
+        open_slots = self._slots.get(slot.vaccine_id, {}).get(slot.polyclinic_id, [])
+        key = (slot.datetime, slot.id)
+
+        index = bisect_left(open_slots, key)
+        if index < len(open_slots) and open_slots[index] == key:
+            del open_slots[index]
+
+    def update(self, slot: Slot) -> None:
+        # Keep the slot listed only while places remain, e.g. after one of them is
+        # booked or released
+        if slot.remaining > 0:
+            self.add(slot)
+        else:
+            self.remove(slot)
+
+
+slot_inventory = SlotInventory(settings.slot_inventory_refresh_interval)
@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+
+from core.config import settings
+from models.models import User
+from sqlalchemy import inspect
+
+_USER_COLUMNS = [column.key for column in inspect(User).column_attrs]
+
+
+class PrincipalCache:
+    """
+    In-process cache of the users authenticated by `get_current_user`, keyed by user
+    id, so that a request with a known token does not query the `Users` table.
+
+    Entries expire `ttl` seconds after they are loaded, and the least recently used
+    ones are evicted beyond `max_size` entries. The user router invalidates an entry
+    when its user is updated or deleted.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # User id -> (expiry, column values), least recently used first
+        self._users: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        # Incremented by every invalidation, so that a user read before one of them
+        # is not cached after it
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def invalidate(self, user_id: str | None = None) -> None:
+        # Drops the user with the given id, or every user
+        if user_id is None:
+            self._users.clear()
+        else:
+            self._users.pop(user_id, None)
+        self.generation += 1
+
+    def get(self, user_id: str) -> User | None:
+        entry = self._users.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+
+        self._users.move_to_end(user_id)
+        self.hits += 1
+
+        # A new (i.e., transient) instance for each request, so that requests do not
+        # share state through it
+        return User(**entry[1])
+
+    def put(self, user: User, generation: int) -> None:
+        # `generation` is the value of `self.generation` before the user was read
+        if generation != self.generation:
+            return
+
+        columns = {key: getattr(user, key) for key in _USER_COLUMNS}
+        self._users[user.id] = (time.monotonic() + self.ttl, columns)
+        self._users.move_to_end(user.id)
+
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+
+
+principal_cache = PrincipalCache(
+    settings.principal_cache_ttl, settings.principal_cache_max_size
+)
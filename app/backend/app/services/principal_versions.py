@@ -0,0 +1,47 @@
+import time
+from collections import OrderedDict
+
+from core.config import settings
+
+
+class PrincipalVersions:
+    """
+    In-process registry of the users updated or deleted by this process, against
+    which the principal embedded in an access token is checked, so that claims read
+    before an update are looked up again.
+
+    A user is only remembered for `max_age` seconds, since claims older than that
+    are looked up again anyway.
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        # User id -> (time of the change, version or None once deleted), oldest first
+        self._versions: OrderedDict[str, tuple[float, int | None]] = OrderedDict()
+
+    def clear(self) -> None:
+        self._versions.clear()
+
+    def _record(self, user_id: str, version: int | None) -> None:
+        now = time.monotonic()
+        self._versions[user_id] = (now, version)
+        self._versions.move_to_end(user_id)
+
+        while next(iter(self._versions.values()))[0] < now - self.max_age:
+            self._versions.popitem(last=False)
+
+    def update(self, user_id: str, version: int) -> None:
+        self._record(user_id, version)
+
+    def delete(self, user_id: str) -> None:
+        self._record(user_id, None)
+
+    def is_current(self, user_id: str, version: int) -> bool:
+        if user_id not in self._versions:
+            return True
+
+        latest = self._versions[user_id][1]
+        return latest is not None and version >= latest
+
+
+principal_versions = PrincipalVersions(settings.access_token_claims_max_age)
@@ -0,0 +1,295 @@
+import heapq
+import itertools
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Collection, Iterator
+
+from models.models import BookingSlot, Clinic, ScheduleRule, Vaccine
+from schemas.booking import ScheduleRuleRequest
+from services.slot_generator import check_templates
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
+
+# Virtual slot ids are UUIDv8s carrying the first 88 bits of the rule id and the slot
+# time, in minutes since the epoch (34 bits), so that a booking can be traced back to
+# its rule and time without storing the slot beforehand
+_RULE_BITS = 88
+_MINUTE_BITS = 34
+_EPOCH = datetime(1970, 1, 1)
+
+# Upper bound on the slots listed at once (in all, or per polyclinic), whatever the
+# limits asked for
+MAX_LISTED_SLOTS = 10000
+
+
+@dataclass(frozen=True)
+class VirtualSlot:
+    # Has the attributes of a `BookingSlot` read by `AvailableSlotResponse`
+    id: str
+    datetime: datetime
+    polyclinic_id: str
+    vaccine_id: str
+    polyclinic: Clinic
+
+
+def encode_slot_id(rule_id: str, slot_datetime: datetime) -> str:
+    rule_prefix = uuid.UUID(rule_id).int >> (128 - _RULE_BITS)
+    minutes = int((slot_datetime - _EPOCH).total_seconds()) // 60
+    payload = (rule_prefix << _MINUTE_BITS) | minutes
+
+    # Lay the 122 bits of payload around the version (8) and variant (0b10) bits
+    value = (
+        (payload >> 74) << 80
+        | 8 << 76
+        | ((payload >> 62) & 0xFFF) << 64
+        | 0b10 << 62
+        | payload & ((1 << 62) - 1)
+    )
+    return str(uuid.UUID(int=value))
+
+
+def decode_slot_id(slot_id: str) -> tuple[str, datetime] | None:
+    # Returns the rule id prefix (as it appears in the rule id) and the slot time of a
+    # virtual slot id, or None for any other id
+    try:
+        value = uuid.UUID(slot_id)
+    except ValueError:
+        return None
+
+    if value.version != 8:
+        return None
+
+    value = value.int
+    payload = (
+        (value >> 80) << 74 | ((value >> 64) & 0xFFF) << 62 | value & ((1 << 62) - 1)
+    )
+    minutes = payload & ((1 << _MINUTE_BITS) - 1)
+
+    # i.e., the first 22 hex digits of the rule id, with its dashes
+    h = f"{payload >> _MINUTE_BITS:022x}"
+    rule_prefix = f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+    return rule_prefix, _EPOCH + timedelta(minutes=minutes)
+
+
+def rule_times(
+    rule: ScheduleRule, start: datetime, end: datetime
+) -> Iterator[datetime]:
+    # The slot times of a rule between both datetimes (inclusive), in order
+    step = timedelta(minutes=rule.interval_minutes)
+    weekdays = {int(weekday) for weekday in rule.weekdays.split(",")}
+
+    first_day = max(start.date(), rule.valid_from)
+    last_day = min(end.date(), rule.valid_until or date.max)
+
+    for days in range((last_day - first_day).days + 1):
+        day = first_day + timedelta(days=days)
+        if day.weekday() not in weekdays:
+            continue
+
+        slot = datetime.combine(day, rule.start_time)
+        day_end = datetime.combine(day, rule.end_time)
+        while slot + step <= day_end:
+            if slot > end:
+                return
+            if slot >= start:
+                yield slot
+            slot += step
+
+
+def is_rule_time(rule: ScheduleRule, slot_datetime: datetime) -> bool:
+    return next(rule_times(rule, slot_datetime, slot_datetime), None) == slot_datetime
+
+
+async def create_schedule_rule(
+    db: AsyncSession, request: ScheduleRuleRequest
+) -> ScheduleRule:
+    # Raises LookupError if the polyclinic or vaccine does not exist. Changes are
+    # committed by the caller
+    await check_templates(db, [request])
+
+    rule = ScheduleRule(
+        polyclinic_id=str(request.polyclinic_id),
+        vaccine_id=str(request.vaccine_id),
+        weekdays=",".join(map(str, sorted(set(request.weekdays)))),
+        start_time=request.start_time,
+        end_time=request.end_time,
+        interval_minutes=request.interval_minutes,
+        capacity=request.capacity,
+        valid_from=request.valid_from,
+        valid_until=request.valid_until,
+    )
+    db.add(rule)
+    await db.flush()
+
+    return rule
+
+
+async def find_rule_slots(
+    db: AsyncSession,
+    vaccine_name: str,
+    start_datetime: datetime,
+    end_datetime: datetime,
+    polyclinic_name: str | None = None,
+    polyclinic_ids: Collection[str] | None = None,
+    timeslot_limit: int | None = None,
+    limit: int | None = None,
+    after: tuple[datetime, str] | None = None,
+    exclude: Collection[str] = frozenset(),
+) -> list[VirtualSlot]:
+    """
+    Compute the open slots of the schedule rules of a vaccine between both datetimes,
+    ordered by date and time: the first `timeslot_limit` of each polyclinic, or the
+    first `limit` after the `after` (datetime, id) key.
+
+    Slots that are already stored are listed with their own id, unless fully booked.
+    Others get a virtual id, which `materialize_slot` turns into a stored slot.
+    """
+    # Step 1: Load the matching rules, with their polyclinic and its address
+    stmt = (
+        select(ScheduleRule)
+        .join(ScheduleRule.polyclinic)
+        .options(joinedload(ScheduleRule.polyclinic).joinedload(Clinic.address))
+        .where(
+            ScheduleRule.vaccine_id.in_(
+                select(Vaccine.id).where(
+                    func.lower(Vaccine.name).like(f"%{vaccine_name.lower()}%")
+                )
+            )
+        )
+    )
+    if polyclinic_name:
+        stmt = stmt.where(func.lower(Clinic.name).like(f"%{polyclinic_name.lower()}%"))
+    if polyclinic_ids is not None:
+        stmt = stmt.where(ScheduleRule.polyclinic_id.in_(polyclinic_ids))
+
+    result = await db.execute(stmt)
+    rules = result.unique().scalars().all()
+
+    if not rules:
+        return []
+
+    # Step 2: Load the slots stored for these rules so far, i.e. booked ones
+    stmt = select(
+        BookingSlot.polyclinic_id,
+        BookingSlot.vaccine_id,
+        BookingSlot.datetime,
+        BookingSlot.id,
+        BookingSlot.status,
+    ).where(
+        BookingSlot.polyclinic_id.in_({rule.polyclinic_id for rule in rules}),
+        BookingSlot.vaccine_id.in_({rule.vaccine_id for rule in rules}),
+        BookingSlot.datetime.between(start_datetime, end_datetime),
+    )
+    result = await db.execute(stmt)
+    stored = {(p, v, dt): (id, status) for p, v, dt, id, status in result}
+
+    # Step 3: Walk through the slots of each rule, leaving out booked and excluded
+    # slots
+    def slots(rule: ScheduleRule) -> Iterator[tuple[datetime, str, Any]]:
+        for slot_datetime in rule_times(rule, start_datetime, end_datetime):
+            key = (rule.polyclinic_id, rule.vaccine_id, slot_datetime)
+            id, status = stored.get(key, (None, None))
+            if status is not None and status != "available":
+                continue
+
+            id = id or encode_slot_id(rule.id, slot_datetime)
+            if id not in exclude:
+                yield slot_datetime, id, rule
+
+    def merge(rules: list[ScheduleRule]) -> Iterator[VirtualSlot]:
+        # Rules of a polyclinic may overlap, so a time is only listed once (i.e.,
+        # with the smallest id), and only after the `after` key
+        listed = set()
+        for slot_datetime, id, rule in heapq.merge(
+            *map(slots, rules), key=lambda slot: slot[:2]
+        ):
+            key = (rule.polyclinic_id, rule.vaccine_id, slot_datetime)
+            if key in listed:
+                continue
+
+            listed.add(key)
+            if not after or (slot_datetime, id) > after:
+                yield VirtualSlot(
+                    id,
+                    slot_datetime,
+                    rule.polyclinic_id,
+                    rule.vaccine_id,
+                    rule.polyclinic,
+                )
+
+    if timeslot_limit is None:
+        return list(
+            itertools.islice(
+                merge(rules), min(limit or MAX_LISTED_SLOTS, MAX_LISTED_SLOTS)
+            )
+        )
+
+    rules_by_polyclinic = {}
+    for rule in rules:
+        rules_by_polyclinic.setdefault(rule.polyclinic_id, []).append(rule)
+
+    found = []
+    for polyclinic_rules in rules_by_polyclinic.values():
+        found.extend(
+            itertools.islice(
+                merge(polyclinic_rules), min(timeslot_limit, MAX_LISTED_SLOTS)
+            )
+        )
+
+    return sorted(found, key=lambda slot: (slot.datetime, slot.id))
+
+
+async def materialize_slot(db: AsyncSession, slot_id: str) -> str:
+    """
+    Store the slot of a virtual slot id, if it is a slot of its rule, and return the
+    id of the stored slot. Any other id is returned as is. Changes are committed by
+    the caller.
+    """
+    decoded = decode_slot_id(slot_id)
+    if not decoded:
+        return slot_id
+
+    rule_prefix, slot_datetime = decoded
+
+    stmt = select(ScheduleRule).where(
+        ScheduleRule.id.startswith(rule_prefix, autoescape=True)
+    )
+    result = await db.execute(stmt)
+    rule = result.scalars().first()
+
+    if not rule or not is_rule_time(rule, slot_datetime):
+        return slot_id
+
+    # The slot may already be stored, e.g. by an overlapping rule
+    stmt = (
+        insert(BookingSlot)
+        .values(
+            id=slot_id,
+            polyclinic_id=rule.polyclinic_id,
+            vaccine_id=rule.vaccine_id,
+            datetime=slot_datetime,
+            capacity=rule.capacity,
+            remaining=rule.capacity,
+        )
+        .on_conflict_do_nothing()
+        .returning(BookingSlot.id)
+    )
+    result = await db.execute(stmt)
+    stored_id = result.scalar_one_or_none()
+
+    if stored_id is None:
+        result = await db.execute(
+            select(BookingSlot.id).where(
+                BookingSlot.polyclinic_id == rule.polyclinic_id,
+                BookingSlot.vaccine_id == rule.vaccine_id,
+                BookingSlot.datetime == slot_datetime,
+            )
+        )
+        stored_id = result.scalar_one_or_none() or slot_id
+
+    return stored_id
@@ -0,0 +1,194 @@
+import asyncio
+import json
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cached_property
+from typing import AsyncIterator, Collection
+
+from core.config import settings
+from services.inventory import Slot
+
+# Server-sent event types: a place of a slot was booked, or one was given back
+SLOT_TAKEN = "slot-taken"
+SLOT_FREED = "slot-freed"
+
+
+@dataclass(frozen=True)
+class SlotEvent:
+    type: str
+    id: str
+    polyclinic_id: str
+    vaccine_id: str
+    datetime: datetime
+    remaining: int
+
+    @cached_property
+    def message(self) -> str:
+        # A server-sent event, see https://html.spec.whatwg.org/#server-sent-events.
+        # It is encoded once, however many subscribers it is sent to
+        data = {
+            "id": self.id,
+            "polyclinic_id": self.polyclinic_id,
+            "vaccine_id": self.vaccine_id,
+            "datetime": self.datetime.isoformat(),
+            "remaining": self.remaining,
+        }
+        return f"event: {self.type}\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscription:
+    # Kept small, since a subscription lives for as long as its connection, which
+    # is mostly idle. Events are buffered until the stream sends them, in a deque
+    # only allocated with the first event, and `None` tells the stream to close
+    __slots__ = ("vaccine_ids", "polyclinic_ids", "start", "end", "_events", "_waiter")
+
+    def __init__(
+        self,
+        vaccine_ids: frozenset[str],
+        polyclinic_ids: frozenset[str] | None,
+        start: datetime | None,
+        end: datetime | None,
+    ):
+        self.vaccine_ids = vaccine_ids
+        self.polyclinic_ids = polyclinic_ids
+        self.start = start
+        self.end = end
+        self._events: deque[SlotEvent | None] | None = None
+        self._waiter: asyncio.Future | None = None
+
+    def matches(self, event: SlotEvent) -> bool:
+        # Subscriptions are indexed by vaccine, so only the other filters are checked
+        return (
+            (self.polyclinic_ids is None or event.polyclinic_id in self.polyclinic_ids)
+            and (self.start is None or event.datetime >= self.start)
+            and (self.end is None or event.datetime <= self.end)
+        )
+
+    def put(self, event: SlotEvent | None, max_queued: int) -> None:
+        if self._events is None:
+            self._events = deque()
+        elif self._events and self._events[-1] is None:
+            return
+
+        # A subscriber that falls this far behind is closed rather than buffered,
+        # and is expected to reconnect and reload the available slots
+        if event is not None and len(self._events) >= max_queued:
+            self._events.clear()
+            event = None
+
+        self._events.append(event)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def get(self) -> SlotEvent | None:
+        while not self._events:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+        return self._events.popleft()
+
+
+class SlotEventBroker:
+    """
+    In-process fan-out of availability changes to the subscribers of
+    `/bookings/available/stream`, each with its own vaccine, polyclinic and datetime
+    filters.
+
+    The booking router publishes an event once a booking, cancellation or
+    reschedule is committed. Subscriptions are indexed by vaccine, so a change only
+    visits the subscribers of its vaccine.
+    """
+
+    def __init__(self, max_queued: int, keepalive_interval: float):
+        self.max_queued = max_queued
+        self.keepalive_interval = keepalive_interval
+        self._subscriptions: defaultdict[str, set[Subscription]] = defaultdict(set)
+        self.subscribers = 0
+
+    def clear(self) -> None:
+        for subscription in self._all():
+            subscription.put(None, self.max_queued)
+        self._subscriptions.clear()
+        self.subscribers = 0
+
+    def _all(self) -> set[Subscription]:
+        return set().union(*self._subscriptions.values())
+
+    def subscribe(
+        self,
+        vaccine_ids: Collection[str],
+        polyclinic_ids: Collection[str] | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> Subscription:
+        subscription = Subscription(
+            frozenset(vaccine_ids),
+            frozenset(polyclinic_ids) if polyclinic_ids is not None else None,
+            start,
+            end,
+        )
+        for vaccine_id in subscription.vaccine_ids:
+            self._subscriptions[vaccine_id].add(subscription)
+        self.subscribers += 1
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        removed = False
+        for vaccine_id in subscription.vaccine_ids:
+            subscriptions = self._subscriptions.get(vaccine_id)
+            if subscriptions and subscription in subscriptions:
+                subscriptions.remove(subscription)
+                removed = True
+                if not subscriptions:
+                    del self._subscriptions[vaccine_id]
+
+        if removed:
+            self.subscribers -= 1
+
+    def publish(self, type: str, slot: Slot) -> None:
+        subscriptions = self._subscriptions.get(slot.vaccine_id)
+        if not subscriptions:
+            return
+
+        event = SlotEvent(
+            type,
+            slot.id,
+            slot.polyclinic_id,
+            slot.vaccine_id,
+            slot.datetime,
+            slot.remaining,
+        )
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                subscription.put(event, self.max_queued)
+
+    async def stream(self, subscription: Subscription) -> AsyncIterator[str]:
+        # The body of a `text/event-stream` response. A comment is sent right away, so
+        # that the client knows it is connected, and whenever the stream has been
+        # idle for `keepalive_interval` seconds, so that proxies keep it open
+        try:
+            yield ": connected\n\n"
+
+            while True:
+                try:
+                    async with asyncio.timeout(self.keepalive_interval):
+                        event = await subscription.get()
+                except TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if event is None:
+                    return
+                yield event.message
+        finally:
+            self.unsubscribe(subscription)
+
+
+slot_events = SlotEventBroker(
+    settings.slot_events_max_queued, settings.slot_events_keepalive_interval
+)
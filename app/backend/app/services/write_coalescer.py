@@ -0,0 +1,121 @@
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+from core.config import settings
+from models.database import AsyncSessionLocal
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+T = TypeVar("T")
+
+Operation = Callable[[AsyncSession], Awaitable[T]]
+
+
+class WriteCoalescer:
+    """
+    Group commit for short write operations: operations submitted within `window`
+    seconds of each other (up to `max_batch` of them) are applied one after the other
+    in a single transaction, each in its own SAVEPOINT, and committed together.
+
+    An operation that raises only rolls back its own changes, and its caller gets the
+    exception. If the transaction itself fails, every caller of the batch gets the
+    error.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        window: float,
+        max_batch: int,
+    ):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._batch: list[tuple[Operation, asyncio.Future]] | None = None
+        self._batch_full: asyncio.Event | None = None
+        # Batches being applied, so that their tasks are not garbage collected
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, operation: Operation[T]) -> T:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        if self._batch is None:
+            # Step 1: The first caller opens a batch, which is applied by a task of
+            # its own, so that it is applied even if that caller is cancelled
+            batch = self._batch = [(operation, future)]
+            batch_full = self._batch_full = asyncio.Event()
+
+            task = loop.create_task(self._run(batch, batch_full))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            # Step 2: Later callers join the open batch
+            self._batch.append((operation, future))
+            if len(self._batch) >= self.max_batch:
+                self._batch = None
+                self._batch_full.set()
+
+        # A cancelled caller does not cancel its operation, which is still applied
+        # (or rolled back) with the rest of the batch
+        return await asyncio.shield(future)
+
+    async def _run(
+        self,
+        batch: list[tuple[Operation, asyncio.Future]],
+        batch_full: asyncio.Event,
+    ) -> None:
+        try:
+            # Step 3: Wait for others to join the batch...
+            try:
+                await asyncio.wait_for(batch_full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+
+            # ...close it, so that later callers open the next one, and apply it
+            if self._batch is batch:
+                self._batch = None
+            await self._apply(batch)
+        finally:
+            # The batch is closed and no caller is left waiting, whatever happened
+            if self._batch is batch:
+                self._batch = None
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("The write was not applied."))
+
+    async def _apply(self, batch: list[tuple[Operation, asyncio.Future]]) -> None:
+        outcomes = []
+
+        try:
+            async with self.session_factory() as db:
+                # Take the write lock up front. The explicit BEGIN also keeps the
+                # SAVEPOINTs below from being committed on their own by SQLite
+                await db.execute(text("BEGIN IMMEDIATE"))
+
+                for operation, future in batch:
+                    try:
+                        async with db.begin_nested():
+                            outcomes.append((future, await operation(db), None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+
+                await db.commit()
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for future, result, exc in outcomes:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+write_coalescer = WriteCoalescer(
+    AsyncSessionLocal,
+    settings.booking_write_window,
+    settings.booking_write_max_batch,
+)
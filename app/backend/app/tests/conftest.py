@@ -1,20 +1,38 @@
+import re
 from pathlib import Path
 
 import jwt
+import pytest
 import pytest_asyncio
 from auth.oauth2 import create_access_token
 from core.config import settings
 from httpx import ASGITransport, AsyncClient
 from main import app
-from models.database import Base, get_db
+from models.database import (
+    Base,
+    create_db_engine,
+    get_db,
+    get_read_db,
+    get_read_only_url,
+)
 from requests import Response
+from services.admission import booking_admission
+from services.clinic_locator import clinic_locator
+from services.eligibility import vaccine_eligibility
+from services.holds import slot_holds
+from services.inventory import slot_inventory
+from services.principal_cache import principal_cache
+from services.principal_versions import principal_versions
+from services.slot_events import slot_events
+from services.write_coalescer import write_coalescer
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 # Database connection (existing SQLite file)
 DATABASE_URL = "sqlite+aiosqlite:///../../../data/test_vaccination_db.sqlite"
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+engine = create_db_engine(DATABASE_URL)
+read_engine = create_db_engine(get_read_only_url(DATABASE_URL), read_only=True)
 
 # Session creation
 TestingAsyncSessionLocal = async_sessionmaker(
@@ -24,6 +42,13 @@
     autoflush=False,
     expire_on_commit=False,
 )
+TestingReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
@@ -52,6 +77,16 @@ async def init_test_db():
             if stmt:
                 await conn.execute(text(stmt))
 
+    # 3) Reset in-process caches built from the previous test's data
+    clinic_locator.invalidate()
+    vaccine_eligibility.invalidate()
+    slot_inventory.invalidate()
+    principal_cache.invalidate()
+    principal_versions.clear()
+    slot_holds.clear()
+    booking_admission.clear()
+    slot_events.clear()
+
     # The fixture yields here, so tests can run with the fresh, seeded DB
     yield
 
@@ -74,14 +109,15 @@ async def session(init_test_db) -> AsyncSession:  # type: ignore
 @pytest_asyncio.fixture
 async def override_get_db_fixture(session: AsyncSession):
     """
-    Override FastAPI's get_db so that it yields our test session
-    instead of creating a brand new one from the real DB.
+    Override FastAPI's get_db and get_read_db so that they yield our test
+    session instead of creating a brand new one from the real DB.
     """
 
     async def _override_get_db():
         yield session
 
     app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_read_db] = _override_get_db
     yield  # tests will run after this
     app.dependency_overrides.clear()
 
@@ -194,3 +230,62 @@ async def authorized_client_for_scheduling(async_client: AsyncClient):
     }
 
     return async_client
+
+
+@pytest_asyncio.fixture
+async def concurrent_client_for_scheduling(
+    authorized_client_for_scheduling: AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    """
+    Return the scheduling client with database sessions per request (from separate
+    read and write engines), as in production, so that concurrent requests run in
+    their own transactions.
+    """
+
+    async def _get_db_per_request():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
+    async def _get_read_db_per_request():
+        async with TestingReadSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = _get_db_per_request
+    app.dependency_overrides[get_read_db] = _get_read_db_per_request
+    # Coalesced booking writes (if enabled) go to the test database too
+    monkeypatch.setattr(write_coalescer, "session_factory", TestingAsyncSessionLocal)
+
+    yield authorized_client_for_scheduling
+
+    # Connection pools that had to queue requests are bound to this test's event loop
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+def count_queries(res: Response) -> int:
+    # The number of SQL statements a response was served with, as reported in its
+    # `Server-Timing` header
+    match = re.search(
+        r'db;dur=[\d.]+;desc="(\d+) quer(?:y|ies)"',
+        res.headers.get("Server-Timing", ""),
+    )
+    assert match, "Response has no database Server-Timing metric."
+
+    return int(match[1])
+
+
+@pytest.fixture
+def assert_max_queries():
+    """
+    Return a function asserting that a response was served with at most
+    `max_queries` SQL statements, as reported in its `Server-Timing` header.
+    """
+
+    def _assert_max_queries(res: Response, max_queries: int):
+        count = count_queries(res)
+        assert count <= max_queries, (
+            f"{res.request.method} {res.request.url.path} made {count} queries "
+            f"(budget: {max_queries})."
+        )
+
+    return _assert_max_queries
@@ -0,0 +1,417 @@
+import csv
+import io
+import json
+import uuid
+from datetime import date, time
+
+import pytest
+from core.config import settings
+from httpx import AsyncClient
+from models.models import BookingSlot, ScheduleRule, VaccineRecord
+from requests import Response
+from schemas.booking import SlotTemplate
+from services.slot_generator import (
+    count_slots,
+    expand_template,
+    slot_batches,
+    uuid4_strings,
+)
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+# See data.sql for the clinics, vaccines and slots
+INFLUENZA_ID = "9004aab3-8993-4d37-81c3-78844191e5ec"
+HPV_ID = "a67ed08a-95f0-47d4-a97b-8153f1d7874a"
+YISHUN_POLYCLINIC_ID = "bd760847-db7e-439f-add8-3610167478ca"
+ADMIN_API_KEY = "test-admin-api-key"
+
+# Every Thursday from 9am to 12pm, i.e. 2025-04-03 has an 11am slot already
+TEMPLATE = {
+    "polyclinic_id": YISHUN_POLYCLINIC_ID,
+    "vaccine_id": INFLUENZA_ID,
+    "weekdays": [3],
+    "start_time": "09:00:00",
+    "end_time": "12:00:00",
+    "interval_minutes": 60,
+}
+
+
+@pytest.fixture
+def admin_headers(monkeypatch: pytest.MonkeyPatch) -> dict[str, str]:
+    monkeypatch.setattr(settings, "admin_api_key", ADMIN_API_KEY)
+    return {"X-Admin-API-Key": ADMIN_API_KEY}
+
+
+# ============================================================================
+# slot templates
+# ============================================================================
+def test_expand_template():
+    template = SlotTemplate(
+        polyclinic_id=YISHUN_POLYCLINIC_ID,
+        vaccine_id=INFLUENZA_ID,
+        weekdays=[0, 2],
+        start_time=time(9),
+        end_time=time(10, 10),
+        interval_minutes=20,
+    )
+
+    # Monday 2025-03-31 to Monday 2025-04-07, the last slot of a day ends by 10:10
+    slots = list(expand_template(template, date(2025, 3, 31), date(2025, 4, 7)))
+
+    times = ["09:00:00", "09:20:00", "09:40:00"]
+    assert slots == [
+        f"{day} {time_of_day}"
+        for day in ("2025-03-31", "2025-04-02", "2025-04-07")
+        for time_of_day in times
+    ]
+
+
+def test_count_slots():
+    templates = [
+        SlotTemplate(**TEMPLATE),
+        SlotTemplate(**{**TEMPLATE, "weekdays": [0, 5, 6], "interval_minutes": 20}),
+    ]
+
+    # Ranges starting on different weekdays, with and without a partial week
+    for start_date, end_date in [
+        (date(2025, 3, 31), date(2025, 4, 6)),
+        (date(2025, 4, 2), date(2025, 4, 3)),
+        (date(2025, 4, 4), date(2025, 6, 30)),
+    ]:
+        assert count_slots(templates, start_date, end_date) == sum(
+            len(list(expand_template(template, start_date, end_date)))
+            for template in templates
+        )
+
+
+def test_slot_batches():
+    template = SlotTemplate(**{**TEMPLATE, "capacity": 2})
+
+    # 13 Thursdays with 3 slots each, in batches of at most 10 rows
+    batches = list(slot_batches([template], date(2025, 4, 1), date(2025, 6, 30), 10))
+
+    assert [len(batch) for batch in batches] == [10, 10, 10, 9]
+    id, polyclinic_id, vaccine_id, slot_datetime, capacity, remaining = batches[0][0]
+    assert uuid.UUID(id).version == 4
+    assert (polyclinic_id, vaccine_id, slot_datetime, capacity, remaining) == (
+        YISHUN_POLYCLINIC_ID,
+        INFLUENZA_ID,
+        "2025-04-03 09:00:00",
+        2,
+        2,
+    )
+
+
+def test_uuid4_strings():
+    ids = uuid4_strings(1000)
+
+    assert len(set(ids)) == len(ids)
+    assert all(uuid.UUID(id).version == 4 for id in ids)
+    assert all(str(uuid.UUID(id)) == id for id in ids)
+
+
+# ============================================================================
+# admin slot generation
+# ============================================================================
+@pytest.mark.asyncio
+async def test_admin_generate_slots(
+    async_client: AsyncClient, session: AsyncSession, admin_headers: dict[str, str]
+):
+    json_body = {
+        "templates": [{**TEMPLATE, "capacity": 3}],
+        "start_date": "2025-04-01",
+        "end_date": "2025-04-14",
+    }
+
+    res: Response = await async_client.post(
+        "/admin/slots/generate", json=json_body, headers=admin_headers
+    )
+
+    # Two Thursdays, with 3 slots each, one of which already exists
+    assert res.status_code == 201
+    assert res.json()["created"] == 5
+    assert res.json()["skipped"] == 1
+
+    result = await session.execute(
+        select(BookingSlot.datetime, BookingSlot.remaining).where(
+            BookingSlot.polyclinic_id == YISHUN_POLYCLINIC_ID,
+            BookingSlot.vaccine_id == INFLUENZA_ID,
+            BookingSlot.is_available,
+        )
+    )
+    # New slots take 3 appointments each, the existing one is left as is
+    assert [
+        (slot.strftime("%m-%d %H"), remaining) for slot, remaining in sorted(result)
+    ] == [
+        ("04-03 09", 3),
+        ("04-03 10", 3),
+        ("04-03 11", 1),
+        ("04-10 09", 3),
+        ("04-10 10", 3),
+        ("04-10 11", 3),
+    ]
+
+    # Generating the same calendar again creates nothing
+    res = await async_client.post(
+        "/admin/slots/generate", json=json_body, headers=admin_headers
+    )
+    assert res.json()["created"] == 0
+    assert res.json()["skipped"] == 6
+
+    result = await session.execute(select(func.count()).select_from(BookingSlot))
+    assert result.scalar_one() == 11
+
+
+@pytest.mark.asyncio
+async def test_admin_generate_slots_too_many(
+    async_client: AsyncClient,
+    session: AsyncSession,
+    admin_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(settings, "slot_generation_max_rows", 5)
+    json_body = {
+        "templates": [TEMPLATE],
+        "start_date": "2025-04-01",
+        "end_date": "2025-04-14",
+    }
+
+    res: Response = await async_client.post(
+        "/admin/slots/generate", json=json_body, headers=admin_headers
+    )
+
+    # Two Thursdays with 3 slots each, rejected before anything is written
+    assert res.status_code == 400
+    assert res.json()["detail"] == (
+        "Too many slots (6, at most 5 per request). Use a shorter date range or the "
+        "slot_generator command."
+    )
+
+    result = await session.execute(select(func.count()).select_from(BookingSlot))
+    assert result.scalar_one() == 6
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "template, expected_status_code, expected_error_message",
+    [
+        (
+            {**TEMPLATE, "vaccine_id": "9004aab3-8993-4d37-81c3-78844191e5ea"},
+            404,
+            "Vaccine with id 9004aab3-8993-4d37-81c3-78844191e5ea not found.",
+        ),
+        (
+            {**TEMPLATE, "end_time": "08:00:00"},
+            422,
+            "Value error, End time must be after start time.",
+        ),
+        (
+            {**TEMPLATE, "weekdays": [7]},
+            422,
+            "Value error, Weekdays must be between 0 (Monday) and 6 (Sunday).",
+        ),
+    ],
+)
+async def test_admin_generate_slots_invalid_template(
+    async_client: AsyncClient,
+    admin_headers: dict[str, str],
+    template: dict,
+    expected_status_code: int,
+    expected_error_message: str,
+):
+    json_body = {
+        "templates": [template],
+        "start_date": "2025-04-01",
+        "end_date": "2025-04-14",
+    }
+
+    res: Response = await async_client.post(
+        "/admin/slots/generate", json=json_body, headers=admin_headers
+    )
+
+    assert res.status_code == expected_status_code
+    if res.status_code == 422:
+        assert res.json()["detail"][0].get("msg") == expected_error_message
+    else:
+        assert res.json().get("detail") == expected_error_message
+
+
+# ============================================================================
+# admin schedule rules
+# ============================================================================
+@pytest.mark.asyncio
+async def test_admin_create_and_delete_schedule_rule(
+    async_client: AsyncClient, session: AsyncSession, admin_headers: dict[str, str]
+):
+    json_body = {**TEMPLATE, "weekdays": [3, 1, 3], "valid_from": "2025-04-01"}
+
+    res: Response = await async_client.post(
+        "/admin/schedule-rules", json=json_body, headers=admin_headers
+    )
+
+    assert res.status_code == 201
+    rule_id = res.json()["id"]
+    assert res.json()["valid_until"] is None
+
+    rule = await session.get(ScheduleRule, rule_id)
+    assert rule.weekdays == "1,3"
+    assert rule.start_time == time(9)
+
+    res = await async_client.delete(
+        f"/admin/schedule-rules/{rule_id}", headers=admin_headers
+    )
+    assert res.status_code == 204
+
+    res = await async_client.delete(
+        f"/admin/schedule-rules/{rule_id}", headers=admin_headers
+    )
+    assert res.status_code == 404
+    assert res.json().get("detail") == f"Schedule rule with id {rule_id} not found."
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "rule, expected_status_code, expected_error_message",
+    [
+        (
+            {**TEMPLATE, "valid_from": "2025-04-01", "start_time": "09:00:30"},
+            422,
+            "Value error, Start time must be a whole minute.",
+        ),
+        (
+            {**TEMPLATE, "valid_from": "2025-04-01", "valid_until": "2025-03-01"},
+            422,
+            "Value error, Valid until must not be before valid from.",
+        ),
+        (
+            {
+                **TEMPLATE,
+                "valid_from": "2025-04-01",
+                "polyclinic_id": "bd760847-db7e-439f-add8-3610167478cb",
+            },
+            404,
+            "Polyclinic with id bd760847-db7e-439f-add8-3610167478cb not found.",
+        ),
+    ],
+)
+async def test_admin_create_invalid_schedule_rule(
+    async_client: AsyncClient,
+    admin_headers: dict[str, str],
+    rule: dict,
+    expected_status_code: int,
+    expected_error_message: str,
+):
+    res: Response = await async_client.post(
+        "/admin/schedule-rules", json=rule, headers=admin_headers
+    )
+
+    assert res.status_code == expected_status_code
+    if res.status_code == 422:
+        assert res.json()["detail"][0].get("msg") == expected_error_message
+    else:
+        assert res.json().get("detail") == expected_error_message
+
+
+# ============================================================================
+# admin cohort eligibility
+# ============================================================================
+# See data.sql for the users and their vaccine records
+NO_RECOMMENDATIONS_USER_ID = "d2e8d855-1c1a-4fe6-a8b8-ac823250a414"
+RECORDS_USER_ID = "8045a3aa-e221-4d9c-89c5-822ab96d4885"
+SCHEDULING_USER_ID = "564b4728-9436-4e1a-8da1-c40dde49a0cc"
+
+
+@pytest.mark.asyncio
+async def test_admin_cohort_eligibility(
+    async_client: AsyncClient, admin_headers: dict[str, str]
+):
+    res: Response = await async_client.get(
+        "/admin/cohorts/eligibility",
+        params={"as_of": "2026-01-01"},
+        headers=admin_headers,
+    )
+
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+
+    # The records user has booked influenza, and completed their single HPV dose
+    rows = [json.loads(line) for line in res.text.splitlines()]
+    assert sorted(
+        (row["user_id"], row["vaccine_id"], row["status"], row["days_since_last_dose"])
+        for row in rows
+    ) == sorted(
+        [
+            (NO_RECOMMENDATIONS_USER_ID, INFLUENZA_ID, "eligible", None),
+            (NO_RECOMMENDATIONS_USER_ID, HPV_ID, "eligible", None),
+            (SCHEDULING_USER_ID, INFLUENZA_ID, "eligible", None),
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_admin_cohort_eligibility_overdue(
+    async_client: AsyncClient, admin_headers: dict[str, str], session: AsyncSession
+):
+    # The influenza dose of the records user on 2025-04-01 is done, and is repeated
+    # yearly
+    await session.execute(
+        update(VaccineRecord)
+        .filter_by(id="b6732344-bc30-4401-9a69-b91e28273b8d")
+        .values(status="completed")
+    )
+    await session.commit()
+
+    res: Response = await async_client.get(
+        "/admin/cohorts/eligibility",
+        params={"format": "csv", "as_of": "2026-06-01"},
+        headers=admin_headers,
+    )
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    assert {
+        "user_id": RECORDS_USER_ID,
+        "vaccine_id": INFLUENZA_ID,
+        "vaccine": "Influenza (INF)",
+        "status": "overdue",
+        "days_since_last_dose": "426",
+    } in rows
+    assert len(rows) == 4
+
+
+# ============================================================================
+# unauthorised slot generation
+# ============================================================================
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "admin_api_key, headers, expected_status_code, expected_error_message",
+    [
+        (None, {"X-Admin-API-Key": ADMIN_API_KEY}, 403, "Admin API is disabled."),
+        (ADMIN_API_KEY, {}, 401, "Invalid admin API key."),
+        (ADMIN_API_KEY, {"X-Admin-API-Key": "wrong"}, 401, "Invalid admin API key."),
+    ],
+)
+async def test_unauthorized_generate_slots(
+    async_client: AsyncClient,
+    monkeypatch: pytest.MonkeyPatch,
+    admin_api_key: str | None,
+    headers: dict[str, str],
+    expected_status_code: int,
+    expected_error_message: str,
+):
+    monkeypatch.setattr(settings, "admin_api_key", admin_api_key)
+    json_body = {
+        "templates": [TEMPLATE],
+        "start_date": "2025-04-01",
+        "end_date": "2025-04-14",
+    }
+
+    res: Response = await async_client.post(
+        "/admin/slots/generate", json=json_body, headers=headers
+    )
+
+    assert res.status_code == expected_status_code
+    assert res.json().get("detail") == expected_error_message
@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from requests import Response
+from services.admission import AdmissionQueue, AdmissionQueueFull, booking_admission
+
+# See data.sql for the available slots
+INFLUENZA_SLOT_ID = "e7bbc307-ae75-4854-bd91-d6851ae085fd"
+
+
+# ============================================================================
+# admission queue
+# ============================================================================
+@pytest.mark.asyncio
+async def test_admission_queue_order():
+    queue = AdmissionQueue(concurrency=1, max_waiting=3)
+    admitted = []
+    done = asyncio.Event()
+
+    async def request(user_id: str):
+        async with queue.admit(user_id):
+            admitted.append(user_id)
+            await done.wait()
+
+    first = asyncio.create_task(request("first"))
+    await asyncio.sleep(0)
+    waiting = [asyncio.create_task(request(f"user-{i}")) for i in range(3)]
+    await asyncio.sleep(0)
+
+    assert admitted == ["first"]
+    assert (queue.active, queue.waiting) == (1, 3)
+    assert [queue.position(f"user-{i}") for i in range(3)] == [1, 2, 3]
+    assert queue.position("first") is None
+
+    # The queue is full, so further requests are turned away
+    with pytest.raises(AdmissionQueueFull):
+        async with queue.admit("late"):
+            pass
+
+    # A cancelled request leaves the queue, and the others move up
+    waiting[1].cancel()
+    await asyncio.sleep(0)
+    assert queue.position("user-2") == 2
+
+    # Queued requests are admitted in arrival order
+    done.set()
+    await asyncio.gather(first, waiting[0], waiting[2])
+    assert admitted == ["first", "user-0", "user-2"]
+    assert (queue.active, queue.waiting) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_admission_queue_eta():
+    queue = AdmissionQueue(concurrency=2, max_waiting=10)
+
+    for _ in range(50):
+        async with queue.admit("user"):
+            await asyncio.sleep(0.002)
+
+    # Two requests are admitted at a time, so each place ahead costs half a service
+    assert 0.001 <= queue.eta(4) / 2 < 0.02
+
+
+# ============================================================================
+# authorised user admission
+# ============================================================================
+@pytest.mark.asyncio
+async def test_authorized_user_admission_queue_full(
+    authorized_client_for_scheduling: AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(booking_admission, "concurrency", 0)
+    monkeypatch.setattr(booking_admission, "max_waiting", 0)
+
+    res: Response = await authorized_client_for_scheduling.post(
+        "/bookings/schedule", json={"booking_slot_id": INFLUENZA_SLOT_ID}
+    )
+
+    assert res.status_code == 503
+    assert res.json().get("detail") == (
+        "Too many booking requests, please try again later."
+    )
+    assert int(res.headers["Retry-After"]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_authorized_user_admission_queue_position(
+    authorized_client_for_scheduling: AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    res: Response = await authorized_client_for_scheduling.get("/bookings/queue")
+    assert res.status_code == 200
+    assert res.json() == {"position": None, "waiting": 0, "active": 0, "eta_seconds": 0}
+
+    # Queue a booking behind another request, which holds the only place
+    monkeypatch.setattr(booking_admission, "concurrency", 1)
+    async with booking_admission.admit("other"):
+        booking = asyncio.create_task(
+            authorized_client_for_scheduling.post(
+                "/bookings/schedule", json={"booking_slot_id": INFLUENZA_SLOT_ID}
+            )
+        )
+        while not booking_admission.waiting:
+            await asyncio.sleep(0.01)
+
+        res = await authorized_client_for_scheduling.get("/bookings/queue")
+        assert res.json()["position"] == 1
+        assert res.json()["waiting"] == 1
+        assert res.json()["active"] == 1
+
+    # Once the place frees up, the queued booking goes through
+    res = await booking
+    assert res.status_code == 201
+
+    res = await authorized_client_for_scheduling.get("/bookings/queue")
+    assert res.json()["position"] is None
+    assert (booking_admission.active, booking_admission.waiting) == (0, 0)
+
+
+# ============================================================================
+# unauthorised user admission
+# ============================================================================
+@pytest.mark.asyncio
+async def test_unauthorized_user_admission_queue(async_client: AsyncClient):
+    res: Response = await async_client.get("/bookings/queue")
+
+    assert res.status_code == 401
+    assert res.json().get("detail") == "Not authenticated"
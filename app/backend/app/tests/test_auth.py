@@ -1,5 +1,8 @@
+import asyncio
+
 import jwt
 import pytest
+from auth.password import password_hasher
 from httpx import AsyncClient
 from requests import Response
 from schemas.oauth2 import Token
@@ -112,3 +115,23 @@ async def test_unsuccessful_login(
 
     assert res.status_code == expected_status
     assert res.json().get("detail") == expected_detail
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_runs_off_event_loop():
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.001)
+            ticks += 1
+
+    # The event loop keeps serving other tasks while the password is hashed
+    ticker = asyncio.create_task(tick())
+    hashed = await password_hasher.hash("password123")
+    ticker.cancel()
+
+    assert ticks > 0
+    assert await password_hasher.verify("password123", hashed)
+    assert not await password_hasher.verify("wrongpassword", hashed)
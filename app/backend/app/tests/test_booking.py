@@ -1,10 +1,20 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+
 import pytest
+from core.config import settings
 from httpx import AsyncClient
+from models.models import BookingSlot, VaccineRecord
 from pydantic import TypeAdapter
 from requests import Response
+from routers.booking import schedule_slot
 from schemas.booking import AvailableSlotResponse, BookingSlotResponse
 from schemas.record import VaccineRecordResponse
 from schemas.vaccine import VaccineCriteriaResponse
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 
 
 # ============================================================================
@@ -88,6 +98,149 @@ async def test_unauthorized_user_get_all_available_booking_slots(
     assert res.json().get("detail") == "Not authenticated"
 
 
+# ============================================================================
+# authorized user get all slots (polyclinic and timeslot limits)
+# ============================================================================
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "polyclinic_limit, timeslot_limit",
+    [(1, 1), (1, 3), (2, 2), (3, 5)],
+)
+async def test_authorized_user_available_booking_slots_limits(
+    authorized_client_for_scheduling: AsyncClient,
+    session: AsyncSession,
+    polyclinic_limit: int,
+    timeslot_limit: int,
+):
+    influenza_id = "9004aab3-8993-4d37-81c3-78844191e5ec"
+    clinic_ids = [
+        "bd760847-db7e-439f-add8-3610167478ca",  # Yishun Polyclinic
+        "225d024f-3d0e-427d-aef9-1fe9a2fc4e13",  # Ang Mo Kio Polyclinic
+    ]
+
+    # Add a few more Influenza slots (inserted out of order) to each polyclinic
+    for clinic_id in clinic_ids:
+        for day in (9, 5, 7):
+            session.add(
+                BookingSlot(
+                    polyclinic_id=clinic_id,
+                    vaccine_id=influenza_id,
+                    datetime=datetime(2025, 4, day, 9),
+                )
+            )
+    await session.commit()
+
+    res: Response = await authorized_client_for_scheduling.get(
+        "/bookings/available",
+        params={
+            "vaccine_name": "Influenza (INF)",
+            "polyclinic_limit": polyclinic_limit,
+            "timeslot_limit": timeslot_limit,
+        },
+    )
+    assert res.status_code == 200
+
+    slots = [AvailableSlotResponse(**slot) for slot in res.json()]
+
+    slots_by_polyclinic = defaultdict(list)
+    for slot in slots:
+        slots_by_polyclinic[slot.polyclinic.id].append(slot.datetime)
+
+    assert len(slots_by_polyclinic) == polyclinic_limit
+
+    result = await session.execute(
+        select(BookingSlot.polyclinic_id, BookingSlot.datetime)
+        .where(BookingSlot.vaccine_id == influenza_id, BookingSlot.is_available)
+        .order_by(BookingSlot.datetime)
+    )
+    available = defaultdict(list)
+    for polyclinic_id, slot_datetime in result:
+        available[polyclinic_id].append(slot_datetime)
+
+    # Each polyclinic only returns its earliest `timeslot_limit` slots
+    for polyclinic_id, datetimes in slots_by_polyclinic.items():
+        assert datetimes == available[str(polyclinic_id)][:timeslot_limit]
+
+
+# ============================================================================
+# authorized user get all slots (keyset pagination)
+# ============================================================================
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit", [1, 2, 5])
+async def test_authorized_user_available_booking_slots_pagination(
+    authorized_client_for_scheduling: AsyncClient,
+    session: AsyncSession,
+    limit: int,
+):
+    influenza_id = "9004aab3-8993-4d37-81c3-78844191e5ec"
+    for clinic_id in (
+        "bd760847-db7e-439f-add8-3610167478ca",  # Yishun Polyclinic
+        "225d024f-3d0e-427d-aef9-1fe9a2fc4e13",  # Ang Mo Kio Polyclinic
+    ):
+        # Both polyclinics have slots at the same times, which are ordered by id
+        for day in (9, 5, 7):
+            session.add(
+                BookingSlot(
+                    polyclinic_id=clinic_id,
+                    vaccine_id=influenza_id,
+                    datetime=datetime(2025, 4, day, 9),
+                )
+            )
+    await session.commit()
+
+    params = {"vaccine_name": "Influenza (INF)", "polyclinic_limit": 2}
+    res: Response = await authorized_client_for_scheduling.get(
+        "/bookings/available", params=params
+    )
+    polyclinic_ids = {slot["polyclinic"]["id"] for slot in res.json()}
+
+    pages = []
+    cursor = None
+    while True:
+        res = await authorized_client_for_scheduling.get(
+            "/bookings/available",
+            params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})},
+        )
+        assert res.status_code == 200
+        assert len(res.json()) <= limit
+        pages.append([AvailableSlotResponse(**slot) for slot in res.json()])
+
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    slots = [slot for page in pages for slot in page]
+    assert all(len(page) == limit for page in pages[:-1])
+    assert {str(slot.polyclinic.id) for slot in slots} == polyclinic_ids
+
+    result = await session.execute(
+        select(BookingSlot.id)
+        .where(
+            BookingSlot.vaccine_id == influenza_id,
+            BookingSlot.polyclinic_id.in_(polyclinic_ids),
+            BookingSlot.is_available,
+        )
+        .order_by(BookingSlot.datetime, BookingSlot.id)
+    )
+
+    # Pages add up to every open slot of the polyclinics, in (datetime, id) order
+    assert [str(slot.id) for slot in slots] == result.scalars().all()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cursor", ["invalid-cursor", "e30"])
+async def test_authorized_user_available_booking_slots_invalid_cursor(
+    authorized_client_for_scheduling: AsyncClient, cursor: str
+):
+    res: Response = await authorized_client_for_scheduling.get(
+        "/bookings/available",
+        params={"vaccine_name": "Influenza (INF)", "limit": 1, "cursor": cursor},
+    )
+
+    assert res.status_code == 400
+    assert res.json().get("detail") == "Invalid cursor."
+
+
 # ============================================================================
 # get 1 valid slot
 # ============================================================================
@@ -239,6 +392,212 @@ async def test_unauthorized_user_schedule(async_client: AsyncClient):
     assert res.json().get("detail") == "Not authenticated"
 
 
+# ============================================================================
+# authorised user concurrent schedule (same slot)
+# ============================================================================
+@pytest.mark.asyncio
+@pytest.mark.parametrize("booking_write_coalescing", [False, True])
+async def test_authorized_user_concurrent_schedule(
+    concurrent_client_for_scheduling: AsyncClient,
+    session: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+    booking_write_coalescing: bool,
+):
+    monkeypatch.setattr(settings, "booking_write_coalescing", booking_write_coalescing)
+    slot_id = "213fa5e7-abbb-4e55-bccc-318db42ace81"
+
+    responses = await asyncio.gather(
+        *(
+            concurrent_client_for_scheduling.post(
+                "/bookings/schedule", json={"booking_slot_id": slot_id}
+            )
+            for _ in range(200)
+        )
+    )
+
+    status_codes = [res.status_code for res in responses]
+    assert status_codes.count(201) == 1
+    assert status_codes.count(400) == len(responses) - 1
+
+    result = await session.execute(
+        select(func.count()).where(VaccineRecord.booking_slot_id == slot_id)
+    )
+    assert result.scalar_one() == 1
+
+
+@pytest.mark.asyncio
+async def test_authorized_user_schedule_slot_with_record(
+    authorized_client_for_scheduling: AsyncClient, session: AsyncSession
+):
+    # A slot with places left that the user already has a record for (see data.sql)
+    # is still refused, by the record check and the UNIQUE(booking_slot_id, user_id)
+    # constraint
+    slot_id = "3f7f75c0-b28c-4bb7-8c9a-991e5d150bc3"
+    await session.execute(
+        update(BookingSlot)
+        .where(BookingSlot.id == slot_id)
+        .values(status="available", capacity=2, remaining=1)
+    )
+    await session.commit()
+
+    res: Response = await authorized_client_for_scheduling.post(
+        "/bookings/schedule", json={"booking_slot_id": slot_id}
+    )
+
+    assert res.status_code == 400
+    assert res.json().get("detail") == "Slot already booked."
+
+    booking_slot = await session.get(BookingSlot, slot_id, populate_existing=True)
+    assert booking_slot.remaining == 1
+
+
+@pytest.mark.asyncio
+async def test_authorized_user_schedule_slot_with_capacity(
+    authorized_client_for_scheduling: AsyncClient, session: AsyncSession
+):
+    slot_id = "e7bbc307-ae75-4854-bd91-d6851ae085fd"
+    other_user_id = "8045a3aa-e221-4d9c-89c5-822ab96d4885"
+    params = {"vaccine_name": "Influenza (INF)", "timeslot_limit": 10}
+    await session.execute(
+        update(BookingSlot)
+        .where(BookingSlot.id == slot_id)
+        .values(capacity=2, remaining=2)
+    )
+    await session.commit()
+
+    async def get_slot() -> tuple[str, int]:
+        result = await session.execute(
+            select(BookingSlot.status, BookingSlot.remaining).where(
+                BookingSlot.id == slot_id
+            )
+        )
+        return tuple(result.one())
+
+    async def is_listed() -> bool:
+        res = await authorized_client_for_scheduling.get(
+            "/bookings/available", params=params
+        )
+        return slot_id in [slot["id"] for slot in res.json()]
+
+    # The slot stays available while places remain...
+    res: Response = await authorized_client_for_scheduling.post(
+        "/bookings/schedule", json={"booking_slot_id": slot_id}
+    )
+    assert res.status_code == 201
+    record_id = res.json()["id"]
+    assert await get_slot() == ("available", 1)
+    assert await is_listed()
+
+    # ...and is booked with the last one
+    await schedule_slot(session, other_user_id, slot_id)
+    await session.commit()
+    assert await get_slot() == ("booked", 0)
+    assert not await is_listed()
+
+    result = await session.execute(
+        select(func.count()).where(VaccineRecord.booking_slot_id == slot_id)
+    )
+    assert result.scalar_one() == 2
+
+    # Cancelling a record gives its place back
+    res = await authorized_client_for_scheduling.delete(f"/bookings/cancel/{record_id}")
+    assert res.status_code == 200
+    assert await get_slot() == ("available", 1)
+    assert await is_listed()
+
+
+# ============================================================================
+# authorised user batch schedule
+# ============================================================================
+@pytest.mark.asyncio
+async def test_authorized_user_valid_batch_schedule(
+    authorized_client_for_scheduling: AsyncClient,
+):
+    # See data.sql for the available slots
+    slot_ids = [
+        "e7bbc307-ae75-4854-bd91-d6851ae085fd",
+        "213fa5e7-abbb-4e55-bccc-318db42ace81",
+    ]
+    res: Response = await authorized_client_for_scheduling.post(
+        "/bookings/schedule/batch", json={"booking_slot_ids": slot_ids}
+    )
+
+    assert res.status_code == 201
+
+    records = [VaccineRecordResponse(**record) for record in res.json()]
+    assert [str(record.booking_slot_id) for record in records] == slot_ids
+    assert all(record.status.value == "booked" for record in records)
+    assert {str(record.user_id) for record in records} == {
+        authorized_client_for_scheduling.headers["user_id"]
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "slot_ids, expected_status_code, expected_error_message",
+    [
+        # Booked by other user:
+        (
+            [
+                "213fa5e7-abbb-4e55-bccc-318db42ace81",
+                "97ba51db-48d8-4873-b1ee-57a9b7f766f0",
+            ],
+            400,
+            "Slot already booked.",
+        ),
+        # Invalid UUID:
+        (
+            [
+                "213fa5e7-abbb-4e55-bccc-318db42ace81",
+                "97ba51db-48d8-4873-b1ee-57a9b7f766fa",
+            ],
+            404,
+            "Booking slot with slot id 97ba51db-48d8-4873-b1ee-57a9b7f766fa not found.",
+        ),
+        # Same slot twice:
+        (
+            [
+                "213fa5e7-abbb-4e55-bccc-318db42ace81",
+                "213fa5e7-abbb-4e55-bccc-318db42ace81",
+            ],
+            400,
+            "Booking slots must be distinct.",
+        ),
+        # No slots:
+        ([], 422, "List should have at least 1 item after validation, not 0"),
+    ],
+)
+async def test_authorized_user_invalid_batch_schedule(
+    authorized_client_for_scheduling: AsyncClient,
+    session: AsyncSession,
+    slot_ids: list[str],
+    expected_status_code: int,
+    expected_error_message: str,
+):
+    res: Response = await authorized_client_for_scheduling.post(
+        "/bookings/schedule/batch", json={"booking_slot_ids": slot_ids}
+    )
+
+    assert res.status_code == expected_status_code
+
+    if res.status_code == 422:
+        assert res.json()["detail"][0].get("msg") == expected_error_message
+    else:
+        assert res.json().get("detail") == expected_error_message
+
+    # All or nothing: the available slot was not booked either
+    open_slot = await session.get(BookingSlot, "213fa5e7-abbb-4e55-bccc-318db42ace81")
+    await session.refresh(open_slot)
+    assert open_slot.status == "available"
+
+    result = await session.execute(
+        select(func.count()).where(
+            VaccineRecord.booking_slot_id == "213fa5e7-abbb-4e55-bccc-318db42ace81"
+        )
+    )
+    assert result.scalar_one() == 0
+
+
 # ============================================================================
 # authorised user valid cancel
 # ============================================================================
@@ -419,3 +778,55 @@ async def test_unauthorized_user_reschedule(async_client: AsyncClient):
 
     assert res.status_code == 401
     assert res.json().get("detail") == "Not authenticated"
+
+
+# ============================================================================
+# slot availability is kept in sync with schedule, reschedule and cancel
+# ============================================================================
+@pytest.mark.asyncio
+async def test_slot_availability_follows_bookings(
+    authorized_client_for_scheduling: AsyncClient, session: AsyncSession
+):
+    # See data.sql for the available and booked slots
+    old_slot_id = "3f7f75c0-b28c-4bb7-8c9a-991e5d150bc3"
+    new_slot_id = "e7bbc307-ae75-4854-bd91-d6851ae085fd"
+    other_slot_id = "213fa5e7-abbb-4e55-bccc-318db42ace81"
+
+    async def get_status(slot_id: str) -> str:
+        result = await session.execute(
+            select(BookingSlot.status).where(BookingSlot.id == slot_id)
+        )
+        return result.scalar_one()
+
+    assert await get_status(old_slot_id) == "booked"
+    assert await get_status(other_slot_id) == "available"
+
+    res: Response = await authorized_client_for_scheduling.post(
+        "/bookings/schedule", json={"booking_slot_id": other_slot_id}
+    )
+    assert res.status_code == 201
+    assert await get_status(other_slot_id) == "booked"
+
+    res = await authorized_client_for_scheduling.post(
+        "/bookings/reschedule",
+        json={
+            "vaccine_record_id": "a6578d08-4e81-40ca-bc30-c9f2d01024aa",
+            "new_slot_id": new_slot_id,
+        },
+    )
+    assert res.status_code == 200
+    assert await get_status(old_slot_id) == "available"
+    assert await get_status(new_slot_id) == "booked"
+
+    res = await authorized_client_for_scheduling.delete(
+        "/bookings/cancel/a6578d08-4e81-40ca-bc30-c9f2d01024aa"
+    )
+    assert res.status_code == 200
+    assert await get_status(new_slot_id) == "available"
+
+    # A booked slot cannot be booked again
+    res = await authorized_client_for_scheduling.post(
+        "/bookings/schedule", json={"booking_slot_id": other_slot_id}
+    )
+    assert res.status_code == 400
+    assert res.json().get("detail") == "Slot already booked."
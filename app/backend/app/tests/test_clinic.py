@@ -1,4 +1,5 @@
 import pytest
+from geopy.distance import geodesic
 from httpx import AsyncClient
 from requests import Response
 from schemas.clinic import ClinicResponse, ClinicType
@@ -36,6 +37,32 @@ async def test_authorized_user_get_nearest(
             assert clinic.type in {ClinicType.POLYCLINIC, ClinicType.GENERAL_PRACTIONER}
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("clinic_type", [None, "polyclinic", "gp"])
+async def test_authorized_user_get_nearest_in_order_of_distance(
+    authorized_client: AsyncClient, clinic_type: str | None
+):
+    # The test user lives at postal code 545078, see data.sql for its coordinates
+    user_location = (1.39205314156706, 103.89507054384)
+    params = {"clinic_limit": 10}
+
+    if clinic_type:
+        params["clinic_type"] = clinic_type
+
+    res: Response = await authorized_client.get("/clinics/nearest", params=params)
+
+    assert res.status_code == 200
+
+    clinics = [ClinicResponse(**record) for record in res.json()]
+    distances = [
+        geodesic(user_location, (clinic.address.latitude, clinic.address.longitude)).km
+        for clinic in clinics
+    ]
+
+    assert len(clinics) == (2 if clinic_type else 4)
+    assert distances == sorted(distances)
+
+
 @pytest.mark.asyncio
 async def test_unauthorized_user_get_nearest_clinic(async_client: AsyncClient):
     res: Response = await async_client.get("/clinics/nearest")
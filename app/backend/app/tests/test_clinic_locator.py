@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from services.clinic_locator import GridIndex
+from services.distance import Locations
+
+
+@pytest.fixture
+def points() -> list[tuple[str, float, float]]:
+    # Random locations across Singapore, with a few clusters sharing grid cells
+    rng = np.random.default_rng(0)
+    latitudes = np.concatenate(
+        [rng.uniform(1.2, 1.47, 2000), rng.normal(1.35, 0.002, 200)]
+    )
+    longitudes = np.concatenate(
+        [rng.uniform(103.6, 104.05, 2000), rng.normal(103.85, 0.002, 200)]
+    )
+    return [
+        (str(i), latitude, longitude)
+        for i, (latitude, longitude) in enumerate(zip(latitudes, longitudes))
+    ]
+
+
+@pytest.mark.parametrize("k", [1, 3, 10, 50])
+@pytest.mark.parametrize(
+    "latitude, longitude",
+    [
+        (1.35, 103.85),  # in a cluster
+        (1.2, 103.6),  # on a corner of the grid
+        (1.44, 103.9),
+        (1.1, 103.5),  # outside of the grid
+        (35.68, 139.69),  # far away from every location
+    ],
+)
+def test_grid_index_matches_brute_force(
+    points: list[tuple[str, float, float]], latitude: float, longitude: float, k: int
+):
+    index = GridIndex(points)
+    expected = Locations.from_points(points).nearest(latitude, longitude, k)
+
+    nearest = index.nearest(latitude, longitude, k)
+
+    assert [id for id, _ in nearest] == [id for id, _ in expected]
+    np.testing.assert_allclose(
+        [distance for _, distance in nearest],
+        [distance for _, distance in expected],
+    )
+
+
+def test_grid_index_limits(points: list[tuple[str, float, float]]):
+    assert len(GridIndex(points[:5]).nearest(1.35, 103.85, 10)) == 5
+    assert GridIndex(points).nearest(1.35, 103.85, 0) == []
+    assert GridIndex([]).nearest(1.35, 103.85, 3) == []
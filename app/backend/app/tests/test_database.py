@@ -0,0 +1,85 @@
+import pytest
+from core.config import settings
+from models.database import create_db_engine, get_read_only_url, get_sqlite_pragmas
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from tests.conftest import DATABASE_URL, engine
+
+
+async def get_pragma(conn, name: str):
+    result = await conn.execute(text(f"PRAGMA {name}"))
+    return result.scalar()
+
+
+@pytest.mark.asyncio
+async def test_tuned_profile_applies_pragmas():
+    async with engine.connect() as conn:
+        assert (await get_pragma(conn, "journal_mode")).upper() == "WAL"
+        # synchronous=NORMAL is reported as 1
+        assert await get_pragma(conn, "synchronous") == 1
+        assert await get_pragma(conn, "cache_size") == settings.sqlite_cache_size
+        assert await get_pragma(conn, "busy_timeout") == settings.sqlite_busy_timeout
+        # temp_store=MEMORY is reported as 2
+        assert await get_pragma(conn, "temp_store") == 2
+
+
+@pytest.mark.asyncio
+async def test_default_profile_applies_no_pragmas():
+    config = settings.model_copy(update={"database_profile": "default"})
+    assert get_sqlite_pragmas(config) == {}
+
+    default_engine = create_db_engine(DATABASE_URL, config)
+
+    try:
+        async with default_engine.connect() as conn:
+            # SQLite's compiled-in default is FULL, reported as 2
+            assert await get_pragma(conn, "synchronous") == 2
+            # SQLite's compiled-in default page cache is 2000 KiB
+            assert await get_pragma(conn, "cache_size") == -2000
+    finally:
+        await default_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_engine_pool_settings():
+    config = settings.model_copy(
+        update={"database_pool_size": 7, "database_max_overflow": 3}
+    )
+    pooled_engine = create_db_engine(DATABASE_URL, config)
+
+    try:
+        assert pooled_engine.pool.size() == 7
+        assert pooled_engine.pool._max_overflow == 3
+        assert pooled_engine.pool._recycle == config.database_pool_recycle
+    finally:
+        await pooled_engine.dispose()
+
+
+def test_read_only_url():
+    assert (
+        get_read_only_url("sqlite+aiosqlite:///../data/db.sqlite")
+        == "sqlite+aiosqlite:///file:../data/db.sqlite?mode=ro&uri=true"
+    )
+    # Already a URI, leave it as it is
+    assert (
+        get_read_only_url("sqlite+aiosqlite:///file:db.sqlite?mode=ro&uri=true")
+        == "sqlite+aiosqlite:///file:db.sqlite?mode=ro&uri=true"
+    )
+
+
+@pytest.mark.asyncio
+async def test_read_only_engine_rejects_writes():
+    read_engine = create_db_engine(get_read_only_url(DATABASE_URL), read_only=True)
+
+    try:
+        assert read_engine.pool.size() == settings.database_read_pool_size
+
+        async with read_engine.connect() as conn:
+            result = await conn.execute(text("SELECT COUNT(*) FROM BookingSlots"))
+            assert result.scalar() > 0
+
+            with pytest.raises(OperationalError):
+                await conn.execute(text("DELETE FROM BookingSlots"))
+    finally:
+        await read_engine.dispose()
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from geopy.distance import geodesic
+from services.distance import Locations, distance_km
+
+# Lambert's formula stays within ~0.01% of the WGS-84 geodesic distance, which is far
+# below the distance between any two clinics
+RELATIVE_TOLERANCE = 1e-4
+
+
+@pytest.mark.parametrize(
+    "latitude_range, longitude_range",
+    [
+        # Singapore
+        ((1.2, 1.5), (103.6, 104.1)),
+        # Anywhere
+        ((-89.0, 89.0), (-180.0, 180.0)),
+    ],
+)
+def test_distance_matches_geodesic(latitude_range, longitude_range):
+    rng = np.random.default_rng(0)
+    latitudes = rng.uniform(*latitude_range, size=200)
+    longitudes = rng.uniform(*longitude_range, size=200)
+    latitude, longitude = latitudes[0], longitudes[0]
+
+    distances = distance_km(latitude, longitude, latitudes, longitudes)
+    expected = np.array(
+        [
+            geodesic((latitude, longitude), point).km
+            for point in zip(latitudes, longitudes)
+        ]
+    )
+
+    np.testing.assert_allclose(distances, expected, rtol=RELATIVE_TOLERANCE, atol=1e-3)
+
+
+def test_nearest_ranks_like_geodesic():
+    # See data.sql for the clinic addresses
+    locations = Locations.from_points(
+        [
+            ("Ang Mo Kio Polyclinic", 1.374419, 103.8459),
+            ("Yishun Polyclinic", 1.42999, 103.839),
+            ("Bartley Clinic", 1.347, 103.88),
+        ]
+    )
+    user = (1.33, 103.85)
+
+    expected = sorted(
+        locations.ids, key=lambda id: geodesic(user, _point(locations, id))
+    )
+
+    assert [id for id, _ in locations.nearest(*user)] == expected
+    assert [id for id, _ in locations.nearest(*user, k=2)] == expected[:2]
+    assert locations.nearest(*user, k=0) == []
+    assert len(locations.nearest(*user, k=10)) == len(locations)
+
+
+def test_nearest_without_locations():
+    assert Locations.from_points([]).nearest(1.3, 103.8, k=3) == []
+
+
+def _point(locations: Locations, id: str) -> tuple[float, float]:
+    index = locations.ids.index(id)
+    return locations.latitudes[index], locations.longitudes[index]
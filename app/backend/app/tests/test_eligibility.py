@@ -0,0 +1,107 @@
+import math
+from datetime import date
+
+import pytest
+from models.models import VaccineCriteria
+from services.eligibility import (
+    VaccineEligibility,
+    parse_age_criteria,
+    parse_frequency,
+)
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# See data.sql for the vaccines and their criteria
+INFLUENZA_ID = "9004aab3-8993-4d37-81c3-78844191e5ec"
+HPV_ID = "a67ed08a-95f0-47d4-a97b-8153f1d7874a"
+PCV13_ID = "599b1189-0687-4a38-8de5-95850cfa9ee7"
+TODAY = date(2026, 1, 1)
+
+
+# ============================================================================
+# criteria parsing
+# ============================================================================
+@pytest.mark.parametrize(
+    "age_criteria, interval",
+    [
+        (None, (0, math.inf)),
+        ("4 months", (120, 150)),
+        ("6-59 months", (180, 1800)),
+        ("10-11 years", (3650, 4380)),
+        ("65+ years", (23725, math.inf)),
+    ],
+)
+def test_parse_age_criteria(age_criteria: str | None, interval: tuple):
+    assert parse_age_criteria(age_criteria) == interval
+
+
+def test_parse_unknown_criteria():
+    with pytest.raises(ValueError):
+        parse_age_criteria("Adults")
+
+    assert parse_frequency("Once") is None
+    assert parse_frequency("Annually or per season") == 365
+    assert parse_frequency("Every 5 years") == 1825
+
+
+# ============================================================================
+# vaccine eligibility
+# ============================================================================
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "date_of_birth, gender, expected",
+    [
+        (date(1990, 1, 1), "M", {INFLUENZA_ID: ["18-64 years"]}),
+        (
+            date(2004, 1, 1),
+            "F",
+            {INFLUENZA_ID: ["18-64 years"], HPV_ID: ["18-26 years"]},
+        ),
+        (date(2025, 9, 3), "F", {PCV13_ID: ["4 months"]}),  # 120 days old
+        (date(2025, 9, 2), "F", {PCV13_ID: ["4 months"]}),  # still 4 months old
+        (date(2025, 8, 4), "F", {}),  # 150 days old, i.e. 5 months old
+        (date(2013, 1, 1), "F", {HPV_ID: ["12-13 years", "13-14 years"]}),
+        (date(1950, 1, 1), "M", {}),
+    ],
+)
+async def test_vaccine_eligibility(
+    session: AsyncSession, date_of_birth: date, gender: str, expected: dict
+):
+    eligibility = VaccineEligibility(refresh_interval=60)
+    vaccines = await eligibility.recommend(session, date_of_birth, gender, TODAY)
+
+    assert {
+        vaccine["id"]: [
+            criteria["age_criteria"] for criteria in vaccine["vaccine_criterias"]
+        ]
+        for vaccine in vaccines
+    } == expected
+
+
+@pytest.mark.asyncio
+async def test_vaccine_eligibility_reload(session: AsyncSession):
+    eligibility = VaccineEligibility(refresh_interval=0)
+    vaccines = await eligibility.recommend(session, date(1990, 1, 1), "M", TODAY)
+    assert [vaccine["id"] for vaccine in vaccines] == [INFLUENZA_ID]
+
+    # Changed criteria are picked up at the next refresh
+    session.add(
+        VaccineCriteria(
+            vaccine_id=PCV13_ID,
+            age_criteria="30-39 years",
+            gender_criteria="M",
+            health_condition_criteria="None",
+            doses_required=1,
+            frequency="Once",
+        )
+    )
+    await session.commit()
+
+    vaccines = await eligibility.recommend(session, date(1990, 1, 1), "M", TODAY)
+    assert [vaccine["id"] for vaccine in vaccines] == [INFLUENZA_ID, PCV13_ID]
+
+    await session.execute(delete(VaccineCriteria).filter_by(vaccine_id=PCV13_ID))
+    await session.commit()
+
+    vaccines = await eligibility.recommend(session, date(1990, 1, 1), "M", TODAY)
+    assert [vaccine["id"] for vaccine in vaccines] == [INFLUENZA_ID]
@@ -0,0 +1,280 @@
+from datetime import datetime
+
+import pytest
+from core.config import settings
+from httpx import AsyncClient
+from models.models import BookingSlot
+from requests import Response
+from services.holds import DatabaseSlotHolds, MemorySlotHolds, slot_holds
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# See data.sql for the users and slots
+OTHER_USER_ID = "8045a3aa-e221-4d9c-89c5-822ab96d4885"
+SCHEDULING_USER_ID = "564b4728-9436-4e1a-8da1-c40dde49a0cc"
+INFLUENZA_SLOT_ID = "e7bbc307-ae75-4854-bd91-d6851ae085fd"
+OTHER_SLOT_ID = "213fa5e7-abbb-4e55-bccc-318db42ace81"
+YISHUN_POLYCLINIC_ID = "bd760847-db7e-439f-add8-3610167478ca"
+INFLUENZA_ID = "9004aab3-8993-4d37-81c3-78844191e5ec"
+
+
+# ============================================================================
+# slot holds (memory and database backends)
+# ============================================================================
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", [MemorySlotHolds, DatabaseSlotHolds])
+async def test_slot_holds(session: AsyncSession, backend):
+    holds = backend(ttl=60)
+
+    assert await holds.hold(session, INFLUENZA_SLOT_ID, OTHER_USER_ID)
+    # The slot has a single place, so only the user holding it can hold it again
+    # (i.e., refresh the hold)
+    assert await holds.hold(session, INFLUENZA_SLOT_ID, OTHER_USER_ID)
+    assert await holds.hold(session, INFLUENZA_SLOT_ID, SCHEDULING_USER_ID) is None
+
+    assert await holds.holders(session, INFLUENZA_SLOT_ID) == {OTHER_USER_ID}
+    slot_ids = [INFLUENZA_SLOT_ID, OTHER_SLOT_ID]
+    assert await holds.held_by_others(session, slot_ids, SCHEDULING_USER_ID) == {
+        INFLUENZA_SLOT_ID
+    }
+    assert await holds.held_by_others(session, slot_ids, OTHER_USER_ID) == set()
+    assert await holds.count_held_by_others(session, SCHEDULING_USER_ID) == 1
+
+    assert not await holds.release(session, INFLUENZA_SLOT_ID, SCHEDULING_USER_ID)
+    assert await holds.release(session, INFLUENZA_SLOT_ID, OTHER_USER_ID)
+    assert await holds.holders(session, INFLUENZA_SLOT_ID) == set()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", [MemorySlotHolds, DatabaseSlotHolds])
+async def test_slot_holds_expire(session: AsyncSession, backend):
+    holds = backend(ttl=0)
+
+    assert await holds.hold(session, INFLUENZA_SLOT_ID, OTHER_USER_ID)
+    assert await holds.hold(session, OTHER_SLOT_ID, OTHER_USER_ID)
+
+    # Expired holds are ignored, and can be taken over by other users
+    assert await holds.holders(session, INFLUENZA_SLOT_ID) == set()
+    assert (
+        await holds.held_by_others(session, [INFLUENZA_SLOT_ID], SCHEDULING_USER_ID)
+        == set()
+    )
+    assert await holds.hold(session, INFLUENZA_SLOT_ID, SCHEDULING_USER_ID)
+
+
+# ============================================================================
+# authorised user holds
+# ============================================================================
+@pytest.mark.asyncio
+async def test_authorized_user_slot_held_by_other_user(
+    authorized_client_for_scheduling: AsyncClient,
+    session: AsyncSession,
+    assert_max_queries,
+):
+    params = {"vaccine_name": "Influenza (INF)", "timeslot_limit": 10}
+    res: Response = await authorized_client_for_scheduling.get(
+        "/bookings/available", params=params
+    )
+    assert INFLUENZA_SLOT_ID in [slot["id"] for slot in res.json()]
+
+    await slot_holds.hold(session, INFLUENZA_SLOT_ID, OTHER_USER_ID)
+
+    # Held slots drop out of the available slots of other users...
+    res = await authorized_client_for_scheduling.get(
+        "/bookings/available", params=params
+    )
+    assert res.status_code == 200
+    assert INFLUENZA_SLOT_ID not in [slot["id"] for slot in res.json()]
+
+    # ...and cannot be held or booked by them, without a write attempt (i.e., only
+    # the user, if not cached, and the slot's remaining places are read)
+    for path in ("/bookings/hold", "/bookings/schedule"):
+        res = await authorized_client_for_scheduling.post(
+            path, json={"booking_slot_id": INFLUENZA_SLOT_ID}
+        )
+        assert res.status_code == 409
+        assert res.json().get("detail") == "Slot is on hold."
+        assert_max_queries(res, 2)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", [MemorySlotHolds, DatabaseSlotHolds])
+@pytest.mark.parametrize("slot_inventory_enabled", [True, False])
+async def test_authorized_user_next_slot_after_held_slot(
+    authorized_client_for_scheduling: AsyncClient,
+    session: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+    backend,
+    slot_inventory_enabled: bool,
+):
+    holds = backend(ttl=60)
+    monkeypatch.setattr("routers.booking.slot_holds", holds)
+    monkeypatch.setattr(settings, "slot_inventory_enabled", slot_inventory_enabled)
+
+    next_slot = BookingSlot(
+        polyclinic_id=YISHUN_POLYCLINIC_ID,
+        vaccine_id=INFLUENZA_ID,
+        datetime=datetime(2025, 4, 4, 9),
+    )
+    session.add(next_slot)
+    await session.commit()
+    await holds.hold(session, INFLUENZA_SLOT_ID, OTHER_USER_ID)
+    await session.commit()
+
+    # The polyclinic's first open slot is held, so its next one is listed instead...
+    params = {"vaccine_name": "Influenza (INF)", "timeslot_limit": 1}
+    res: Response = await authorized_client_for_scheduling.get(
+        "/bookings/available", params=params
+    )
+    assert res.status_code == 200
+    slot_ids = [slot["id"] for slot in res.json()]
+    assert INFLUENZA_SLOT_ID not in slot_ids
+    assert next_slot.id in slot_ids
+
+    # ...and pages skip it as well
+    res = await authorized_client_for_scheduling.get(
+        "/bookings/available", params={**params, "limit": 1}
+    )
+    assert res.status_code == 200
+    assert INFLUENZA_SLOT_ID not in [slot["id"] for slot in res.json()]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", [MemorySlotHolds, DatabaseSlotHolds])
+async def test_authorized_user_book_place_next_to_held_place(
+    authorized_client_for_scheduling: AsyncClient,
+    session: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+    backend,
+):
+    holds = backend(ttl=60)
+    monkeypatch.setattr("routers.booking.slot_holds", holds)
+
+    await session.execute(
+        update(BookingSlot)
+        .where(BookingSlot.id == INFLUENZA_SLOT_ID)
+        .values(capacity=2, remaining=2)
+    )
+    await session.commit()
+    assert await holds.hold(session, INFLUENZA_SLOT_ID, OTHER_USER_ID)
+    await session.commit()
+
+    # A hold takes one place of the slot, so the other place is still listed...
+    params = {"vaccine_name": "Influenza (INF)", "timeslot_limit": 10}
+    res: Response = await authorized_client_for_scheduling.get(
+        "/bookings/available", params=params
+    )
+    assert res.status_code == 200
+    assert INFLUENZA_SLOT_ID in [slot["id"] for slot in res.json()]
+
+    # ...and can be booked by another user
+    res = await authorized_client_for_scheduling.post(
+        "/bookings/schedule", json={"booking_slot_id": INFLUENZA_SLOT_ID}
+    )
+    assert res.status_code == 201
+
+    # The only place left is held, so the slot is now held for everyone else
+    session.expire_all()
+    assert await holds.held_by_others(
+        session, [INFLUENZA_SLOT_ID], SCHEDULING_USER_ID
+    ) == {INFLUENZA_SLOT_ID}
+    assert (
+        await holds.held_by_others(session, [INFLUENZA_SLOT_ID], OTHER_USER_ID) == set()
+    )
+
+    res = await authorized_client_for_scheduling.get(
+        "/bookings/available", params=params
+    )
+    assert INFLUENZA_SLOT_ID not in [slot["id"] for slot in res.json()]
+
+    res = await authorized_client_for_scheduling.post(
+        "/bookings/hold", json={"booking_slot_id": INFLUENZA_SLOT_ID}
+    )
+    assert res.status_code == 409
+    assert res.json().get("detail") == "Slot is on hold."
+
+
+@pytest.mark.asyncio
+async def test_authorized_user_hold_and_schedule(
+    authorized_client_for_scheduling: AsyncClient, session: AsyncSession
+):
+    res: Response = await authorized_client_for_scheduling.post(
+        "/bookings/hold", json={"booking_slot_id": INFLUENZA_SLOT_ID}
+    )
+    assert res.status_code == 201
+    assert res.json()["booking_slot_id"] == INFLUENZA_SLOT_ID
+    assert await slot_holds.holders(session, INFLUENZA_SLOT_ID) == {SCHEDULING_USER_ID}
+
+    res = await authorized_client_for_scheduling.post(
+        "/bookings/schedule", json={"booking_slot_id": INFLUENZA_SLOT_ID}
+    )
+    assert res.status_code == 201
+
+    # The hold is released once the slot is booked
+    assert await slot_holds.holders(session, INFLUENZA_SLOT_ID) == set()
+
+    res = await authorized_client_for_scheduling.post(
+        "/bookings/hold", json={"booking_slot_id": INFLUENZA_SLOT_ID}
+    )
+    assert res.status_code == 400
+    assert res.json().get("detail") == "Slot already booked."
+
+
+@pytest.mark.asyncio
+async def test_authorized_user_hold_kept_on_failed_booking(
+    authorized_client_for_scheduling: AsyncClient,
+    session: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    res: Response = await authorized_client_for_scheduling.post(
+        "/bookings/hold", json={"booking_slot_id": INFLUENZA_SLOT_ID}
+    )
+    assert res.status_code == 201
+
+    async def _failing_commit():
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(session, "commit", _failing_commit)
+
+    with pytest.raises(RuntimeError, match="database unavailable"):
+        await authorized_client_for_scheduling.post(
+            "/bookings/schedule", json={"booking_slot_id": INFLUENZA_SLOT_ID}
+        )
+
+    # The booking was not committed, so the user keeps their hold
+    assert await slot_holds.holders(session, INFLUENZA_SLOT_ID) == {SCHEDULING_USER_ID}
+    await session.rollback()
+
+
+@pytest.mark.asyncio
+async def test_authorized_user_release_hold(
+    authorized_client_for_scheduling: AsyncClient, session: AsyncSession
+):
+    res: Response = await authorized_client_for_scheduling.post(
+        "/bookings/hold", json={"booking_slot_id": OTHER_SLOT_ID}
+    )
+    assert res.status_code == 201
+
+    res = await authorized_client_for_scheduling.delete(
+        f"/bookings/hold/{OTHER_SLOT_ID}"
+    )
+    assert res.status_code == 200
+    assert await slot_holds.holders(session, OTHER_SLOT_ID) == set()
+
+    res = await authorized_client_for_scheduling.delete(
+        f"/bookings/hold/{OTHER_SLOT_ID}"
+    )
+    assert res.status_code == 404
+
+
+# ============================================================================
+# unauthorised user holds
+# ============================================================================
+@pytest.mark.asyncio
+async def test_unauthorized_user_hold(async_client: AsyncClient):
+    res: Response = await async_client.post(
+        "/bookings/hold", json={"booking_slot_id": INFLUENZA_SLOT_ID}
+    )
+
+    assert res.status_code == 401
+    assert res.json().get("detail") == "Not authenticated"
@@ -0,0 +1,115 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from models.models import BookingSlot
+from requests import Response
+from routers.booking import find_available_slots, find_available_slots_in_inventory
+from services.inventory import slot_inventory
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# See data.sql for the clinics and vaccines
+CLINIC_IDS = [
+    "225d024f-3d0e-427d-aef9-1fe9a2fc4e13",
+    "bd760847-db7e-439f-add8-3610167478ca",
+    "492f66d8-fd4b-4d61-a343-1c85898337f1",
+]
+VACCINE_IDS = [
+    "9004aab3-8993-4d37-81c3-78844191e5ec",
+    "a67ed08a-95f0-47d4-a97b-8153f1d7874a",
+    "599b1189-0687-4a38-8de5-95850cfa9ee7",
+]
+
+QUERIES = [
+    # vaccine_name, polyclinic_name, start_datetime, end_datetime, timeslot_limit
+    ("Influenza (INF)", None, None, None, 1),
+    ("Influenza (INF)", None, None, None, 5),
+    ("inf", "polyclinic", datetime(2025, 4, 3), None, 3),
+    ("(", None, datetime(2025, 4, 2), datetime(2025, 4, 4, 12), 2),
+    ("Pneumococcal", "yishun", None, datetime(2025, 4, 5), 10),
+    ("HPV", None, datetime(2025, 4, 6, 8, 30), datetime(2025, 4, 6, 14, 30), 1),
+    ("Unknown", None, None, None, 1),
+]
+
+
+async def assert_inventory_matches_database(session: AsyncSession):
+    for query in QUERIES:
+        expected = await find_available_slots(session, *query)
+        found = await find_available_slots_in_inventory(session, *query)
+
+        assert [slot.id for slot in found] == [slot.id for slot in expected], query
+
+
+@pytest_asyncio.fixture
+async def random_slots(session: AsyncSession):
+    """
+    Add open slots at random times to the seeded polyclinics and vaccines.
+    """
+    rng = random.Random(0)
+    start = datetime(2025, 4, 1, 8)
+
+    for clinic_id in CLINIC_IDS:
+        for vaccine_id in VACCINE_IDS:
+            for hours in rng.sample(range(7 * 24), 20):
+                session.add(
+                    BookingSlot(
+                        polyclinic_id=clinic_id,
+                        vaccine_id=vaccine_id,
+                        datetime=start + timedelta(hours=hours, minutes=30),
+                    )
+                )
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_inventory_matches_database(session: AsyncSession, random_slots):
+    await assert_inventory_matches_database(session)
+
+
+@pytest.mark.asyncio
+async def test_inventory_follows_bookings(
+    authorized_client_for_scheduling: AsyncClient,
+    session: AsyncSession,
+    random_slots,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    await slot_inventory.load(session)
+    # The inventory must stay consistent without reloading it
+    monkeypatch.setattr(slot_inventory, "refresh_interval", float("inf"))
+
+    res: Response = await authorized_client_for_scheduling.get(
+        "/bookings/available",
+        params={"vaccine_name": "Influenza (INF)", "polyclinic_limit": 1},
+    )
+    assert res.status_code == 200
+    slot_id = res.json()[0]["id"]
+
+    res = await authorized_client_for_scheduling.post(
+        "/bookings/schedule", json={"booking_slot_id": slot_id}
+    )
+    assert res.status_code == 201
+    await assert_inventory_matches_database(session)
+
+    res = await authorized_client_for_scheduling.post(
+        "/bookings/reschedule",
+        json={"vaccine_record_id": res.json()["id"], "new_slot_id": slot_id},
+    )
+    assert res.status_code == 400
+
+    res = await authorized_client_for_scheduling.post(
+        "/bookings/reschedule",
+        json={
+            "vaccine_record_id": "a6578d08-4e81-40ca-bc30-c9f2d01024aa",
+            "new_slot_id": "e7bbc307-ae75-4854-bd91-d6851ae085fd",
+        },
+    )
+    assert res.status_code == 200
+    await assert_inventory_matches_database(session)
+
+    res = await authorized_client_for_scheduling.delete(
+        "/bookings/cancel/a6578d08-4e81-40ca-bc30-c9f2d01024aa"
+    )
+    assert res.status_code == 200
+    await assert_inventory_matches_database(session)
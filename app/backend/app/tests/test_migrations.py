@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import pytest
+from models.database import Base, create_db_engine
+from models.migrations import apply_migrations, get_head_version, get_schema_version
+from sqlalchemy import text
+
+
+async def get_index_names(conn) -> set[str]:
+    result = await conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'index'")
+    )
+    return set(result.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_apply_migrations(tmp_path: Path):
+    engine = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'migrations.sqlite'}")
+
+    try:
+        async with engine.connect() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            expected_indexes = await get_index_names(conn)
+
+            # Downgrade to the original schema, which only had PK/UNIQUE indexes, no
+            # slot status or capacity, one vaccine record per slot, no slot holds
+            # and no schedule rules
+            for name in expected_indexes:
+                if name.startswith("ix_"):
+                    await conn.execute(text(f"DROP INDEX {name}"))
+            for column in ("status", "remaining", "capacity"):
+                await conn.execute(
+                    text(f"ALTER TABLE BookingSlots DROP COLUMN {column}")
+                )
+            await conn.execute(text("DROP TABLE VaccineRecords"))
+            await conn.execute(
+                text(
+                    "CREATE TABLE VaccineRecords (id VARCHAR NOT NULL PRIMARY KEY, "
+                    "user_id VARCHAR NOT NULL, "
+                    "booking_slot_id VARCHAR NOT NULL UNIQUE, "
+                    "status VARCHAR NOT NULL, "
+                    "created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, "
+                    "updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL)"
+                )
+            )
+            await conn.execute(text("DROP TABLE SlotHolds"))
+            await conn.execute(text("DROP TABLE ScheduleRules"))
+
+            await conn.execute(
+                text(
+                    "INSERT INTO BookingSlots (id, polyclinic_id, vaccine_id, datetime) "
+                    "VALUES ('slot-1', 'clinic', 'vaccine', '2025-04-01 09:00:00'), "
+                    "('slot-2', 'clinic', 'vaccine', '2025-04-01 10:00:00')"
+                )
+            )
+            await conn.execute(
+                text(
+                    "INSERT INTO VaccineRecords (id, user_id, booking_slot_id, status) "
+                    "VALUES ('record', 'user', 'slot-1', 'booked')"
+                )
+            )
+            await conn.commit()
+
+            assert await get_schema_version(conn) == 0
+
+            applied = await apply_migrations(conn)
+
+            assert [migration.version for migration in applied][-1] == (
+                get_head_version()
+            )
+            assert await get_schema_version(conn) == get_head_version()
+            assert await get_index_names(conn) == expected_indexes
+
+            # Slots that already have a vaccine record are backfilled as booked, with
+            # no place remaining
+            result = await conn.execute(
+                text(
+                    "SELECT id, status, capacity, remaining FROM BookingSlots "
+                    "ORDER BY id"
+                )
+            )
+            assert result.all() == [
+                ("slot-1", "booked", 1, 0),
+                ("slot-2", "available", 1, 1),
+            ]
+
+            result = await conn.execute(
+                text("SELECT id, booking_slot_id FROM VaccineRecords")
+            )
+            assert result.all() == [("record", "slot-1")]
+
+            # Re-running is a no-op
+            assert await apply_migrations(conn) == []
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_schema_sql_matches_head(tmp_path: Path):
+    engine = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'schema.sqlite'}")
+    script = Path("../../../data/schema.sql").read_text()
+
+    try:
+        async with engine.connect() as conn:
+            raw_connection = await conn.get_raw_connection()
+            await raw_connection.driver_connection.executescript(script)
+
+            assert await get_schema_version(conn) == get_head_version()
+            assert await apply_migrations(conn) == []
+
+            indexes = await get_index_names(conn)
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    assert index.name in indexes
+    finally:
+        await engine.dispose()
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+from httpx import AsyncClient
+from models.models import User
+from requests import Response
+from services.principal_cache import PrincipalCache, principal_cache
+
+from tests.conftest import count_queries
+
+# See data.sql for the users
+SCHEDULING_USER_ID = "564b4728-9436-4e1a-8da1-c40dde49a0cc"
+
+
+# ============================================================================
+# principal cache
+# ============================================================================
+def test_principal_cache_expiry_and_eviction(monkeypatch: pytest.MonkeyPatch):
+    cache = PrincipalCache(ttl=60, max_size=2)
+    for id in ["a", "b"]:
+        cache.put(User(id=id, email=f"{id}@example.com"), cache.generation)
+
+    user = cache.get("a")
+    assert user.id == "a" and user.email == "a@example.com"
+    assert cache.get("a") is not user
+
+    # The least recently used user is evicted
+    cache.put(User(id="c"), cache.generation)
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses, len(cache)) == (2, 1, 2)
+
+    # A user read before an invalidation is not cached
+    generation = cache.generation
+    cache.invalidate("a")
+    cache.put(User(id="a"), generation)
+    assert cache.get("a") is None
+
+    # Users expire after `ttl` seconds
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert cache.get("c") is None
+
+
+# ============================================================================
+# authorised user principal cache
+# ============================================================================
+@pytest.mark.asyncio
+async def test_authorized_user_principal_cache(
+    authorized_client_for_scheduling: AsyncClient,
+):
+    res: Response = await authorized_client_for_scheduling.get("/users")
+    assert res.status_code == 200
+    cold = count_queries(res)
+
+    # The user is not queried again while it is cached
+    res = await authorized_client_for_scheduling.get("/users")
+    assert res.status_code == 200
+    assert count_queries(res) == cold - 1
+
+    # Updating the user invalidates it
+    user = res.json()
+    res = await authorized_client_for_scheduling.put(
+        "/users",
+        json={
+            **{
+                key: user[key]
+                for key in ["nric", "last_name", "email", "date_of_birth", "gender"]
+            },
+            "first_name": "Updated",
+            "postal_code": "545078",
+            "enrolled_clinic_postal_code": "768898",
+        },
+    )
+    assert res.status_code == 200
+    assert principal_cache.get(SCHEDULING_USER_ID) is None
+
+    res = await authorized_client_for_scheduling.get("/users")
+    assert res.status_code == 200
+    assert principal_cache.get(SCHEDULING_USER_ID).first_name == "Updated"
+
+
+@pytest.mark.asyncio
+async def test_authorized_user_deleted_principal(
+    authorized_client: AsyncClient, test_user: tuple[dict, dict]
+):
+    res: Response = await authorized_client.get("/users")
+    assert res.status_code == 200
+
+    # Deleting the user invalidates it, so its token no longer authenticates it
+    res = await authorized_client.delete(f"/users/{test_user[0]['id']}")
+    assert res.status_code == 200
+    assert principal_cache.get(test_user[0]["id"]) is None
+
+    res = await authorized_client.get("/users")
+    assert res.status_code == 404
@@ -0,0 +1,139 @@
+import copy
+
+import pytest
+from core.instrumentation import track_queries
+from httpx import AsyncClient
+from requests import Response
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Maximum number of SQL statements each endpoint may issue, including the lookup of
+# the current user. Raise a budget only when an extra round trip is intended.
+QUERY_BUDGETS = [
+    ("get", "/bookings/available", {"params": {"vaccine_name": "Influenza (INF)"}}, 5),
+    ("get", "/bookings/213fa5e7-abbb-4e55-bccc-318db42ace81", {}, 5),
+    (
+        "post",
+        "/bookings/schedule",
+        {"json": {"booking_slot_id": "213fa5e7-abbb-4e55-bccc-318db42ace81"}},
+        3,
+    ),
+    (
+        "post",
+        "/bookings/schedule/batch",
+        {
+            "json": {
+                "booking_slot_ids": [
+                    "213fa5e7-abbb-4e55-bccc-318db42ace81",
+                    "e7bbc307-ae75-4854-bd91-d6851ae085fd",
+                ]
+            }
+        },
+        3,
+    ),
+    (
+        "post",
+        "/bookings/reschedule",
+        {
+            "json": {
+                "vaccine_record_id": "a6578d08-4e81-40ca-bc30-c9f2d01024aa",
+                "new_slot_id": "e7bbc307-ae75-4854-bd91-d6851ae085fd",
+            }
+        },
+        4,
+    ),
+    ("delete", "/bookings/cancel/a6578d08-4e81-40ca-bc30-c9f2d01024aa", {}, 3),
+    ("get", "/records", {}, 5),
+    ("get", "/clinics/nearest", {}, 4),
+    ("get", "/users", {}, 3),
+    (
+        "put",
+        "/users",
+        {
+            "json": {
+                "nric": "T8815246X",
+                "first_name": "Test_2",
+                "last_name": "For_scheduling",
+                "email": "test_2@example.com",
+                "date_of_birth": "2000-04-02",
+                "gender": "M",
+                "postal_code": "545078",
+                "enrolled_clinic_postal_code": "768898",
+            }
+        },
+        2,
+    ),
+    (
+        "post",
+        "/signup",
+        {
+            "json": {
+                "nric": "S1234567Z",
+                "first_name": "New",
+                "last_name": "User",
+                "email": "new_user@example.com",
+                "date_of_birth": "1990-01-01",
+                "gender": "F",
+                "postal_code": "545078",
+                "password": "password123",
+                "password_confirm": "password123",
+            }
+        },
+        2,
+    ),
+    ("get", "/vaccines/recommendations", {}, 2),
+    (
+        "post",
+        "/login",
+        {"data": {"username": "test_2@example.com", "password": "Password123"}},
+        1,
+    ),
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method, path, kwargs, max_queries", QUERY_BUDGETS)
+async def test_endpoint_query_budget(
+    authorized_client_for_scheduling: AsyncClient,
+    assert_max_queries,
+    method: str,
+    path: str,
+    kwargs: dict,
+    max_queries: int,
+):
+    res: Response = await getattr(authorized_client_for_scheduling, method)(
+        path, **kwargs
+    )
+
+    assert res.status_code < 400
+    assert_max_queries(res, max_queries)
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header(async_client: AsyncClient):
+    res: Response = await async_client.get(
+        "/bookings/213fa5e7-abbb-4e55-bccc-318db42ace81"
+    )
+
+    server_timing = res.headers["Server-Timing"]
+    assert server_timing.startswith("db;dur=")
+    assert 'desc="5 queries"' in server_timing
+    assert "total;dur=" in server_timing
+
+
+@pytest.mark.asyncio
+async def test_failed_queries_leave_no_state(session: AsyncSession):
+    conn = await session.connection()
+    info = copy.deepcopy(conn.info)
+
+    with track_queries() as stats:
+        # A statement that raises never reaches `after_cursor_execute`...
+        with pytest.raises(OperationalError):
+            await conn.execute(text("SELECT * FROM MissingTable"))
+
+        await conn.execute(text("SELECT 1"))
+
+    # ...and leaves nothing behind on the connection, nor counts as a query
+    assert conn.info == info
+    assert stats.count == 1
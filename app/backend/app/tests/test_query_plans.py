@@ -0,0 +1,262 @@
+import re
+
+import pytest
+import pytest_asyncio
+from core.config import settings
+from httpx import AsyncClient
+from models.database import Base
+from requests import Response
+from services.clinic_locator import clinic_locator
+from services.inventory import slot_inventory
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from tests.conftest import engine
+
+# Small reference tables that may be scanned (e.g., when matching a vaccine by name)
+REFERENCE_TABLES = {"Vaccines", "VaccineCriteria"}
+
+SCAN_PATTERN = re.compile(r"^SCAN (\w+)")
+# e.g., `FROM "BookingSlots" AS "BookingSlots_1"`, as rendered for `aliased(...)`
+ALIAS_PATTERN = re.compile(r'"?(\w+)"? AS "?(\w+)"?')
+
+
+@pytest_asyncio.fixture
+async def query_plans(session: AsyncSession):
+    """
+    Capture every SELECT statement issued while the test runs, and return a
+    function that runs `EXPLAIN QUERY PLAN` on each of them.
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+
+    async def explain() -> list[tuple[str, list[str]]]:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+        conn = await session.connection()
+        plans = []
+
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+            plans.append((statement, [row.detail for row in result]))
+
+        return plans
+
+    yield explain
+
+    if event.contains(engine.sync_engine, "before_cursor_execute", capture):
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+
+@pytest_asyncio.fixture
+async def loaded_clinic_locator(session: AsyncSession):
+    """
+    Load the clinic locator before statements are captured. Loading it reads every
+    clinic once, after which nearest clinics are found without scanning.
+    """
+    await clinic_locator.load(session)
+
+
+@pytest_asyncio.fixture
+async def loaded_slot_inventory(session: AsyncSession):
+    """
+    Load the slot inventory before statements are captured. Loading it reads every
+    open slot once, after which open slots are found in memory.
+    """
+    await slot_inventory.load(session)
+
+
+def assert_no_full_scans(
+    plans: list[tuple[str, list[str]]], allowed_tables: set[str] = frozenset()
+):
+    assert plans, "No statements were captured."
+
+    for statement, details in plans:
+        # Aliases of base tables count as the tables themselves
+        aliases = {
+            alias: table
+            for table, alias in ALIAS_PATTERN.findall(statement)
+            if table in Base.metadata.tables
+        }
+
+        for detail in details:
+            match = SCAN_PATTERN.match(detail)
+            if not match:
+                continue
+
+            # Only base tables count, subqueries are materialized and scanned in memory
+            table = aliases.get(match[1], match[1])
+            if (
+                table in Base.metadata.tables
+                and table not in REFERENCE_TABLES | allowed_tables
+            ):
+                pytest.fail(
+                    f"Full scan of {table} ({detail}) in: {statement}\n"
+                    + "\n".join(details)
+                )
+
+
+# ============================================================================
+# full scan detection
+# ============================================================================
+def test_assert_no_full_scans_of_aliases():
+    # Scans of aliased base tables count, scans of materialized subqueries do not
+    statement = 'SELECT "BookingSlots_1".id FROM "BookingSlots" AS "BookingSlots_1"'
+    with pytest.raises(pytest.fail.Exception, match="Full scan of BookingSlots"):
+        assert_no_full_scans([(statement, ["SCAN BookingSlots_1"])])
+
+    statement = "SELECT anon_1.id FROM (SELECT 1 AS id) AS anon_1"
+    assert_no_full_scans([(statement, ["SCAN anon_1"])])
+
+
+# ============================================================================
+# booking.py
+# ============================================================================
+@pytest.mark.asyncio
+@pytest.mark.parametrize("slot_inventory_enabled", [True, False])
+async def test_booking_query_plans(
+    authorized_client_for_scheduling: AsyncClient,
+    loaded_slot_inventory,
+    query_plans,
+    monkeypatch: pytest.MonkeyPatch,
+    slot_inventory_enabled: bool,
+):
+    monkeypatch.setattr(settings, "slot_inventory_enabled", slot_inventory_enabled)
+    client = authorized_client_for_scheduling
+
+    res: Response = await client.get(
+        "/bookings/available", params={"vaccine_name": "Influenza (INF)"}
+    )
+    assert res.status_code == 200
+
+    res = await client.get(
+        "/bookings/available",
+        params={
+            "vaccine_name": "Influenza (INF)",
+            "polyclinic_name": "yishun polyclinic",
+            "start_datetime": "2025-04-01",
+            "end_datetime": "2025-04-30",
+        },
+    )
+    assert res.status_code == 200
+
+    # Later pages seek into the open slots with the cursor
+    params = {"vaccine_name": "Influenza (INF)", "polyclinic_limit": 2, "limit": 1}
+    res = await client.get("/bookings/available", params=params)
+    assert res.status_code == 200
+    res = await client.get(
+        "/bookings/available",
+        params={**params, "cursor": res.headers["X-Next-Cursor"]},
+    )
+    assert res.status_code == 200
+
+    res = await client.get("/bookings/213fa5e7-abbb-4e55-bccc-318db42ace81")
+    assert res.status_code == 200
+
+    res = await client.post(
+        "/bookings/schedule",
+        json={"booking_slot_id": "213fa5e7-abbb-4e55-bccc-318db42ace81"},
+    )
+    assert res.status_code == 201
+
+    res = await client.post(
+        "/bookings/reschedule",
+        json={
+            "vaccine_record_id": "a6578d08-4e81-40ca-bc30-c9f2d01024aa",
+            "new_slot_id": "e7bbc307-ae75-4854-bd91-d6851ae085fd",
+        },
+    )
+    assert res.status_code == 200
+
+    res = await client.delete("/bookings/cancel/a6578d08-4e81-40ca-bc30-c9f2d01024aa")
+    assert res.status_code == 200
+
+    # With the slot inventory, polyclinics are matched by name (with a leading
+    # wildcard) on their own, before their slots are looked up
+    allowed_tables = {"Clinics"} if slot_inventory_enabled else set()
+    assert_no_full_scans(await query_plans(), allowed_tables=allowed_tables)
+
+
+# ============================================================================
+# record.py
+# ============================================================================
+@pytest.mark.asyncio
+async def test_record_query_plans(
+    authorized_client_for_vaccine_records: AsyncClient, query_plans
+):
+    client = authorized_client_for_vaccine_records
+
+    res: Response = await client.get("/records")
+    assert res.status_code == 200
+
+    res = await client.get("/records", params={"limit": 1})
+    assert res.status_code == 200
+    res = await client.get(
+        "/records", params={"limit": 1, "cursor": res.headers["X-Next-Cursor"]}
+    )
+    assert res.status_code == 200
+
+    res = await client.get("/records/b6732344-bc30-4401-9a69-b91e28273b8d")
+    assert res.status_code == 200
+
+    assert_no_full_scans(await query_plans())
+
+
+# ============================================================================
+# clinic.py
+# ============================================================================
+@pytest.mark.asyncio
+@pytest.mark.parametrize("clinic_type", [None, "polyclinic", "gp"])
+async def test_clinic_query_plans(
+    authorized_client: AsyncClient,
+    loaded_clinic_locator,
+    query_plans,
+    clinic_type: str | None,
+):
+    params = {"clinic_type": clinic_type} if clinic_type else {}
+
+    res: Response = await authorized_client.get("/clinics/nearest", params=params)
+    assert res.status_code == 200
+
+    assert_no_full_scans(await query_plans())
+
+
+# ============================================================================
+# user.py (and signup/login, which share the same lookups)
+# ============================================================================
+@pytest.mark.asyncio
+async def test_user_query_plans(
+    authorized_client: AsyncClient, test_user: tuple[dict, dict], query_plans
+):
+    res: Response = await authorized_client.get("/users")
+    assert res.status_code == 200
+
+    res = await authorized_client.put(
+        "/users",
+        json={
+            "nric": test_user[1]["nric"],
+            "first_name": test_user[1]["first_name"],
+            "last_name": test_user[1]["last_name"],
+            "email": test_user[1]["email"],
+            "date_of_birth": test_user[1]["date_of_birth"],
+            "gender": test_user[1]["gender"],
+            "postal_code": test_user[1]["postal_code"],
+            "enrolled_clinic_postal_code": "768898",
+        },
+    )
+    assert res.status_code == 200
+
+    res = await authorized_client.post(
+        "/login",
+        data={"username": test_user[1]["email"], "password": test_user[1]["password"]},
+    )
+    assert res.status_code == 200
+
+    assert_no_full_scans(await query_plans())
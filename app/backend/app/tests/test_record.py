@@ -34,6 +34,42 @@ async def test_authorized_user_get_vaccination_records(
     assert res.status_code == 200
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit", [1, 2])
+async def test_authorized_user_get_vaccination_records_pagination(
+    authorized_client_for_vaccine_records: AsyncClient, limit: int
+):
+    res: Response = await authorized_client_for_vaccine_records.get("/records")
+    expected = [record["id"] for record in res.json()]
+
+    records = []
+    params = {"limit": limit}
+    while True:
+        res = await authorized_client_for_vaccine_records.get("/records", params=params)
+        assert res.status_code == 200
+        assert len(res.json()) <= limit
+        records.extend(record["id"] for record in res.json())
+
+        if "X-Next-Cursor" not in res.headers:
+            break
+        params["cursor"] = res.headers["X-Next-Cursor"]
+
+    # Pages add up to every record, most recent first
+    assert records == expected
+
+
+@pytest.mark.asyncio
+async def test_authorized_user_get_vaccination_records_invalid_cursor(
+    authorized_client_for_vaccine_records: AsyncClient,
+):
+    res: Response = await authorized_client_for_vaccine_records.get(
+        "/records", params={"limit": 1, "cursor": "not-a-cursor"}
+    )
+
+    assert res.status_code == 400
+    assert res.json().get("detail") == "Invalid cursor."
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     "id",
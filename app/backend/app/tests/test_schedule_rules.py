@@ -0,0 +1,234 @@
+import uuid
+from datetime import date, datetime, time, timedelta
+
+import pytest
+import pytest_asyncio
+from core.config import settings
+from httpx import AsyncClient
+from models.models import BookingSlot, ScheduleRule
+from requests import Response
+from services.schedule_rules import decode_slot_id, encode_slot_id, rule_times
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# See data.sql for the clinics, vaccines and slots
+INFLUENZA_ID = "9004aab3-8993-4d37-81c3-78844191e5ec"
+YISHUN_POLYCLINIC_ID = "bd760847-db7e-439f-add8-3610167478ca"
+INFLUENZA_SLOT_ID = "e7bbc307-ae75-4854-bd91-d6851ae085fd"  # 2025-04-03 11am
+
+PARAMS = {
+    "vaccine_name": "Influenza (INF)",
+    "polyclinic_name": "Yishun",
+    "start_datetime": "2025-04-03",
+    "end_datetime": "2025-04-10",
+    "timeslot_limit": 10,
+}
+
+
+@pytest_asyncio.fixture
+async def rule(session: AsyncSession, monkeypatch: pytest.MonkeyPatch) -> ScheduleRule:
+    # Every Thursday from 9am to 12pm, i.e. 2025-04-03 has an 11am slot stored already
+    monkeypatch.setattr(settings, "booking_slot_mode", "rules")
+
+    rule = ScheduleRule(
+        polyclinic_id=YISHUN_POLYCLINIC_ID,
+        vaccine_id=INFLUENZA_ID,
+        weekdays="3",
+        start_time=time(9),
+        end_time=time(12),
+        interval_minutes=60,
+        valid_from=date(2025, 4, 1),
+    )
+    session.add(rule)
+    await session.commit()
+
+    return rule
+
+
+# ============================================================================
+# virtual slot ids
+# ============================================================================
+def test_encode_slot_id():
+    rule_id = str(uuid.uuid4())
+    slot_datetime = datetime(2025, 4, 3, 9, 30)
+
+    slot_id = encode_slot_id(rule_id, slot_datetime)
+    rule_prefix, decoded_datetime = decode_slot_id(slot_id)
+
+    assert uuid.UUID(slot_id).version == 8
+    assert rule_id.startswith(rule_prefix)
+    assert decoded_datetime == slot_datetime
+
+    # Stored slot ids are not virtual
+    assert decode_slot_id(INFLUENZA_SLOT_ID) is None
+    assert decode_slot_id("not-a-uuid") is None
+
+
+def test_rule_times():
+    rule = ScheduleRule(
+        weekdays="0,2",
+        start_time=time(9),
+        end_time=time(10, 10),
+        interval_minutes=20,
+        valid_from=date(2025, 4, 1),
+        valid_until=date(2025, 4, 7),
+    )
+
+    # Monday 2025-03-31 to Monday 2025-04-14, within the validity of the rule
+    times = rule_times(rule, datetime(2025, 3, 31), datetime(2025, 4, 14, 9, 20))
+
+    assert [slot.strftime("%m-%d %H:%M") for slot in times] == [
+        "04-02 09:00",
+        "04-02 09:20",
+        "04-02 09:40",
+        "04-07 09:00",
+        "04-07 09:20",
+        "04-07 09:40",
+    ]
+
+
+# ============================================================================
+# authorised user available slots (rules mode)
+# ============================================================================
+@pytest.mark.asyncio
+async def test_authorized_user_get_available_slots_from_rules(
+    authorized_client_for_scheduling: AsyncClient, rule: ScheduleRule
+):
+    res: Response = await authorized_client_for_scheduling.get(
+        "/bookings/available", params=PARAMS
+    )
+
+    assert res.status_code == 200
+    slots = res.json()
+    assert [slot["datetime"][5:13] for slot in slots] == [
+        "04-03T09",
+        "04-03T10",
+        "04-03T11",
+        "04-10T09",
+        "04-10T10",
+        "04-10T11",
+    ]
+
+    # The stored slot keeps its id, the others get a virtual one. The response has
+    # the same shape either way
+    assert slots[2]["id"] == INFLUENZA_SLOT_ID
+    assert slots[0]["id"] == encode_slot_id(rule.id, datetime(2025, 4, 3, 9))
+    assert all(slot.keys() == slots[2].keys() for slot in slots)
+    assert all(slot["polyclinic"]["id"] == YISHUN_POLYCLINIC_ID for slot in slots)
+
+
+@pytest.mark.asyncio
+async def test_authorized_user_get_available_slots_from_rules_paginated(
+    authorized_client_for_scheduling: AsyncClient, rule: ScheduleRule
+):
+    res: Response = await authorized_client_for_scheduling.get(
+        "/bookings/available", params=PARAMS
+    )
+    expected_slot_ids = [slot["id"] for slot in res.json()]
+
+    slot_ids = []
+    params = {**PARAMS, "limit": 4}
+    while True:
+        res = await authorized_client_for_scheduling.get(
+            "/bookings/available", params=params
+        )
+        assert res.status_code == 200
+        slot_ids.extend(slot["id"] for slot in res.json())
+
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params = {**PARAMS, "limit": 4, "cursor": cursor}
+
+    assert slot_ids == expected_slot_ids
+
+
+@pytest.mark.asyncio
+async def test_authorized_user_get_available_slots_from_rules_far_future(
+    authorized_client_for_scheduling: AsyncClient, rule: ScheduleRule
+):
+    # Slots are only computed up to the horizon, however far the end is...
+    params = {**PARAMS, "end_datetime": "9999-12-31", "timeslot_limit": 100}
+    res: Response = await authorized_client_for_scheduling.get(
+        "/bookings/available", params=params
+    )
+    assert res.status_code == 200
+
+    horizon = datetime(2025, 4, 3) + timedelta(
+        days=settings.schedule_rules_horizon_days
+    )
+    slots = res.json()
+    assert slots
+    assert all(datetime.fromisoformat(slot["datetime"]) <= horizon for slot in slots)
+
+    # ...and pages without a limit (i.e., from a cursor) are computed up to it too
+    res = await authorized_client_for_scheduling.get(
+        "/bookings/available", params={**params, "limit": 1}
+    )
+    res = await authorized_client_for_scheduling.get(
+        "/bookings/available",
+        params={**params, "cursor": res.headers["X-Next-Cursor"]},
+    )
+    assert res.status_code == 200
+    assert len(res.json()) == len(slots) - 1
+
+    # The number of slots per polyclinic is capped as well
+    res = await authorized_client_for_scheduling.get(
+        "/bookings/available", params={**params, "timeslot_limit": 1000000}
+    )
+    assert res.status_code == 422
+
+
+# ============================================================================
+# authorised user scheduling (rules mode)
+# ============================================================================
+@pytest.mark.asyncio
+async def test_authorized_user_schedule_virtual_slot(
+    authorized_client_for_scheduling: AsyncClient,
+    session: AsyncSession,
+    rule: ScheduleRule,
+):
+    slot_datetime = datetime(2025, 4, 10, 10)
+    slot_id = encode_slot_id(rule.id, slot_datetime)
+
+    res: Response = await authorized_client_for_scheduling.post(
+        "/bookings/schedule", json={"booking_slot_id": slot_id}
+    )
+
+    # The slot is only stored once it is booked
+    assert res.status_code == 201
+    assert res.json()["booking_slot_id"] == slot_id
+
+    booking_slot = await session.get(BookingSlot, slot_id)
+    assert booking_slot.datetime == slot_datetime
+    assert booking_slot.status == "booked"
+
+    res = await authorized_client_for_scheduling.get(
+        "/bookings/available", params=PARAMS
+    )
+    assert slot_id not in [slot["id"] for slot in res.json()]
+    assert len(res.json()) == 5
+
+    # Booking it again fails like any other booked slot
+    res = await authorized_client_for_scheduling.post(
+        "/bookings/schedule", json={"booking_slot_id": slot_id}
+    )
+    assert res.status_code == 400
+    assert res.json().get("detail") == "Slot already booked."
+
+
+@pytest.mark.asyncio
+async def test_authorized_user_schedule_virtual_slot_not_in_rule(
+    authorized_client_for_scheduling: AsyncClient,
+    session: AsyncSession,
+    rule: ScheduleRule,
+):
+    # Wednesdays are not part of the rule
+    slot_id = encode_slot_id(rule.id, datetime(2025, 4, 9, 10))
+
+    res: Response = await authorized_client_for_scheduling.post(
+        "/bookings/schedule", json={"booking_slot_id": slot_id}
+    )
+
+    assert res.status_code == 404
+    assert res.json().get("detail") == f"Booking slot with slot id {slot_id} not found."
+    assert await session.get(BookingSlot, slot_id) is None
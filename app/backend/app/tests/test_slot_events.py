@@ -0,0 +1,149 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+from models.models import User
+from requests import Response
+from routers.booking import stream_available_booking_slots
+from services.slot_events import SLOT_FREED, SLOT_TAKEN, SlotEventBroker, slot_events
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# See data.sql for the users, clinics, vaccines and slots
+SCHEDULING_USER_ID = "564b4728-9436-4e1a-8da1-c40dde49a0cc"
+INFLUENZA_ID = "9004aab3-8993-4d37-81c3-78844191e5ec"
+YISHUN_POLYCLINIC_ID = "bd760847-db7e-439f-add8-3610167478ca"
+INFLUENZA_SLOT_ID = "e7bbc307-ae75-4854-bd91-d6851ae085fd"  # 2025-04-03 11am
+RECORD_ID = "a6578d08-4e81-40ca-bc30-c9f2d01024aa"
+BARTLEY_SLOT_ID = "5379aea8-3acd-4274-9cbc-acb3c4973b6c"
+
+
+def make_slot(**kwargs) -> SimpleNamespace:
+    slot = {
+        "id": INFLUENZA_SLOT_ID,
+        "polyclinic_id": YISHUN_POLYCLINIC_ID,
+        "vaccine_id": INFLUENZA_ID,
+        "datetime": datetime(2025, 4, 3, 11),
+        "remaining": 0,
+    }
+    return SimpleNamespace(**{**slot, **kwargs})
+
+
+async def next_event(stream) -> str:
+    return await asyncio.wait_for(stream.__anext__(), timeout=1)
+
+
+# ============================================================================
+# slot event broker
+# ============================================================================
+@pytest.mark.asyncio
+async def test_slot_event_broker_filters():
+    broker = SlotEventBroker(max_queued=10, keepalive_interval=60)
+    april = broker.subscribe(
+        [INFLUENZA_ID], None, datetime(2025, 4, 1), datetime(2025, 4, 30)
+    )
+    yishun = broker.subscribe([INFLUENZA_ID], [YISHUN_POLYCLINIC_ID])
+    stream = broker.stream(april)
+    assert await next_event(stream) == ": connected\n\n"
+
+    # Only the subscribers of the slot's vaccine, polyclinic and datetime get it
+    broker.publish(SLOT_TAKEN, make_slot(datetime=datetime(2025, 5, 1)))
+    broker.publish(SLOT_TAKEN, make_slot(vaccine_id="other"))
+    broker.publish(SLOT_FREED, make_slot(polyclinic_id="other", remaining=1))
+
+    event = await next_event(stream)
+    assert event.startswith(f"event: {SLOT_FREED}\ndata: ")
+    assert '"polyclinic_id": "other"' in event
+    assert '"remaining": 1' in event
+
+    assert [event.type for event in yishun._events] == [SLOT_TAKEN]
+
+    # Closing the stream unsubscribes it
+    await stream.aclose()
+    assert broker.subscribers == 1
+    broker.unsubscribe(yishun)
+    assert broker.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_slot_event_broker_slow_subscriber():
+    broker = SlotEventBroker(max_queued=2, keepalive_interval=0.01)
+    subscription = broker.subscribe([INFLUENZA_ID])
+    stream = broker.stream(subscription)
+    assert await next_event(stream) == ": connected\n\n"
+
+    # Idle streams are kept alive
+    assert await next_event(stream) == ": keep-alive\n\n"
+
+    # A subscriber that falls too far behind is disconnected, to reload the slots
+    for _ in range(3):
+        broker.publish(SLOT_TAKEN, make_slot())
+
+    with pytest.raises(StopAsyncIteration):
+        await next_event(stream)
+    assert broker.subscribers == 0
+
+
+# ============================================================================
+# authorised user availability stream
+# ============================================================================
+@pytest.mark.asyncio
+async def test_authorized_user_stream_available_slots(
+    authorized_client_for_scheduling: AsyncClient, session: AsyncSession
+):
+    # Streaming responses are read from the endpoint directly, since the test client
+    # only returns once the response is complete
+    user = await session.get(User, SCHEDULING_USER_ID)
+    res = await stream_available_booking_slots(
+        vaccine_name="Influenza (INF)",
+        polyclinic_name="Yishun",
+        current_user=user,
+        db=session,
+    )
+    assert res.media_type == "text/event-stream"
+    stream = res.body_iterator
+    assert await next_event(stream) == ": connected\n\n"
+
+    # Slots taken and freed by the booking write paths are streamed...
+    res: Response = await authorized_client_for_scheduling.post(
+        "/bookings/schedule", json={"booking_slot_id": INFLUENZA_SLOT_ID}
+    )
+    assert res.status_code == 201
+    record_id = res.json()["id"]
+    assert await next_event(stream) == (
+        f"event: {SLOT_TAKEN}\n"
+        f'data: {{"id": "{INFLUENZA_SLOT_ID}", '
+        f'"polyclinic_id": "{YISHUN_POLYCLINIC_ID}", '
+        f'"vaccine_id": "{INFLUENZA_ID}", '
+        '"datetime": "2025-04-03T11:00:00", "remaining": 0}\n\n'
+    )
+
+    # ...leaving out those of other vaccines and polyclinics
+    res = await authorized_client_for_scheduling.post(
+        "/bookings/reschedule",
+        json={
+            "vaccine_record_id": RECORD_ID,
+            "new_slot_id": BARTLEY_SLOT_ID,
+        },
+    )
+    assert res.status_code == 200
+
+    res = await authorized_client_for_scheduling.delete(f"/bookings/cancel/{record_id}")
+    assert res.status_code == 200
+    assert (await next_event(stream)).startswith(f"event: {SLOT_FREED}\n")
+
+    await stream.aclose()
+    assert slot_events.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_authorized_user_stream_unknown_vaccine(
+    authorized_client_for_scheduling: AsyncClient,
+):
+    res: Response = await authorized_client_for_scheduling.get(
+        "/bookings/available/stream", params={"vaccine_name": "Unknown"}
+    )
+
+    assert res.status_code == 404
+    assert res.json().get("detail") == "No vaccines matching Unknown."
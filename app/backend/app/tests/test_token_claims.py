@@ -0,0 +1,104 @@
+import time
+
+import jwt
+import pytest
+import pytest_asyncio
+from core.config import settings
+from httpx import AsyncClient
+from requests import Response
+from services.principal_versions import PrincipalVersions
+
+from tests.conftest import count_queries
+
+# See data.sql for the users
+SCHEDULING_USER = {"username": "test_2@example.com", "password": "Password123"}
+
+
+@pytest_asyncio.fixture
+async def claims_client(async_client: AsyncClient, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "access_token_claims", True)
+
+    res: Response = await async_client.post("/login", data=SCHEDULING_USER)
+    token = res.json().get("access_token")
+    async_client.headers = {**async_client.headers, "Authorization": f"Bearer {token}"}
+
+    return async_client
+
+
+# ============================================================================
+# principal versions
+# ============================================================================
+def test_principal_versions(monkeypatch: pytest.MonkeyPatch):
+    versions = PrincipalVersions(max_age=60)
+    assert versions.is_current("a", 1)
+
+    versions.update("a", 2)
+    versions.delete("b")
+    assert not versions.is_current("a", 1)
+    assert versions.is_current("a", 2)
+    assert not versions.is_current("b", 2)
+
+    # Changes are forgotten after `max_age` seconds, once the claims are that old
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    versions.update("c", 1)
+    assert versions.is_current("a", 1) and versions.is_current("b", 1)
+
+
+# ============================================================================
+# authorised user claims-rich tokens
+# ============================================================================
+@pytest.mark.asyncio
+async def test_authorized_user_token_claims(
+    claims_client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    token = claims_client.headers["Authorization"].removeprefix("Bearer ")
+    payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    assert payload["principal"]["date_of_birth"] == "2000-04-02"
+    assert payload["principal"]["gender"] == "M"
+    assert payload["principal"]["latitude"] is not None
+
+    # Read endpoints are served from the claims, without looking the user up
+    res: Response = await claims_client.get("/vaccines/recommendations")
+    assert res.status_code == 200
+    assert count_queries(res) == 1
+
+    for _ in range(2):  # the first request loads the slot inventory
+        res = await claims_client.get(
+            "/bookings/available", params={"vaccine_name": "Influenza (INF)"}
+        )
+        assert res.status_code == 200
+    with_claims = count_queries(res)
+
+    # Claims older than `access_token_claims_max_age` are looked up again
+    monkeypatch.setattr(settings, "access_token_claims_max_age", 0)
+    res = await claims_client.get(
+        "/bookings/available", params={"vaccine_name": "Influenza (INF)"}
+    )
+    assert count_queries(res) == with_claims + 1
+
+
+@pytest.mark.asyncio
+async def test_authorized_user_token_claims_after_update(claims_client: AsyncClient):
+    res: Response = await claims_client.get("/users")
+    user = res.json()
+
+    res = await claims_client.put(
+        "/users",
+        json={
+            **{key: user[key] for key in ["nric", "first_name", "last_name", "email"]},
+            "date_of_birth": "2004-04-02",
+            "gender": "F",
+            "postal_code": "545078",
+            "enrolled_clinic_postal_code": "768898",
+        },
+    )
+    assert res.status_code == 200
+
+    # The claims of the token are out of date, so the user is looked up again
+    res = await claims_client.get("/vaccines/recommendations")
+    assert res.status_code == 200
+    assert count_queries(res) == 2
+    assert "Human papillomavirus (HPV2 or HPV4)" in [
+        vaccine["name"] for vaccine in res.json()
+    ]
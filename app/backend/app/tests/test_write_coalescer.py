@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from core.config import settings
+from httpx import AsyncClient
+from models.models import BookingSlot, VaccineRecord
+from requests import Response
+from services.write_coalescer import WriteCoalescer, write_coalescer
+from sqlalchemy import func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from tests.conftest import TestingAsyncSessionLocal
+
+# See data.sql for the available and booked slots
+INFLUENZA_ID = "9004aab3-8993-4d37-81c3-78844191e5ec"
+YISHUN_POLYCLINIC_ID = "bd760847-db7e-439f-add8-3610167478ca"
+BOOKED_SLOT_ID = "97ba51db-48d8-4873-b1ee-57a9b7f766f0"
+
+
+@pytest.mark.asyncio
+async def test_coalesced_bookings(
+    concurrent_client_for_scheduling: AsyncClient,
+    session: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(settings, "booking_write_coalescing", True)
+    # A long window, so that all requests below end up in the same few batches
+    monkeypatch.setattr(write_coalescer, "window", 0.2)
+
+    batch_sizes = []
+    apply = write_coalescer._apply
+
+    async def _apply(batch):
+        batch_sizes.append(len(batch))
+        await apply(batch)
+
+    monkeypatch.setattr(write_coalescer, "_apply", _apply)
+
+    slots = [
+        BookingSlot(
+            polyclinic_id=YISHUN_POLYCLINIC_ID,
+            vaccine_id=INFLUENZA_ID,
+            datetime=datetime(2025, 5, 1, 9) + timedelta(minutes=15 * i),
+        )
+        for i in range(20)
+    ]
+    session.add_all(slots)
+    await session.commit()
+
+    # Every open slot is booked once, and the booked slot is tried as many times
+    slot_ids = [slot.id for slot in slots] + [BOOKED_SLOT_ID] * len(slots)
+    responses: list[Response] = await asyncio.gather(
+        *(
+            concurrent_client_for_scheduling.post(
+                "/bookings/schedule", json={"booking_slot_id": slot_id}
+            )
+            for slot_id in slot_ids
+        )
+    )
+
+    # Each caller gets its own result, and conflicts only roll back their own changes
+    for slot_id, res in zip(slot_ids, responses):
+        if slot_id == BOOKED_SLOT_ID:
+            assert res.status_code == 400
+            assert res.json().get("detail") == "Slot already booked."
+        else:
+            assert res.status_code == 201
+            assert res.json()["booking_slot_id"] == slot_id
+
+    assert sum(batch_sizes) == len(slot_ids)
+    assert len(batch_sizes) < len(slot_ids)
+
+    result = await session.execute(
+        select(func.count()).where(
+            VaccineRecord.booking_slot_id.in_([slot.id for slot in slots])
+        )
+    )
+    assert result.scalar_one() == len(slots)
+
+
+@pytest.mark.asyncio
+async def test_coalesced_batch_failure(
+    concurrent_client_for_scheduling: AsyncClient,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(settings, "booking_write_coalescing", True)
+
+    def _failing_session_factory():
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(write_coalescer, "session_factory", _failing_session_factory)
+
+    # Every caller of a batch that cannot be committed gets the error
+    with pytest.raises(RuntimeError, match="database unavailable"):
+        await concurrent_client_for_scheduling.post(
+            "/bookings/schedule",
+            json={"booking_slot_id": "213fa5e7-abbb-4e55-bccc-318db42ace81"},
+        )
+
+
+@pytest.mark.asyncio
+async def test_coalesced_batch_cancelled_caller(init_test_db):
+    coalescer = WriteCoalescer(TestingAsyncSessionLocal, window=0.05, max_batch=64)
+
+    async def operation(db: AsyncSession) -> int:
+        result = await db.execute(text("SELECT 1"))
+        return result.scalar_one()
+
+    # The caller that opened the batch is cancelled before it is applied...
+    first = asyncio.create_task(coalescer.submit(operation))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(coalescer.submit(operation))
+    first.cancel()
+
+    # ...but the batch is still applied, and later batches are opened as usual
+    assert await asyncio.wait_for(second, 1) == 1
+    assert await asyncio.wait_for(coalescer.submit(operation), 1) == 1
+    with pytest.raises(asyncio.CancelledError):
+        await first
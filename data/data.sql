@@ -69,3 +69,7 @@ VALUES
 ('7eb3a1a2-dd8c-4cd7-84d5-cd5621ab4fc1', '8045a3aa-e221-4d9c-89c5-822ab96d4885', '21b89cd2-f99c-4113-bb46-5cc21d566b97', 'completed'),
 -- vaccine record to test for reschedule
 ('a6578d08-4e81-40ca-bc30-c9f2d01024aa', '564b4728-9436-4e1a-8da1-c40dde49a0cc', '3f7f75c0-b28c-4bb7-8c9a-991e5d150bc3', 'booked');
+-- Mark the slots of the vaccine records above as booked
+UPDATE BookingSlots
+SET status = 'booked', remaining = 0
+WHERE id IN (SELECT booking_slot_id FROM VaccineRecords);
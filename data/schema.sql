@@ -67,6 +67,9 @@ CREATE TABLE BookingSlots (
     polyclinic_id TEXT NOT NULL,
     vaccine_id TEXT NOT NULL,
     datetime DATETIME NOT NULL,
+    status TEXT NOT NULL DEFAULT 'available', -- 'booked' once no place remains
+    capacity INTEGER NOT NULL DEFAULT 1,
+    remaining INTEGER NOT NULL DEFAULT 1 CHECK (remaining BETWEEN 0 AND capacity),
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (polyclinic_id) REFERENCES Clinics(id) ON DELETE CASCADE,
@@ -78,10 +81,52 @@ CREATE TABLE BookingSlots (
 CREATE TABLE VaccineRecords (
     id TEXT PRIMARY KEY,
     user_id TEXT NOT NULL,
-    booking_slot_id TEXT UNIQUE NOT NULL,
+    booking_slot_id TEXT NOT NULL,
     status VARCHAR(20) NOT NULL, -- 'booked', 'completed'
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE,
-    FOREIGN KEY (booking_slot_id) REFERENCES BookingSlots(id) ON DELETE CASCADE
+    FOREIGN KEY (booking_slot_id) REFERENCES BookingSlots(id) ON DELETE CASCADE,
+    UNIQUE (booking_slot_id, user_id)
 );
+
+-- ScheduleRules table representing recurring calendars of vaccines at polyclinics (see `booking_slot_mode`) and audit timestamps
+CREATE TABLE ScheduleRules (
+    id TEXT PRIMARY KEY,
+    polyclinic_id TEXT NOT NULL,
+    vaccine_id TEXT NOT NULL,
+    weekdays VARCHAR NOT NULL, -- comma-separated, from 0 (Monday) to 6 (Sunday)
+    start_time TIME NOT NULL,
+    end_time TIME NOT NULL,
+    interval_minutes INTEGER NOT NULL,
+    valid_from DATE NOT NULL,
+    valid_until DATE,
+    capacity INTEGER NOT NULL DEFAULT 1,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (polyclinic_id) REFERENCES Clinics(id) ON DELETE CASCADE,
+    FOREIGN KEY (vaccine_id) REFERENCES Vaccines(id) ON DELETE CASCADE
+);
+
+-- SlotHolds table representing temporary holds on booking slot places (see `slot_hold_backend`) and audit timestamps
+CREATE TABLE SlotHolds (
+    booking_slot_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    expires_at DATETIME NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (booking_slot_id, user_id),
+    FOREIGN KEY (booking_slot_id) REFERENCES BookingSlots(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE
+);
+
+-- Indexes for the columns filtered on by the booking, record, clinic and user routers
+CREATE INDEX ix_BookingSlots_available_vaccine_id_datetime_id ON BookingSlots (vaccine_id, datetime, id) WHERE status = 'available';
+CREATE INDEX ix_VaccineRecords_user_id ON VaccineRecords (user_id);
+CREATE INDEX ix_Addresses_postal_code ON Addresses (postal_code);
+CREATE INDEX ix_Clinics_address_id ON Clinics (address_id);
+CREATE INDEX ix_SlotHolds_expires_at ON SlotHolds (expires_at);
+CREATE INDEX ix_ScheduleRules_vaccine_id ON ScheduleRules (vaccine_id);
+
+-- Schema version, see `app/backend/app/models/migrations`
+PRAGMA user_version = 7;
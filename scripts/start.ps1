@@ -11,6 +11,10 @@ try {
     Set-Location $backendPath
     if ($LASTEXITCODE -ne 0) { Write-Error "❌ Failed to change directory to backend directory."}
 
+    Write-Host "🗃️ Applying database migrations..." -ForegroundColor Cyan
+    python -m models.migrations
+    if ($LASTEXITCODE -ne 0) { Write-Error "❌ Failed to apply database migrations."}
+
     $mainBackendJob = Start-BackendServer -AppName "main:app" -Port 8000 -Color Cyan
     $agentBackendJob = Start-BackendServer -AppName "main:agent_app" -Port 8001 -Color Yellow
 
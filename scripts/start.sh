@@ -37,6 +37,12 @@ cd app/backend/app || {
     exit 1
 }
 
+echo -e "${MAIN_COLOR}🗃️ Applying database migrations...${RESET_COLOR}"
+python -m models.migrations || {
+    echo -e "${ERROR_COLOR}❌ Failed to apply database migrations.${RESET_COLOR}"
+    exit 1
+}
+
 echo -e "${MAIN_COLOR}🚀 Starting main server on port 8000...${RESET_COLOR}"
 echo -e "${AGENT_COLOR}🚀 Starting agent server on port 8001...${RESET_COLOR}"
 